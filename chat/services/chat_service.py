@@ -232,7 +232,8 @@ class ChatService:
             if not user_msg:
                 raise Exception("Failed to add user message")
             
-            # Поиск релевантного контекста
+            # Поиск релевантного контекста: один раз за ход, результаты используются
+            # и для контекста чата, и для промпта
             search_results = self.search_service.search(user_message, top_k=5)
             
             # Обновление контекста чата
@@ -244,7 +245,9 @@ class ChatService:
             system_prompt = self.prompt_service.get_system_prompt()
             
             # Формирование контекста из результатов поиска
-            context_from_search = self.prompt_service.format_context_for_prompt(user_message)
+            context_from_search = self.prompt_service.format_context_for_prompt(
+                user_message, top_k=5, search_results=search_results
+            )
             
             # Получение истории сообщений чата для контекста
             messages = []
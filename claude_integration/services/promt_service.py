@@ -49,20 +49,24 @@ class PromptService:
             logger.error(f"Error getting system prompt: {e}")
             return ""
     
-    def format_context_for_prompt(self, query: str, top_k: int = 5) -> str:
+    def format_context_for_prompt(self, query: str, top_k: int = 5,
+                                  search_results: Optional[Dict[str, Any]] = None) -> str:
         """
         Форматирование контекста из результатов поиска для промпта
         
         Args:
             query: Поисковый запрос
             top_k: Количество результатов для включения в контекст
+            search_results: Уже полученные результаты SearchService.search для этого запроса
+                (по умолчанию поиск выполняется заново)
             
         Returns:
             str: Отформатированный контекст
         """
         try:
-            # Выполнение семантического поиска
-            search_results = self.search_service.search(query, top_k=top_k)
+            # Выполнение семантического поиска, если результаты не переданы
+            if search_results is None:
+                search_results = self.search_service.search(query, top_k=top_k)
             
             if not search_results or not search_results.get('results'):
                 return "Контекст: По вашему запросу не найдено релевантной информации."
@@ -0,0 +1,43 @@
+from unittest import mock
+from django.test import SimpleTestCase
+from ..services import promt_service
+from ..services.promt_service import PromptService
+
+
+class FormatContextTests(SimpleTestCase):
+    """
+    Формирование контекста промпта из результатов поиска
+    """
+    def setUp(self):
+        self.search_service = mock.Mock()
+        with mock.patch.object(promt_service, 'get_search_service', return_value=self.search_service):
+            self.service = PromptService()
+        
+        self.search_results = {
+            'query': 'склад',
+            'results': {
+                'task': [{'entity_id': 1, 'task': {'name': 'Инвентаризация', 'planfix_id': 't1', 'project': {'name': 'Склад', 'planfix_id': 'p1'}}}]
+            }
+        }
+    
+    def test_passed_search_results_are_reused(self):
+        context = self.service.format_context_for_prompt('склад', top_k=5, search_results=self.search_results)
+        
+        # Результаты поиска этого хода используются повторно, поиск не выполняется
+        self.search_service.search.assert_not_called()
+        self.assertIn('Инвентаризация (ID: t1)', context)
+        self.assertIn('Проект: Склад (ID: p1)', context)
+    
+    def test_search_runs_without_search_results(self):
+        self.search_service.search.return_value = self.search_results
+        
+        context = self.service.format_context_for_prompt('склад', top_k=3)
+        
+        self.search_service.search.assert_called_once_with('склад', top_k=3)
+        self.assertIn('Инвентаризация (ID: t1)', context)
+    
+    def test_empty_search_results_are_not_searched_again(self):
+        context = self.service.format_context_for_prompt('склад', search_results={'query': 'склад', 'results': {}})
+        
+        self.search_service.search.assert_not_called()
+        self.assertEqual(context, "Контекст: По вашему запросу не найдено релевантной информации.")
\ No newline at end of file
@@ -176,10 +176,47 @@ CLAUDE_API_KEY = os.environ.get('CLAUDE_API_KEY', '')
 CLAUDE_MODEL = os.environ.get('CLAUDE_MODEL', 'claude-3-haiku-20240307')
 
 # Vector Database Configuration
-VECTOR_DB_TYPE = os.environ.get('VECTOR_DB_TYPE', 'faiss')  # faiss, milvus, or pinecone
+VECTOR_DB_TYPE = os.environ.get('VECTOR_DB_TYPE', 'faiss')  # faiss, pgvector, milvus, or pinecone
 PINECONE_API_KEY = os.environ.get('PINECONE_API_KEY', '')
 PINECONE_ENVIRONMENT = os.environ.get('PINECONE_ENVIRONMENT', '')
 VECTOR_DIMENSION = int(os.environ.get('VECTOR_DIMENSION', '1536'))  # Размерность эмбеддингов
+EMBEDDINGS_BATCH_SIZE = int(os.environ.get('EMBEDDINGS_BATCH_SIZE', '96'))  # Текстов в одном запросе к API эмбеддингов
+VECTOR_INDEX_TYPE = os.environ.get('VECTOR_INDEX_TYPE', 'flat')  # flat, ivf, hnsw, ivfpq или opq для новых индексов
+VECTOR_INDEX_MMAP = os.environ.get('VECTOR_INDEX_MMAP', 'False') == 'True'  # Загрузка индекса только для чтения через mmap (flat и hnsw - только с IO_FLAG_MMAP_IFC)
+VECTOR_INDEX_COMPACT_RATIO = float(os.environ.get('VECTOR_INDEX_COMPACT_RATIO', '0.1'))  # Доля удаленных векторов для компактификации
+VECTOR_INDEX_COMPACT_INTERVAL = int(os.environ.get('VECTOR_INDEX_COMPACT_INTERVAL', '3600'))  # в секундах
+VECTOR_INDEX_FLUSH_BATCH = int(os.environ.get('VECTOR_INDEX_FLUSH_BATCH', '1000'))  # Изменений до сохранения индекса
+VECTOR_INDEX_FLUSH_INTERVAL = int(os.environ.get('VECTOR_INDEX_FLUSH_INTERVAL', '30'))  # в секундах
+VECTOR_INDEX_REBUILD_CHUNK_SIZE = int(os.environ.get('VECTOR_INDEX_REBUILD_CHUNK_SIZE', '2000'))  # Строк за одно чтение при перестроении
+VECTOR_INDEX_REBUILD_LOCK_TIMEOUT = int(os.environ.get('VECTOR_INDEX_REBUILD_LOCK_TIMEOUT', '3600'))  # в секундах
+VECTOR_INDEX_HOT_RELOAD = os.environ.get('VECTOR_INDEX_HOT_RELOAD', 'True') == 'True'  # Переход на новые поколения индекса без перезапуска
+VECTOR_INDEX_RELOAD_INTERVAL = int(os.environ.get('VECTOR_INDEX_RELOAD_INTERVAL', '5'))  # в секундах, проверка без Redis
+VECTOR_INDEX_SHARD_BY = os.environ.get('VECTOR_INDEX_SHARD_BY', '')  # Ключ метаданных для шардирования (например, project_id), пусто — без шардов
+VECTOR_INDEX_SHARD_WORKERS = int(os.environ.get('VECTOR_INDEX_SHARD_WORKERS', '8'))  # Потоков для поиска по шардам
+VECTOR_INDEX_CHECK_INTERVAL = int(os.environ.get('VECTOR_INDEX_CHECK_INTERVAL', '86400'))  # в секундах, проверка согласованности индекса с БД
+VECTOR_INDEX_CHECK_SAMPLE_SIZE = int(os.environ.get('VECTOR_INDEX_CHECK_SAMPLE_SIZE', '1000'))  # Записей для сравнения векторов индекса и БД
+VECTOR_INDEX_RECONCILE_BATCH_SIZE = int(os.environ.get('VECTOR_INDEX_RECONCILE_BATCH_SIZE', '500'))  # Записей в пакете при исправлении расхождений
+PGVECTOR_INDEX_TYPE = os.environ.get('PGVECTOR_INDEX_TYPE', 'hnsw')  # hnsw или ivfflat для новых индексов pgvector
+PGVECTOR_ITERATIVE_SCAN = os.environ.get('PGVECTOR_ITERATIVE_SCAN', '')  # off, strict_order или relaxed_order (pgvector >= 0.8, для ivfflat без strict_order), пусто — не задается
+PGVECTOR_GENERATION_TTL = float(os.environ.get('PGVECTOR_GENERATION_TTL', '1'))  # в секундах, как часто поиск перечитывает поколение индекса из Redis для кэша результатов
+HYBRID_SEARCH_ENABLED = os.environ.get('HYBRID_SEARCH_ENABLED', 'False') == 'True'  # Слияние векторного поиска с BM25 по ключевым словам (оценка слияния в fused_score)
+HYBRID_RRF_K = int(os.environ.get('HYBRID_RRF_K', '60'))  # Константа reciprocal rank fusion
+KEYWORD_INDEX_REFRESH_INTERVAL = int(os.environ.get('KEYWORD_INDEX_REFRESH_INTERVAL', '60'))  # в секундах, загрузка записей, измененных другими процессами
+FULLTEXT_SEARCH_CONFIG = os.environ.get('FULLTEXT_SEARCH_CONFIG', 'russian')  # Конфигурация полнотекстового поиска Postgres
+SEARCH_CACHE_ENABLED = os.environ.get('SEARCH_CACHE_ENABLED', 'True') == 'True'  # Кэширование результатов поиска в Redis
+SEARCH_CACHE_TTL = int(os.environ.get('SEARCH_CACHE_TTL', '3600'))  # в секундах
+SEARCH_CACHE_MAX_ENTRIES = int(os.environ.get('SEARCH_CACHE_MAX_ENTRIES', '10000'))  # Записей кэша до вытеснения давно не читавшихся
+SEARCH_CACHE_MAX_ENTRY_BYTES = int(os.environ.get('SEARCH_CACHE_MAX_ENTRY_BYTES', '262144'))  # Результаты большего размера не кэшируются
+ENRICHMENT_CACHE_TTL = int(os.environ.get('ENRICHMENT_CACHE_TTL', '3600'))  # в секундах, ограничивает устаревание названий связанных сущностей
+SEARCH_LOG_ASYNC = os.environ.get('SEARCH_LOG_ASYNC', 'True') == 'True'  # Запись SearchLog пакетами вне пути запроса
+SEARCH_LOG_BACKEND = os.environ.get('SEARCH_LOG_BACKEND', 'thread')  # thread (bulk_create в фоновом потоке) или celery
+SEARCH_LOG_BUFFER_SIZE = int(os.environ.get('SEARCH_LOG_BUFFER_SIZE', '10000'))  # Записей в буфере, при переполнении новые отбрасываются
+SEARCH_LOG_BATCH_SIZE = int(os.environ.get('SEARCH_LOG_BATCH_SIZE', '200'))  # Записей в одной пакетной вставке
+SEARCH_LOG_FLUSH_INTERVAL = float(os.environ.get('SEARCH_LOG_FLUSH_INTERVAL', '5'))  # в секундах
+VECTOR_SEARCH_SERVER_SOCKET = os.environ.get('VECTOR_SEARCH_SERVER_SOCKET', '')  # Unix-сокет сервера поиска, пусто — индекс в каждом процессе
+VECTOR_SEARCH_SERVER_BATCH_SIZE = int(os.environ.get('VECTOR_SEARCH_SERVER_BATCH_SIZE', '64'))  # Максимум запросов в пакете
+VECTOR_SEARCH_SERVER_BATCH_WAIT_MS = int(os.environ.get('VECTOR_SEARCH_SERVER_BATCH_WAIT_MS', '2'))  # Ожидание запросов для пакета
+VECTOR_SEARCH_SERVER_TIMEOUT = int(os.environ.get('VECTOR_SEARCH_SERVER_TIMEOUT', '30'))  # в секундах
 
 # Synchronization Settings
 PLANFIX_SYNC_INTERVAL = int(os.environ.get('PLANFIX_SYNC_INTERVAL', '3600'))  # в секундах
\ No newline at end of file
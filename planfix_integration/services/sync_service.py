@@ -1,20 +1,47 @@
 import logging
+import weakref
+import threading
 from typing import List, Dict, Any, Optional
 from django.utils import timezone
 from django.db import transaction
 from ..models import Project, Task, Employee, Comment, Document, SyncLog
 from .api_client import PlanfixApiClient
 from vector_db.services.embeddings_service import generate_embeddings
+from vector_db.services.vector_index import get_vector_index_service
+from vector_db.services.keyword_index import update_keyword_index
 from vector_db.models import VectorEntry
 
 logger = logging.getLogger(__name__)
 
+
+class _PendingIndexUpdate:
+    """
+    Пакет векторных записей одной транзакции и его обработчик on_commit
+    """
+    def __init__(self, flush, pending: weakref.WeakValueDictionary, key: tuple):
+        self.entries = []
+        self._flush = flush
+        self._pending = pending
+        self._key = key
+    
+    def __call__(self):
+        # Следующая транзакция с теми же точками сохранения начинает новый пакет
+        if self._pending.get(self._key) is self:
+            del self._pending[self._key]
+        
+        entries, self.entries = self.entries, []
+        self._flush(entries)
+
+
 class PlanfixSyncService:
     """
     Сервис для синхронизации данных из Planfix
     """
     def __init__(self, api_client=None):
         self.api_client = api_client or PlanfixApiClient()
+        
+        # Пакеты обновлений индекса по точкам сохранения транзакции текущего потока
+        self._pending_updates = threading.local()
     
     def sync_all(self) -> Dict[str, Any]:
         """
@@ -256,6 +283,10 @@ class PlanfixSyncService:
             'task_planfix_id': task.planfix_id
         }
         
+        # Проект задачи позволяет фильтровать комментарии по проекту
+        if task.project_id:
+            metadata['project_id'] = task.project_id
+        
         if author:
             metadata['author_id'] = author.id
             metadata['author_name'] = author.name
@@ -416,6 +447,57 @@ class PlanfixSyncService:
         
         return document
     
+    def _queue_index_update(self, vector_entry: VectorEntry) -> None:
+        """
+        Постановка векторной записи в очередь на обновление индекса
+        
+        Записи накапливаются в пакете текущей транзакции (точки сохранения)
+        и передаются в индекс после ее фиксации. При откате транзакции пакет
+        отбрасывается вместе с обработчиком on_commit.
+        
+        Args:
+            vector_entry: Векторная запись
+        """
+        connection = transaction.get_connection()
+        if not connection.in_atomic_block:
+            self._flush_index_updates([vector_entry])
+            return
+        
+        # Пакеты хранятся по слабым ссылкам: Django удерживает обработчик on_commit
+        # до фиксации и отбрасывает его при откате, вместе с ним исчезает и пакет
+        pending = getattr(self._pending_updates, 'batches', None)
+        if pending is None:
+            pending = self._pending_updates.batches = weakref.WeakValueDictionary()
+        
+        key = tuple(connection.savepoint_ids)
+        update = pending.get(key)
+        if update is None:
+            update = _PendingIndexUpdate(self._flush_index_updates, pending, key)
+            pending[key] = update
+            transaction.on_commit(update)
+        
+        update.entries.append(vector_entry)
+    
+    def _flush_index_updates(self, entries: List[VectorEntry]) -> None:
+        """
+        Пакетное обновление векторного индекса записями зафиксированной транзакции
+        
+        Args:
+            entries: Векторные записи
+        """
+        try:
+            vector_index = get_vector_index_service()
+            with vector_index.batch():
+                updated = vector_index.upsert_vectors(entries)
+            logger.info(f"Updated {updated} vectors in index after sync")
+        except Exception as e:
+            logger.error(f"Error updating vector index after sync: {e}")
+        
+        try:
+            update_keyword_index(entries)
+        except Exception as e:
+            logger.error(f"Error updating keyword index after sync: {e}")
+    
     def _create_vector_entry(self, entity_id: int, entity_type: str, text: str, metadata: Dict) -> Optional[VectorEntry]:
         """
         Создание векторной записи для текста
@@ -451,6 +533,8 @@ class PlanfixSyncService:
                 }
             )
             
+            self._queue_index_update(vector_entry)
+            
             return vector_entry
         except Exception as e:
             logger.error(f"Error creating vector entry for {entity_type} {entity_id}: {e}")
@@ -0,0 +1,63 @@
+import json
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from vector_db.services.vector_index import FAISS_INDEX_TYPES
+from vector_db.services.benchmark import run_benchmark
+
+
+def _int_list(value):
+    return [int(item) for item in value.split(',') if item]
+
+
+class Command(BaseCommand):
+    """
+    Замер полноты и скорости поиска по типам векторного индекса
+    """
+    help = 'Замер recall@k, задержки, времени построения и размера индексов на синтетических эмбеддингах'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', type=_int_list, default=[10000, 100000],
+                            help='Количества векторов через запятую (например, 10000,100000,1000000)')
+        parser.add_argument('--dimension', type=int, default=settings.VECTOR_DIMENSION,
+                            help='Размерность векторов')
+        parser.add_argument('--index-type', action='append', dest='index_types', choices=FAISS_INDEX_TYPES,
+                            help='Тип индекса (можно указать несколько раз, по умолчанию все)')
+        parser.add_argument('--queries', type=int, default=1000, help='Количество запросов')
+        parser.add_argument('--top-k', type=int, default=10, help='Количество результатов для recall@k')
+        parser.add_argument('--nprobe', type=_int_list, default=None,
+                            help='Значения nprobe для IVF через запятую')
+        parser.add_argument('--ef-search', type=_int_list, default=None,
+                            help='Значения ef_search для HNSW через запятую')
+        parser.add_argument('--config', default=None,
+                            help='Параметры конфигурации индекса в формате JSON (например, {"pq_m": 48})')
+        parser.add_argument('--clusters', type=int, default=None,
+                            help='Количество кластеров данных (по умолчанию sqrt от размера)')
+        parser.add_argument('--seed', type=int, default=0, help='Начальное значение генератора')
+        parser.add_argument('--output', default=None, help='Файл для результатов в формате JSON')
+    
+    def handle(self, *args, **options):
+        try:
+            config_overrides = json.loads(options['config']) if options['config'] else None
+        except ValueError as e:
+            raise CommandError(f"Invalid --config JSON: {e}")
+        
+        report = run_benchmark(
+            sizes=options['sizes'],
+            dimension=options['dimension'],
+            index_types=options['index_types'],
+            n_queries=options['queries'],
+            top_k=options['top_k'],
+            nprobe_values=options['nprobe'],
+            ef_search_values=options['ef_search'],
+            config_overrides=config_overrides,
+            n_clusters=options['clusters'],
+            seed=options['seed']
+        )
+        
+        output = json.dumps(report, indent=2, ensure_ascii=False)
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as f:
+                f.write(output)
+            self.stdout.write(f"Wrote {len(report['results'])} benchmark results to {options['output']}")
+        else:
+            self.stdout.write(output)
\ No newline at end of file
@@ -0,0 +1,22 @@
+import json
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from vector_db.services.consistency import check_vector_index
+
+
+class Command(BaseCommand):
+    """
+    Проверка согласованности векторного индекса с таблицей VectorEntry
+    """
+    help = 'Сравнение ID и выборки векторов индекса с БД и исправление расхождений'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--repair', action='store_true',
+                            help='Исправить расхождения пакетными изменениями индекса')
+        parser.add_argument('--sample-size', type=int, default=settings.VECTOR_INDEX_CHECK_SAMPLE_SIZE,
+                            help='Записей каждого индекса для сравнения векторов (0 — только ID)')
+    
+    def handle(self, *args, **options):
+        reports = check_vector_index(repair=options['repair'], sample_size=options['sample_size'])
+        
+        self.stdout.write(json.dumps([report.to_dict() for report in reports], indent=2, ensure_ascii=False))
\ No newline at end of file
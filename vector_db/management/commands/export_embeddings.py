@@ -0,0 +1,28 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from vector_db.models import VectorEntry
+from vector_db.services.bulk_export import export_embeddings, save_embeddings
+
+
+class Command(BaseCommand):
+    """
+    Выгрузка эмбеддингов VectorEntry в файлы .npy
+    """
+    help = 'Выгрузка эмбеддингов в файлы .npy и .ids.npy через COPY (FORMAT binary)'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('output', help='Префикс пути к файлам выгрузки')
+        parser.add_argument('--entity-type', action='append', dest='entity_types',
+                            help='Выгружать только записи этого типа (можно указать несколько раз)')
+        parser.add_argument('--dimension', type=int, default=settings.VECTOR_DIMENSION,
+                            help='Размерность эмбеддингов')
+    
+    def handle(self, *args, **options):
+        queryset = VectorEntry.objects.all()
+        if options['entity_types']:
+            queryset = queryset.filter(entity_type__in=options['entity_types'])
+        
+        ids, vectors = export_embeddings(queryset, options['dimension'])
+        vectors_path, ids_path = save_embeddings(options['output'], ids, vectors)
+        
+        self.stdout.write(f"Exported {len(ids)} embeddings to {vectors_path} and {ids_path}")
\ No newline at end of file
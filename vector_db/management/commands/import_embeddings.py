@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand, CommandError
+from vector_db.services.bulk_export import import_embeddings, load_embeddings, refresh_imported_entries
+
+
+class Command(BaseCommand):
+    """
+    Загрузка эмбеддингов из файлов .npy в существующие записи VectorEntry
+    
+    После загрузки векторный индекс обновляется для импортированных записей
+    (текст записей не меняется, поэтому search_vector не пересчитывается). С --no-index индекс нужно перестроить отдельно (задача rebuild_vector_index).
+    """
+    help = 'Загрузка эмбеддингов из файлов .npy и .ids.npy через COPY (FORMAT binary)'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('input', help='Префикс пути к файлам выгрузки')
+        parser.add_argument('--batch-size', type=int, default=None, help='Строк в одной порции COPY')
+        parser.add_argument('--no-index', action='store_true', help='Не обновлять векторный индекс после загрузки')
+    
+    def handle(self, *args, **options):
+        try:
+            ids, vectors = load_embeddings(options['input'])
+        except (OSError, ValueError) as e:
+            raise CommandError(f"Cannot load embeddings: {e}")
+        
+        updated = import_embeddings(ids, vectors, options['batch_size'])
+        
+        self.stdout.write(f"Updated {updated} of {len(ids)} vector entries")
+        
+        if options['no_index']:
+            self.stdout.write("Vector index was not updated, run the rebuild_vector_index task before searching")
+            return
+        
+        refreshed = refresh_imported_entries(ids, options['batch_size'])
+        
+        self.stdout.write(f"Updated {refreshed} vectors in the index")
\ No newline at end of file
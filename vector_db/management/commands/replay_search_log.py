@@ -0,0 +1,49 @@
+import json
+from django.core.management.base import BaseCommand, CommandError
+from vector_db.services.search_replay import sample_logged_queries, replay_queries, compare_with_baseline, load_baseline
+
+
+class Command(BaseCommand):
+    """
+    Воспроизведение запросов из SearchLog для оценки задержки и стабильности результатов
+    """
+    help = 'Воспроизведение выборки запросов из SearchLog через SearchService и сравнение с эталоном'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--limit', type=int, default=500, help='Количество запросов в выборке')
+        parser.add_argument('--since-days', type=int, default=None, help='Брать запросы за последние дни')
+        parser.add_argument('--distinct', action='store_true', help='Исключить повторы запросов')
+        parser.add_argument('--concurrency', type=int, default=4, help='Количество одновременных запросов')
+        parser.add_argument('--top-k', type=int, default=10, help='Количество результатов для каждого запроса')
+        parser.add_argument('--baseline', default=None,
+                            help='Файл эталона: запросы берутся из него, результаты сравниваются с ним')
+        parser.add_argument('--output', default=None,
+                            help='Файл для результатов в формате JSON (может служить эталоном)')
+    
+    def handle(self, *args, **options):
+        baseline = None
+        if options['baseline']:
+            try:
+                baseline = load_baseline(options['baseline'])
+            except (OSError, ValueError) as e:
+                raise CommandError(f"Cannot load baseline {options['baseline']}: {e}")
+            
+            # Для сравнения воспроизводятся те же запросы, что и в эталоне
+            queries = [run['query'] for run in baseline.get('runs', [])]
+        else:
+            queries = sample_logged_queries(options['limit'], options['since_days'], options['distinct'])
+        
+        if not queries:
+            raise CommandError("No queries to replay")
+        
+        report = replay_queries(queries, options['concurrency'], options['top_k'])
+        if baseline is not None:
+            report['comparison'] = compare_with_baseline(report, baseline)
+        
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as f:
+                json.dump(report, f, indent=2, ensure_ascii=False)
+            self.stdout.write(f"Wrote replay of {len(queries)} queries to {options['output']}")
+        
+        summary = {key: value for key, value in report.items() if key != 'runs'}
+        self.stdout.write(json.dumps(summary, indent=2, ensure_ascii=False))
\ No newline at end of file
@@ -0,0 +1,38 @@
+import logging
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from vector_db.services.vector_index import create_vector_index_service
+from vector_db.services.search_server import VectorSearchServer
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    """
+    Запуск сервера векторного поиска, владеющего индексом
+    """
+    help = 'Запуск сервера векторного поиска на Unix-сокете'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--socket', default=settings.VECTOR_SEARCH_SERVER_SOCKET,
+                            help='Путь к Unix-сокету (по умолчанию VECTOR_SEARCH_SERVER_SOCKET)')
+        parser.add_argument('--index-name', default='default', help='Имя векторного индекса')
+    
+    def handle(self, *args, **options):
+        socket_path = options['socket']
+        if not socket_path:
+            raise CommandError("Socket path is not configured, set VECTOR_SEARCH_SERVER_SOCKET or pass --socket")
+        
+        # Сервер загружает индекс сам, а не через клиент get_vector_index_service()
+        service = create_vector_index_service(options['index_name'])
+        server = VectorSearchServer(socket_path, service)
+        
+        self.stdout.write(f"Vector search server for index {options['index_name']} listening on {socket_path}")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
+            service.flush()
+            logger.info("Vector search server stopped")
\ No newline at end of file
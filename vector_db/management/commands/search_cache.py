@@ -0,0 +1,23 @@
+import json
+from django.core.management.base import BaseCommand
+from vector_db.services.result_cache import get_search_result_cache
+
+
+class Command(BaseCommand):
+    """
+    Статистика и очистка кэша результатов поиска
+    """
+    help = 'Вывод доли попаданий в кэш результатов поиска или его очистка'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--clear', action='store_true', help='Удалить все записи кэша и статистику')
+    
+    def handle(self, *args, **options):
+        result_cache = get_search_result_cache()
+        
+        if options['clear']:
+            removed = result_cache.clear()
+            self.stdout.write(f"Removed {removed} search cache entries")
+            return
+        
+        self.stdout.write(json.dumps(result_cache.get_stats(), indent=2))
\ No newline at end of file
@@ -0,0 +1,25 @@
+import json
+from django.core.management.base import BaseCommand
+from vector_db.services.search_latency import search_latency_report
+
+
+class Command(BaseCommand):
+    """
+    Отчет о распределении длительности поиска по этапам
+    """
+    help = 'Перцентили длительности семантического поиска по этапам из SearchLog'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--since-days', type=int, default=7,
+                            help='Учитывать поиски за последние дни (0 — все)')
+        parser.add_argument('--output', default=None, help='Файл для отчета в формате JSON')
+    
+    def handle(self, *args, **options):
+        report = search_latency_report(options['since_days'] or None)
+        
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as f:
+                json.dump(report, f, indent=2)
+            self.stdout.write(f"Wrote search latency report to {options['output']}")
+        
+        self.stdout.write(json.dumps(report, indent=2))
\ No newline at end of file
@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+from vector_db.services.pgvector_index import PgVectorIndexService
+
+
+class Command(BaseCommand):
+    """
+    Подготовка схемы pgvector для векторного индекса
+    """
+    help = 'Создание расширения vector, столбца векторов VectorEntry и индекса по нему'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--index-name', default='default', help='Имя индекса в реестре VectorIndex')
+        parser.add_argument('--rebuild', action='store_true',
+                            help='Заполнить столбец векторов, даже если он уже существовал')
+    
+    def handle(self, *args, **options):
+        service = PgVectorIndexService(options['index_name'])
+        created = service.setup_schema()
+        
+        if created or options['rebuild']:
+            def report_progress(processed, total):
+                self.stdout.write(f"Filled {processed}/{total} vector entries")
+            
+            count = service.rebuild(progress_callback=report_progress)
+            self.stdout.write(f"Built pgvector {service.index_type} index with {count} vectors")
+        else:
+            self.stdout.write(f"pgvector schema for index {options['index_name']} is up to date")
\ No newline at end of file
@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+from vector_db.services.fulltext import update_search_vectors
+from vector_db.tasks import backfill_search_vectors
+
+
+class Command(BaseCommand):
+    """
+    Заполнение столбца search_vector для полнотекстового поиска
+    """
+    help = 'Заполнение tsvector записей VectorEntry, у которых он еще не заполнен'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=None, help='Записей в одном UPDATE')
+        parser.add_argument('--async', dest='run_async', action='store_true', help='Поставить заполнение в очередь Celery')
+    
+    def handle(self, *args, **options):
+        if options['run_async']:
+            result = backfill_search_vectors.delay(options['batch_size'])
+            self.stdout.write(f"Queued search vector backfill task {result.id}")
+            return
+        
+        updated = update_search_vectors(batch_size=options['batch_size'])
+        
+        self.stdout.write(f"Updated search vectors for {updated} vector entries")
\ No newline at end of file
@@ -1,8 +1,58 @@
 from django.db import models
+from django.db.models import Value
+from django.conf import settings
 from django.utils.translation import gettext_lazy as _
 from django.contrib.postgres.fields import ArrayField
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVector, SearchVectorField
 import json
 
+def _text_search_vector(text) -> SearchVector:
+    """
+    tsvector нового значения текста записи
+    
+    Args:
+        text: Текст или выражение, которое записывается в столбец text
+    
+    Returns:
+        SearchVector: Выражение для столбца search_vector
+    """
+    if not hasattr(text, 'resolve_expression'):
+        text = Value(text)
+    return SearchVector(text, config=settings.FULLTEXT_SEARCH_CONFIG)
+
+
+class VectorEntryQuerySet(models.QuerySet):
+    """
+    QuerySet векторных записей, пересчитывающий search_vector при изменении текста
+    
+    update() и bulk_update() обходят save(), а фоновое заполнение обрабатывает
+    только записи без search_vector, поэтому tsvector вычисляется в том же UPDATE.
+    """
+    def update(self, **kwargs):
+        if 'text' in kwargs and 'search_vector' not in kwargs:
+            kwargs['search_vector'] = _text_search_vector(kwargs['text'])
+        return super().update(**kwargs)
+    
+    update.alters_data = True
+    
+    def bulk_update(self, objs, fields, batch_size=None):
+        if 'text' not in fields or 'search_vector' in fields:
+            return super().bulk_update(objs, fields, batch_size=batch_size)
+        
+        objs = list(objs)
+        for obj in objs:
+            obj.search_vector = _text_search_vector(obj.text)
+        try:
+            return super().bulk_update(objs, [*fields, 'search_vector'], batch_size=batch_size)
+        finally:
+            # Значение вычислено в БД и загружается при первом обращении
+            for obj in objs:
+                obj.__dict__.pop('search_vector', None)
+    
+    bulk_update.alters_data = True
+
+
 class VectorEntry(models.Model):
     """
     Модель для хранения векторных эмбеддингов и связанных метаданных
@@ -16,20 +66,44 @@ class VectorEntry(models.Model):
         verbose_name=_('Embedding Vector')
     )
     metadata = models.JSONField(_('Metadata'), default=dict)
+    search_vector = SearchVectorField(_('Search Vector'), null=True, blank=True)  # tsvector текста для полнотекстового поиска
     created_at = models.DateTimeField(_('Created At'), auto_now_add=True)
     updated_at = models.DateTimeField(_('Updated At'), auto_now=True)
     
+    objects = VectorEntryQuerySet.as_manager()
+    
     class Meta:
         verbose_name = _('Vector Entry')
         verbose_name_plural = _('Vector Entries')
         unique_together = ('entity_type', 'entity_id')
         indexes = [
             models.Index(fields=['entity_type', 'entity_id']),
+            GinIndex(fields=['search_vector']),
         ]
     
     def __str__(self):
         return f"{self.entity_type} - {self.entity_id}"
     
+    def save(self, *args, **kwargs):
+        """
+        Сохранение записи вместе с tsvector ее текста
+        
+        search_vector вычисляется в том же INSERT/UPDATE. update() и bulk_update()
+        пересчитывают его сами (см. VectorEntryQuerySet), записи из bulk_create
+        заполняет задача backfill_search_vectors.
+        """
+        self.search_vector = _text_search_vector(self.text)
+        
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'text' in update_fields:
+            kwargs['update_fields'] = set(update_fields) | {'search_vector'}
+        
+        try:
+            super().save(*args, **kwargs)
+        finally:
+            # Вместо выражения в записи остается отложенное поле, загружаемое из БД
+            self.__dict__.pop('search_vector', None)
+    
     def get_metadata_display(self):
         """
         Форматированный вывод метаданных
@@ -51,6 +125,10 @@ class VectorIndex(models.Model):
     )
     config = models.JSONField(_('Configuration'), default=dict)
     is_active = models.BooleanField(_('Is Active'), default=True)
+    parent = models.ForeignKey('self', on_delete=models.CASCADE,
+                               related_name='shards', null=True, blank=True)  # Индекс, шардом которого является запись
+    shard_value = models.CharField(_('Shard Value'), max_length=255, blank=True, default='')
+    generation = models.PositiveBigIntegerField(_('Generation'), default=0)  # Увеличивается при каждом сохранении индекса
     last_updated = models.DateTimeField(_('Last Updated'), auto_now=True)
     created_at = models.DateTimeField(_('Created At'), auto_now_add=True)
     
@@ -70,11 +148,28 @@ class SearchLog(models.Model):
     user_id = models.IntegerField(_('User ID'), null=True, blank=True)
     results_count = models.IntegerField(_('Results Count'))
     duration_ms = models.IntegerField(_('Duration (ms)'))
+    cache_hit = models.BooleanField(_('Cache Hit'), default=False)
+    # Длительности этапов поиска (мс), пустые для этапов, которые не выполнялись
+    cache_ms = models.FloatField(_('Cache Lookup (ms)'), null=True, blank=True)
+    embedding_ms = models.FloatField(_('Query Embedding (ms)'), null=True, blank=True)
+    index_search_ms = models.FloatField(_('Index Search (ms)'), null=True, blank=True)
+    hydration_ms = models.FloatField(_('Hydration (ms)'), null=True, blank=True)
+    filter_ms = models.FloatField(_('Filtering (ms)'), null=True, blank=True)
+    keyword_ms = models.FloatField(_('Keyword Search and Fusion (ms)'), null=True, blank=True)
+    enrichment_ms = models.FloatField(_('Enrichment (ms)'), null=True, blank=True)
     created_at = models.DateTimeField(_('Created At'), auto_now_add=True)
     
+    # Этапы поиска в порядке выполнения
+    TIMING_FIELDS = (
+        'cache_ms', 'embedding_ms', 'index_search_ms', 'hydration_ms', 'filter_ms', 'keyword_ms', 'enrichment_ms'
+    )
+    
     class Meta:
         verbose_name = _('Search Log')
         verbose_name_plural = _('Search Logs')
+        indexes = [
+            models.Index(fields=['created_at']),
+        ]
     
     def __str__(self):
         return f"{self.query} ({self.results_count} results, {self.duration_ms}ms)"
\ No newline at end of file
@@ -0,0 +1,228 @@
+import time
+import logging
+import platform
+import numpy as np
+import faiss
+from typing import List, Dict, Optional, Tuple
+from .vector_index import VectorIndexService, DEFAULT_INDEX_CONFIG, IVF_INDEX_TYPES, FAISS_INDEX_TYPES
+
+logger = logging.getLogger(__name__)
+
+
+def generate_clustered_vectors(count: int, dimension: int, n_clusters: int, spread: float = 0.5,
+                               seed: int = 0) -> np.ndarray:
+    """
+    Генерация синтетических эмбеддингов, сгруппированных вокруг случайных центров
+    
+    Реальные эмбеддинги текстов образуют кластеры, поэтому равномерно
+    распределенные векторы завышают сложность задачи для IVF и HNSW.
+    
+    Args:
+        count: Количество векторов
+        dimension: Размерность векторов
+        n_clusters: Количество кластеров
+        spread: Разброс векторов вокруг центра относительно расстояния между центрами
+        seed: Начальное значение генератора случайных чисел
+    
+    Returns:
+        np.ndarray: Нормализованные векторы
+    """
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((n_clusters, dimension), dtype=np.float32)
+    
+    vectors = np.empty((count, dimension), dtype=np.float32)
+    chunk_size = 100000
+    for start in range(0, count, chunk_size):
+        end = min(start + chunk_size, count)
+        labels = rng.integers(0, n_clusters, end - start)
+        vectors[start:end] = centers[labels] + spread * rng.standard_normal((end - start, dimension), dtype=np.float32)
+    
+    faiss.normalize_L2(vectors)
+    return vectors
+
+
+class BenchmarkIndexService(VectorIndexService):
+    """
+    Сервис индекса для замеров на синтетических векторах
+    
+    Индекс строится и обучается теми же методами, что и рабочий, но хранится
+    только в памяти: файлы, БД и Redis не используются, а точное переранжирование
+    сжатых индексов выполняется по исходным векторам.
+    """
+    def __init__(self, dimension: int, config: Dict):
+        super().__init__('benchmark', dimension, hot_reload=False, load=False)
+        self.config = {**DEFAULT_INDEX_CONFIG, **config}
+        self._vectors = None
+        self.index = self._create_empty_index()
+    
+    def build(self, vectors: np.ndarray) -> None:
+        """
+        Обучение индекса и добавление векторов под ID, равными номерам строк
+        
+        Args:
+            vectors: Нормализованные векторы
+        """
+        self._vectors = vectors
+        if not self.index.is_trained:
+            index = self._train_index(self.index, vectors)
+            if index is None:
+                raise ValueError(f"Could not train {self.index_type} index on {len(vectors)} vectors")
+            self.index = index
+        
+        self.index.add_with_ids(vectors, np.arange(len(vectors), dtype=np.int64))
+    
+    def _rerank_exact(self, query_vectors: np.ndarray, indices: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Точное переранжирование кандидатов по исходным векторам
+        """
+        scores = np.full(indices.shape, -np.inf, dtype=np.float32)
+        for q in range(indices.shape[0]):
+            valid = indices[q] != -1
+            scores[q, valid] = self._vectors[indices[q, valid]] @ query_vectors[q]
+        
+        order = np.argsort(-scores, axis=1, kind='stable')
+        return np.take_along_axis(scores, order, axis=1), np.take_along_axis(indices, order, axis=1)
+    
+    def _save_index(self) -> None:
+        """Индекс замеров не сохраняется на диск"""
+    
+    def flush(self) -> bool:
+        return True
+
+
+def _percentile_ms(latencies: List[float], percentile: float) -> float:
+    return round(float(np.percentile(latencies, percentile)) * 1000, 3)
+
+
+def _measure(service: BenchmarkIndexService, queries: np.ndarray, ground_truth: np.ndarray, top_k: int,
+             nprobe: Optional[int], ef_search: Optional[int]) -> Dict:
+    """
+    Замер полноты и задержки поиска при заданных параметрах
+    
+    Args:
+        service: Сервис с построенным индексом
+        queries: Нормализованные векторы запросов
+        ground_truth: ID точных top_k соседей для каждого запроса
+        top_k: Количество результатов
+        nprobe: IVF: количество просматриваемых кластеров
+        ef_search: HNSW: ширина поиска
+    
+    Returns:
+        Dict: recall@k, p50/p99 задержки одиночного запроса и пропускная способность пакета
+    """
+    latencies = []
+    found = []
+    for query in queries:
+        start = time.perf_counter()
+        hits, _ = service._search_hits(query[np.newaxis], top_k, None, nprobe, ef_search)
+        latencies.append(time.perf_counter() - start)
+        found.append([entry_id for entry_id, _ in hits[0][:top_k]])
+    
+    recall = np.mean([
+        len(set(row).intersection(expected.tolist())) / top_k
+        for row, expected in zip(found, ground_truth)
+    ])
+    
+    start = time.perf_counter()
+    service._search_hits(queries, top_k, None, nprobe, ef_search)
+    batch_seconds = time.perf_counter() - start
+    
+    return {
+        f'recall_at_{top_k}': round(float(recall), 4),
+        'p50_ms': _percentile_ms(latencies, 50),
+        'p99_ms': _percentile_ms(latencies, 99),
+        'mean_ms': round(float(np.mean(latencies)) * 1000, 3),
+        'batch_qps': round(len(queries) / batch_seconds, 1) if batch_seconds else None
+    }
+
+
+def run_benchmark(sizes: List[int], dimension: int, index_types: List[str] = None, n_queries: int = 1000,
+                  top_k: int = 10, nprobe_values: List[int] = None, ef_search_values: List[int] = None,
+                  config_overrides: Dict = None, n_clusters: int = None, seed: int = 0) -> Dict:
+    """
+    Замер полноты и скорости поиска по всем типам индекса на синтетических данных
+    
+    Для каждого размера данных строится каждый тип индекса, после чего
+    поиск замеряется при каждом значении nprobe (IVF) или ef_search (HNSW).
+    Эталоном служит точный поиск по тем же векторам.
+    
+    Args:
+        sizes: Количества векторов в индексе
+        dimension: Размерность векторов
+        index_types: Типы индексов (по умолчанию все поддерживаемые)
+        n_queries: Количество запросов
+        top_k: Количество результатов для recall@k
+        nprobe_values: Значения nprobe для IVF (по умолчанию из конфигурации)
+        ef_search_values: Значения ef_search для HNSW (по умолчанию из конфигурации)
+        config_overrides: Параметры конфигурации индекса (pq_m, M и т.д.)
+        n_clusters: Количество кластеров данных (по умолчанию sqrt(size))
+        seed: Начальное значение генератора случайных чисел
+    
+    Returns:
+        Dict: Окружение и результаты замеров для записи в JSON
+    """
+    index_types = index_types or list(FAISS_INDEX_TYPES)
+    results = []
+    
+    for size in sizes:
+        clusters = n_clusters or max(int(np.sqrt(size)), 1)
+        
+        # Запросы берутся из того же распределения, но не совпадают с векторами индекса
+        data = generate_clustered_vectors(size + n_queries, dimension, clusters, seed=seed)
+        vectors, queries = np.ascontiguousarray(data[:size]), np.ascontiguousarray(data[size:])
+        
+        exact = faiss.IndexFlatIP(dimension)
+        exact.add(vectors)
+        _, ground_truth = exact.search(queries, top_k)
+        del exact
+        
+        for index_type in index_types:
+            # Количество кластеров IVF по умолчанию масштабируется с размером данных
+            config = {'index': index_type, 'nlist': max(int(4 * np.sqrt(size)), 1), **(config_overrides or {})}
+            entry = {'size': size, 'dimension': dimension, 'index': index_type, 'config': config}
+            
+            try:
+                service = BenchmarkIndexService(dimension, config)
+                start = time.perf_counter()
+                service.build(vectors)
+                entry['build_seconds'] = round(time.perf_counter() - start, 3)
+                entry['index_bytes'] = int(faiss.serialize_index(service.index).nbytes)
+            except Exception as e:
+                logger.error(f"Error building {index_type} index of {size} vectors: {e}")
+                results.append({**entry, 'error': str(e)})
+                continue
+            
+            if index_type in IVF_INDEX_TYPES:
+                sweep = [('nprobe', value) for value in (nprobe_values or [service.config['nprobe']])]
+            elif index_type == 'hnsw':
+                sweep = [('ef_search', value) for value in (ef_search_values or [service.config['ef_search']])]
+            else:
+                sweep = [(None, None)]
+            
+            for param, value in sweep:
+                nprobe = value if param == 'nprobe' else None
+                ef_search = value if param == 'ef_search' else None
+                
+                measurement = _measure(service, queries, ground_truth, top_k, nprobe, ef_search)
+                results.append({**entry, 'search_params': {param: value} if param else {}, **measurement})
+                logger.info(f"Benchmarked {index_type} index of {size} vectors {param or ''}={value or ''}: {measurement}")
+            
+            del service
+    
+    return {
+        'environment': {
+            'faiss_version': faiss.__version__,
+            'numpy_version': np.__version__,
+            'python_version': platform.python_version(),
+            'machine': platform.machine(),
+            'threads': faiss.omp_get_max_threads()
+        },
+        'parameters': {
+            'sizes': sizes,
+            'dimension': dimension,
+            'queries': n_queries,
+            'top_k': top_k,
+            'seed': seed
+        },
+        'results': results
+    }
\ No newline at end of file
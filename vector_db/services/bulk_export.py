@@ -0,0 +1,335 @@
+import io
+import struct
+import logging
+import numpy as np
+from typing import Callable, Optional, Tuple
+from django.conf import settings
+from django.core.exceptions import EmptyResultSet
+from django.db import connection, transaction
+from django.db.models import QuerySet
+from ..models import VectorEntry
+
+logger = logging.getLogger(__name__)
+
+# Сигнатура и заголовок двоичного формата COPY
+COPY_SIGNATURE = b'PGCOPY\n\xff\r\n\x00'
+COPY_HEADER = COPY_SIGNATURE + struct.pack('>ii', 0, 0)
+COPY_TRAILER = struct.pack('>h', -1)
+
+# OID типа float4 для элементов массива
+FLOAT4_OID = 700
+
+
+def get_copy_row_dtype(dimension: int) -> np.dtype:
+    """
+    Структура строки (id int8, embedding float4[]) в двоичном формате COPY
+    
+    Все строки с эмбеддингами одной размерности имеют одинаковую длину,
+    поэтому поток COPY разбирается numpy без цикла по строкам.
+    
+    Args:
+        dimension: Размерность эмбеддингов
+    
+    Returns:
+        np.dtype: Структурированный тип строки (big-endian)
+    """
+    return np.dtype([
+        ('field_count', '>i2'),
+        ('id_size', '>i4'),
+        ('id', '>i8'),
+        ('array_size', '>i4'),
+        ('ndim', '>i4'),
+        ('has_null', '>i4'),
+        ('element_oid', '>i4'),
+        ('length', '>i4'),
+        ('lower_bound', '>i4'),
+        ('values', [('size', '>i4'), ('value', '>f4')], (dimension,)),
+    ])
+
+
+class _CopyBinaryReader:
+    """
+    Приемник потока COPY TO STDOUT, разбирающий строки в массивы numpy по мере поступления
+    """
+    def __init__(self, dimension: int, total: int, progress_callback: Optional[Callable[[int, int], None]] = None):
+        self.dimension = dimension
+        self.total = total
+        self.row_dtype = get_copy_row_dtype(dimension)
+        self.ids = np.empty(total, dtype=np.int64)
+        self.vectors = np.empty((total, dimension), dtype=np.float32)
+        self.count = 0
+        self.progress_callback = progress_callback
+        self._reported = 0
+        self._buffer = bytearray()
+        self._header_read = False
+    
+    def write(self, data) -> int:
+        self._buffer += data
+        
+        if not self._header_read and not self._read_header():
+            return len(data)
+        
+        # Завершающие 2 байта потока никогда не образуют полную строку
+        rows = len(self._buffer) // self.row_dtype.itemsize
+        if rows:
+            size = rows * self.row_dtype.itemsize
+            self._append(np.frombuffer(bytes(self._buffer[:size]), dtype=self.row_dtype))
+            del self._buffer[:size]
+        
+        return len(data)
+    
+    def _read_header(self) -> bool:
+        """
+        Разбор заголовка потока
+        
+        Returns:
+            bool: Прочитан ли заголовок полностью
+        """
+        if len(self._buffer) < len(COPY_HEADER):
+            return False
+        
+        if bytes(self._buffer[:len(COPY_SIGNATURE)]) != COPY_SIGNATURE:
+            raise ValueError("Unexpected COPY binary signature")
+        
+        extension_size = struct.unpack('>i', self._buffer[len(COPY_SIGNATURE) + 4:len(COPY_HEADER)])[0]
+        header_size = len(COPY_HEADER) + extension_size
+        if len(self._buffer) < header_size:
+            return False
+        
+        del self._buffer[:header_size]
+        self._header_read = True
+        return True
+    
+    def _append(self, records: np.ndarray) -> None:
+        """
+        Добавление разобранных строк в результирующие массивы
+        
+        Args:
+            records: Строки в формате get_copy_row_dtype
+        """
+        if not (np.all(records['field_count'] == 2) and np.all(records['length'] == self.dimension)
+                and np.all(records['values']['size'] == 4)):
+            raise ValueError("Unexpected row layout in COPY binary stream")
+        
+        # Строки, добавленные после подсчета
+        end = self.count + len(records)
+        if end > len(self.ids):
+            extra = max(end - len(self.ids), len(self.ids))
+            self.ids = np.concatenate([self.ids, np.empty(extra, dtype=np.int64)])
+            self.vectors = np.concatenate([self.vectors, np.empty((extra, self.dimension), dtype=np.float32)])
+        
+        self.ids[self.count:end] = records['id']
+        self.vectors[self.count:end] = records['values']['value']
+        self.count = end
+        
+        if self.progress_callback is not None:
+            report_every = settings.VECTOR_INDEX_REBUILD_CHUNK_SIZE
+            if self.count // report_every != self._reported // report_every:
+                self._reported = self.count
+                self.progress_callback(self.count, max(self.total, self.count))
+    
+    def finish(self) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Проверка окончания потока и получение результата
+        
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: ID записей и эмбеддинги
+        """
+        if bytes(self._buffer) != COPY_TRAILER:
+            raise ValueError("COPY binary stream ended unexpectedly")
+        
+        if self.progress_callback is not None:
+            self.progress_callback(self.count, max(self.total, self.count))
+        
+        return self.ids[:self.count], self.vectors[:self.count]
+
+
+def export_embeddings(queryset: Optional[QuerySet] = None, dimension: int = None,
+                      progress_callback: Optional[Callable[[int, int], None]] = None) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Выгрузка эмбеддингов из Postgres в массивы numpy через COPY (FORMAT binary)
+    
+    Значения не проходят через объекты Python: поток COPY разбирается
+    порциями прямо в заранее выделенный массив float32.
+    
+    Args:
+        queryset: Выгружаемые записи VectorEntry (по умолчанию все)
+        dimension: Размерность эмбеддингов, записи другой размерности пропускаются
+        progress_callback: Функция, получающая количество выгруженных и всех записей
+    
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: ID записей (по возрастанию) и эмбеддинги
+    """
+    dimension = int(dimension or settings.VECTOR_DIMENSION)
+    queryset = VectorEntry.objects.all() if queryset is None else queryset
+    
+    try:
+        inner_sql, params = queryset.values('id', 'embedding').order_by().query.sql_with_params()
+    except EmptyResultSet:
+        # Заведомо пустой queryset (none(), фильтр __in=[]) не компилируется в SQL
+        return np.empty(0, dtype=np.int64), np.empty((0, dimension), dtype=np.float32)
+    
+    with connection.cursor() as cursor:
+        inner = cursor.mogrify(inner_sql, params).decode('utf-8')
+        source = (
+            f"FROM ({inner}) AS entries "
+            f"WHERE cardinality(entries.embedding) = {dimension} "
+            f"AND array_position(entries.embedding, NULL) IS NULL"
+        )
+        
+        cursor.execute(f"SELECT count(*) {source}")
+        total = cursor.fetchone()[0]
+        
+        reader = _CopyBinaryReader(dimension, total, progress_callback)
+        cursor.copy_expert(
+            f"COPY (SELECT entries.id::int8, entries.embedding::float4[] {source} ORDER BY entries.id) "
+            f"TO STDOUT (FORMAT binary)",
+            reader
+        )
+    
+    ids, vectors = reader.finish()
+    logger.info(f"Exported {len(ids)} embeddings of dimension {dimension}")
+    return ids, vectors
+
+
+def import_embeddings(ids: np.ndarray, vectors: np.ndarray, batch_size: int = None) -> int:
+    """
+    Запись эмбеддингов в существующие записи VectorEntry по ID через COPY FROM STDIN (FORMAT binary)
+    
+    Args:
+        ids: ID записей
+        vectors: Эмбеддинги
+        batch_size: Количество строк в одной порции COPY
+    
+    Returns:
+        int: Количество обновленных записей
+    """
+    if len(ids) != len(vectors):
+        raise ValueError(f"Got {len(ids)} ids for {len(vectors)} embeddings")
+    
+    # Векторы другой размерности были бы записаны и молча пропущены индексом
+    if vectors.ndim != 2 or vectors.shape[1] != settings.VECTOR_DIMENSION:
+        raise ValueError(f"Expected embeddings of shape (n, {settings.VECTOR_DIMENSION}), got {vectors.shape}")
+    
+    batch_size = batch_size or settings.VECTOR_INDEX_REBUILD_CHUNK_SIZE
+    dimension = vectors.shape[1]
+    row_dtype = get_copy_row_dtype(dimension)
+    table = VectorEntry._meta.db_table
+    
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute("CREATE TEMPORARY TABLE vector_import (id int8, embedding float4[]) ON COMMIT DROP")
+        
+        for start in range(0, len(ids), batch_size):
+            chunk_ids = ids[start:start + batch_size]
+            
+            rows = np.empty(len(chunk_ids), dtype=row_dtype)
+            rows['field_count'] = 2
+            rows['id_size'] = 8
+            rows['id'] = chunk_ids
+            rows['array_size'] = row_dtype['values'].itemsize + 20
+            rows['ndim'] = 1
+            rows['has_null'] = 0
+            rows['element_oid'] = FLOAT4_OID
+            rows['length'] = dimension
+            rows['lower_bound'] = 1
+            rows['values']['size'] = 4
+            rows['values']['value'] = vectors[start:start + batch_size]
+            
+            cursor.copy_expert(
+                "COPY vector_import (id, embedding) FROM STDIN (FORMAT binary)",
+                io.BytesIO(COPY_HEADER + rows.tobytes() + COPY_TRAILER)
+            )
+        
+        cursor.execute(
+            f"UPDATE {table} AS entries SET embedding = vector_import.embedding::float8[], updated_at = now() "
+            f"FROM vector_import WHERE entries.id = vector_import.id"
+        )
+        updated = cursor.rowcount
+    
+    logger.info(f"Imported {updated} embeddings of dimension {dimension}")
+    return updated
+
+
+def refresh_imported_entries(ids: np.ndarray, batch_size: int = None) -> int:
+    """
+    Обновление векторного индекса после импорта эмбеддингов
+    
+    COPY пишет только в таблицу VectorEntry, поэтому без этого шага поиск
+    продолжает возвращать старые векторы до перестроения индекса.
+    
+    Args:
+        ids: ID импортированных записей
+        batch_size: Количество записей в одной порции обновления
+    
+    Returns:
+        int: Количество обновленных векторов индекса
+    """
+    from .vector_index import get_vector_index_service
+    
+    batch_size = batch_size or settings.VECTOR_INDEX_REBUILD_CHUNK_SIZE
+    service = get_vector_index_service()
+    upserted = 0
+    
+    # Один flush индекса на весь импорт
+    with service.batch():
+        for start in range(0, len(ids), batch_size):
+            chunk_ids = [int(entry_id) for entry_id in ids[start:start + batch_size]]
+            
+            entries = list(VectorEntry.objects.filter(id__in=chunk_ids))
+            upserted += service.upsert_vectors(entries)
+    
+    logger.info(f"Refreshed {upserted} imported vectors in index {service.index_name}")
+    return upserted
+
+
+def _strip_npy_suffix(path: str) -> str:
+    """
+    Получение общего префикса файлов выгрузки
+    
+    Args:
+        path: Путь с расширением .npy или без него
+    
+    Returns:
+        str: Префикс пути
+    """
+    return path[:-len('.npy')] if path.endswith('.npy') else path
+
+
+def save_embeddings(path: str, ids: np.ndarray, vectors: np.ndarray) -> Tuple[str, str]:
+    """
+    Сохранение эмбеддингов в файл .npy и ID записей в файл .ids.npy
+    
+    Args:
+        path: Префикс пути к файлам
+        ids: ID записей
+        vectors: Эмбеддинги
+    
+    Returns:
+        Tuple[str, str]: Пути к файлам эмбеддингов и ID
+    """
+    prefix = _strip_npy_suffix(path)
+    vectors_path, ids_path = f"{prefix}.npy", f"{prefix}.ids.npy"
+    
+    np.save(vectors_path, np.ascontiguousarray(vectors, dtype=np.float32))
+    np.save(ids_path, np.asarray(ids, dtype=np.int64))
+    return vectors_path, ids_path
+
+
+def load_embeddings(path: str, mmap: bool = True) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Загрузка эмбеддингов и ID записей из файлов .npy
+    
+    Args:
+        path: Префикс пути к файлам
+        mmap: Отобразить файл эмбеддингов в память вместо чтения
+    
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: ID записей и эмбеддинги
+    """
+    prefix = _strip_npy_suffix(path)
+    vectors = np.load(f"{prefix}.npy", mmap_mode='r' if mmap else None)
+    ids = np.load(f"{prefix}.ids.npy")
+    
+    if len(ids) != len(vectors):
+        raise ValueError(f"Embeddings file has {len(vectors)} rows but ids file has {len(ids)}")
+    return ids, vectors
\ No newline at end of file
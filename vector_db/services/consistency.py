@@ -0,0 +1,159 @@
+import logging
+import numpy as np
+import faiss
+from typing import List, Dict, Optional
+from django.conf import settings
+from .vector_index import BaseVectorIndexService, COMPRESSED_INDEX_TYPES, get_vector_index_service
+from .sharded_index import ShardedVectorIndexService
+
+logger = logging.getLogger(__name__)
+
+# Допустимое отклонение косинусного сходства вектора в индексе от эмбеддинга в БД
+EXACT_TOLERANCE = 1e-3
+COMPRESSED_TOLERANCE = 0.15
+
+# Количество ID каждого вида расхождений в отчете
+REPORT_EXAMPLES = 20
+
+
+class ConsistencyReport:
+    """
+    Расхождения между векторным индексом и таблицей VectorEntry
+    """
+    def __init__(self, index_name: str):
+        self.index_name = index_name
+        self.db_count = 0
+        self.index_count = 0
+        self.sampled = 0
+        self.missing_ids = np.empty(0, dtype=np.int64)
+        self.orphaned_ids = np.empty(0, dtype=np.int64)
+        self.stale_ids = np.empty(0, dtype=np.int64)
+        self.repaired = {}
+    
+    @property
+    def has_drift(self) -> bool:
+        return bool(len(self.missing_ids) or len(self.orphaned_ids) or len(self.stale_ids))
+    
+    def to_dict(self) -> Dict:
+        """
+        Сводка отчета для логов и результата задачи
+        
+        Returns:
+            Dict: Количество расхождений каждого вида и примеры ID
+        """
+        return {
+            'index_name': self.index_name,
+            'db_count': self.db_count,
+            'index_count': self.index_count,
+            'sampled': self.sampled,
+            'missing': len(self.missing_ids),
+            'orphaned': len(self.orphaned_ids),
+            'stale': len(self.stale_ids),
+            'missing_examples': self.missing_ids[:REPORT_EXAMPLES].tolist(),
+            'orphaned_examples': self.orphaned_ids[:REPORT_EXAMPLES].tolist(),
+            'stale_examples': self.stale_ids[:REPORT_EXAMPLES].tolist(),
+            'repaired': self.repaired
+        }
+
+
+def check_index(service: BaseVectorIndexService, sample_size: int = None) -> ConsistencyReport:
+    """
+    Сравнение набора ID и выборки векторов индекса с таблицей VectorEntry
+    
+    Args:
+        service: Сервис индекса (или шарда)
+        sample_size: Количество записей для сравнения векторов
+        
+    Returns:
+        ConsistencyReport: Отчет о расхождениях
+    """
+    sample_size = settings.VECTOR_INDEX_CHECK_SAMPLE_SIZE if sample_size is None else sample_size
+    report = ConsistencyReport(service.index_name)
+    
+    # В индекс попадают только записи с эмбеддингом нужной размерности
+    entries = service._get_entries().filter(embedding__len=service.dimension)
+    db_ids = np.sort(np.array(entries.values_list('id', flat=True), dtype=np.int64))
+    index_ids = np.asarray(service.get_entry_ids(), dtype=np.int64)
+    
+    report.db_count = len(db_ids)
+    report.index_count = len(index_ids)
+    report.missing_ids = np.setdiff1d(db_ids, index_ids)
+    report.orphaned_ids = np.setdiff1d(index_ids, db_ids)
+    
+    common_ids = np.intersect1d(db_ids, index_ids)
+    if sample_size and len(common_ids):
+        if len(common_ids) > sample_size:
+            common_ids = np.sort(np.random.default_rng().choice(common_ids, sample_size, replace=False))
+        
+        rows = dict(entries.filter(id__in=common_ids.tolist()).values_list('id', 'embedding'))
+        sample_ids = np.array([entry_id for entry_id in common_ids.tolist() if entry_id in rows], dtype=np.int64)
+        
+        db_vectors = np.array([rows[entry_id] for entry_id in sample_ids.tolist()], dtype=np.float32).reshape(-1, service.dimension)
+        faiss.normalize_L2(db_vectors)
+        index_vectors = service.reconstruct_vectors(sample_ids)
+        
+        tolerance = COMPRESSED_TOLERANCE if service.index_type in COMPRESSED_INDEX_TYPES else EXACT_TOLERANCE
+        similarity = (db_vectors * index_vectors).sum(axis=1)
+        
+        report.sampled = len(sample_ids)
+        report.stale_ids = sample_ids[similarity < 1 - tolerance]
+    
+    return report
+
+
+def reconcile_index(service: BaseVectorIndexService, report: ConsistencyReport, batch_size: int = None) -> Dict:
+    """
+    Исправление расхождений пакетными добавлениями и удалениями без полного перестроения
+    
+    Args:
+        service: Сервис индекса (или шарда)
+        report: Отчет check_index
+        batch_size: Количество записей в одном пакете
+        
+    Returns:
+        Dict: Количество добавленных, обновленных и удаленных векторов
+    """
+    batch_size = batch_size or settings.VECTOR_INDEX_RECONCILE_BATCH_SIZE
+    repaired = {'added': 0, 'updated': 0, 'removed': 0}
+    
+    with service.batch():
+        for key, ids in (('added', report.missing_ids), ('updated', report.stale_ids)):
+            for start in range(0, len(ids), batch_size):
+                batch_ids = ids[start:start + batch_size].tolist()
+                entries = list(service._get_entries().filter(id__in=batch_ids))
+                repaired[key] += service.upsert_vectors(entries)
+        
+        for start in range(0, len(report.orphaned_ids), batch_size):
+            repaired['removed'] += service.remove_vectors(report.orphaned_ids[start:start + batch_size].tolist())
+    
+    report.repaired = repaired
+    return repaired
+
+
+def check_vector_index(repair: bool = False, sample_size: int = None,
+                       service: Optional[BaseVectorIndexService] = None) -> List[ConsistencyReport]:
+    """
+    Проверка векторного индекса (всех шардов) с необязательным исправлением расхождений
+    
+    Args:
+        repair: Исправить найденные расхождения
+        sample_size: Количество записей каждого индекса для сравнения векторов
+        service: Сервис индекса (по умолчанию get_vector_index_service())
+        
+    Returns:
+        List[ConsistencyReport]: Отчеты по индексу или по каждому шарду
+    """
+    service = service or get_vector_index_service()
+    services = list(service.shards.values()) if isinstance(service, ShardedVectorIndexService) else [service]
+    
+    reports = []
+    for index_service in services:
+        report = check_index(index_service, sample_size)
+        if report.has_drift:
+            logger.warning(f"Vector index drift detected: {report.to_dict()}")
+            if repair:
+                reconcile_index(index_service, report)
+                logger.info(f"Repaired vector index {report.index_name}: {report.repaired}")
+        reports.append(report)
+    
+    return reports
\ No newline at end of file
@@ -22,15 +22,15 @@ class EmbeddingsService:
             'anthropic-version': '2023-06-01'
         }
     
-    def generate_embedding(self, text: str) -> Optional[List[float]]:
+    def _prepare_text(self, text: str) -> Optional[str]:
         """
-        Генерация векторного эмбеддинга для текста
+        Проверка и обрезка текста перед отправкой в API
         
         Args:
             text: Текст для векторизации
             
         Returns:
-            Optional[List[float]]: Векторное представление текста или None в случае ошибки
+            Optional[str]: Текст или None, если он пустой
         """
         if not text:
             logger.warning("Empty text provided for embedding generation")
@@ -41,6 +41,22 @@ class EmbeddingsService:
             logger.warning(f"Text too long ({len(text)} chars), truncating to 32000 chars")
             text = text[:32000]
         
+        return text
+    
+    def generate_embedding(self, text: str) -> Optional[List[float]]:
+        """
+        Генерация векторного эмбеддинга для текста
+        
+        Args:
+            text: Текст для векторизации
+            
+        Returns:
+            Optional[List[float]]: Векторное представление текста или None в случае ошибки
+        """
+        text = self._prepare_text(text)
+        if text is None:
+            return None
+        
         try:
             payload = {
                 'model': self.model,
@@ -63,17 +79,46 @@ class EmbeddingsService:
             logger.error(f"Error generating embedding: {e}")
             return None
     
-    def batch_generate_embeddings(self, texts: List[str]) -> List[Optional[List[float]]]:
+    def batch_generate_embeddings(self, texts: List[str], batch_size: int = None) -> List[Optional[List[float]]]:
         """
         Генерация векторных эмбеддингов для списка текстов
         
+        Тексты отправляются в API списком, по одному запросу на каждые batch_size текстов.
+        
         Args:
             texts: Список текстов для векторизации
+            batch_size: Максимальное количество текстов в одном запросе к API
             
         Returns:
             List[Optional[List[float]]]: Список векторных представлений текстов
+            (None для пустых текстов и текстов, для которых запрос завершился ошибкой)
         """
-        return [self.generate_embedding(text) for text in texts]
+        batch_size = batch_size or settings.EMBEDDINGS_BATCH_SIZE
+        embeddings = [None] * len(texts)
+        
+        prepared = [(i, self._prepare_text(text)) for i, text in enumerate(texts)]
+        prepared = [(i, text) for i, text in prepared if text is not None]
+        
+        for start in range(0, len(prepared), batch_size):
+            chunk = prepared[start:start + batch_size]
+            try:
+                payload = {
+                    'model': self.model,
+                    'input': [text for _, text in chunk],
+                    'encoding_format': 'float'
+                }
+                
+                response = requests.post(self.api_url, json=payload, headers=self.headers)
+                response.raise_for_status()
+                
+                # Порядок эмбеддингов определяется полем index, если API его возвращает
+                result = response.json()
+                for position, item in enumerate(result.get('data', [])):
+                    embeddings[chunk[item.get('index', position)][0]] = item.get('embedding') or None
+            except Exception as e:
+                logger.error(f"Error generating batch of {len(chunk)} embeddings: {e}")
+        
+        return embeddings
 
 
 # Инициализация сервиса
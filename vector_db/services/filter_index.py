@@ -0,0 +1,180 @@
+import logging
+import numpy as np
+from typing import List, Dict, Any, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Поля метаданных, по которым фильтрация выполняется внутри индекса
+INDEXED_METADATA_FIELDS = ('project_id', 'assignee_id')
+
+# Значение поля для записей, в метаданных которых его нет
+MISSING_VALUE = -1
+
+# Диапазон значений полей, хранящихся в индексе
+INT64_MIN, INT64_MAX = np.iinfo(np.int64).min, np.iinfo(np.int64).max
+
+
+class EntryFilterIndex:
+    """
+    Компактный индекс атрибутов векторных записей для фильтрации при поиске в FAISS
+    
+    Для каждой записи хранит код типа сущности, project_id и assignee_id
+    в массивах numpy, упорядоченных по ID записи. Критерии фильтрации
+    компилируются в селектор ID, который FAISS применяет во время поиска.
+    """
+    def __init__(self):
+        self.entity_types = []
+        self.ids = np.empty(0, dtype=np.int64)
+        self.entity_type_codes = np.empty(0, dtype=np.int16)
+        self.fields = {field: np.empty(0, dtype=np.int64) for field in INDEXED_METADATA_FIELDS}
+    
+    def __len__(self) -> int:
+        return len(self.ids)
+    
+    def _get_entity_type_code(self, entity_type: str) -> int:
+        """
+        Получение кода типа сущности с добавлением нового типа в таблицу кодов
+        
+        Args:
+            entity_type: Тип сущности
+        
+        Returns:
+            int: Код типа сущности
+        """
+        if entity_type not in self.entity_types:
+            self.entity_types.append(entity_type)
+        return self.entity_types.index(entity_type)
+    
+    @staticmethod
+    def _to_int(value: Any) -> Optional[int]:
+        """
+        Целочисленное значение метаданных для индекса
+        
+        Строки, дробные и логические значения не приводятся: такие критерии
+        проверяются после поиска точным сравнением, как в _apply_filters.
+        
+        Args:
+            value: Значение
+        
+        Returns:
+            Optional[int]: Целое число или None, если значение не хранится в индексе
+        """
+        if isinstance(value, bool):
+            return None
+        if isinstance(value, float) and value.is_integer():
+            value = int(value)
+        if not isinstance(value, int) or value == MISSING_VALUE or not INT64_MIN <= value <= INT64_MAX:
+            return None
+        return value
+    
+    def upsert(self, rows: List[Tuple[int, str, Dict]]) -> None:
+        """
+        Добавление или замена атрибутов записей
+        
+        Args:
+            rows: Кортежи (ID записи, тип сущности, метаданные)
+        """
+        if not rows:
+            return
+        
+        # Последняя версия записи побеждает, если ID повторяется в пакете
+        rows = list({entry_id: (entry_id, entity_type, metadata) for entry_id, entity_type, metadata in rows}.values())
+        
+        new_ids = np.array([entry_id for entry_id, _, _ in rows], dtype=np.int64)
+        new_codes = np.array([self._get_entity_type_code(entity_type) for _, entity_type, _ in rows], dtype=np.int16)
+        new_fields = {}
+        for field in INDEXED_METADATA_FIELDS:
+            values = [self._to_int((metadata or {}).get(field)) for _, _, metadata in rows]
+            new_fields[field] = np.array([MISSING_VALUE if value is None else value for value in values], dtype=np.int64)
+        
+        keep = ~np.isin(self.ids, new_ids)
+        ids = np.concatenate([self.ids[keep], new_ids])
+        order = np.argsort(ids, kind='stable')
+        
+        self.ids = ids[order]
+        self.entity_type_codes = np.concatenate([self.entity_type_codes[keep], new_codes])[order]
+        for field in INDEXED_METADATA_FIELDS:
+            self.fields[field] = np.concatenate([self.fields[field][keep], new_fields[field]])[order]
+    
+    def remove(self, entry_ids: List[int]) -> None:
+        """
+        Удаление атрибутов записей
+        
+        Args:
+            entry_ids: ID векторных записей
+        """
+        keep = ~np.isin(self.ids, np.asarray(entry_ids, dtype=np.int64))
+        self.ids = self.ids[keep]
+        self.entity_type_codes = self.entity_type_codes[keep]
+        for field in INDEXED_METADATA_FIELDS:
+            self.fields[field] = self.fields[field][keep]
+    
+    def select(self, filter_criteria: Dict) -> Tuple[Optional[np.ndarray], Dict]:
+        """
+        Компиляция критериев фильтрации в набор допустимых ID
+        
+        Args:
+            filter_criteria: Критерии фильтрации ('entity_types', 'metadata')
+        
+        Returns:
+            Tuple[Optional[np.ndarray], Dict]: Допустимые ID (None, если ни один критерий
+            не поддерживается индексом) и критерии, которые нужно проверить после поиска
+        """
+        mask = None
+        residual_metadata = {}
+        
+        entity_types = filter_criteria.get('entity_types')
+        if entity_types:
+            codes = [self.entity_types.index(entity_type) for entity_type in entity_types if entity_type in self.entity_types]
+            mask = np.isin(self.entity_type_codes, np.array(codes, dtype=np.int16))
+        
+        for key, value in (filter_criteria.get('metadata') or {}).items():
+            int_value = self._to_int(value)
+            if key not in INDEXED_METADATA_FIELDS or int_value is None:
+                residual_metadata[key] = value
+                continue
+            
+            field_mask = self.fields[key] == int_value
+            mask = field_mask if mask is None else mask & field_mask
+        
+        residual_criteria = {'metadata': residual_metadata} if residual_metadata else {}
+        
+        if mask is None:
+            return None, residual_criteria
+        return self.ids[mask], residual_criteria
+    
+    def save(self, path: str) -> None:
+        """
+        Сохранение индекса атрибутов в файл .npz
+        
+        Args:
+            path: Путь к файлу
+        """
+        with open(path, 'wb') as f:
+            np.savez(
+                f,
+                ids=self.ids,
+                entity_type_codes=self.entity_type_codes,
+                entity_types=np.array(self.entity_types, dtype=str),
+                **self.fields
+            )
+    
+    @classmethod
+    def load(cls, path: str) -> 'EntryFilterIndex':
+        """
+        Загрузка индекса атрибутов из файла .npz
+        
+        Args:
+            path: Путь к файлу
+        
+        Returns:
+            EntryFilterIndex: Индекс атрибутов
+        """
+        filter_index = cls()
+        with np.load(path) as data:
+            filter_index.ids = data['ids']
+            filter_index.entity_type_codes = data['entity_type_codes']
+            filter_index.entity_types = data['entity_types'].tolist()
+            for field in INDEXED_METADATA_FIELDS:
+                filter_index.fields[field] = data[field]
+        return filter_index
\ No newline at end of file
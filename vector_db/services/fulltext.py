@@ -0,0 +1,41 @@
+import logging
+from typing import List, Optional
+from django.conf import settings
+from django.contrib.postgres.search import SearchVector
+from ..models import VectorEntry
+
+logger = logging.getLogger(__name__)
+
+
+def update_search_vectors(entry_ids: Optional[List[int]] = None, batch_size: int = None) -> int:
+    """
+    Заполнение столбца search_vector (tsvector) по тексту векторных записей
+    
+    Без entry_ids заполняются только пустые значения (записи из bulk_create):
+    save(), update() и bulk_update() пересчитывают search_vector при изменении
+    текста. Текст, измененный в обход ORM, пересчитывается передачей entry_ids.
+    
+    Args:
+        entry_ids: ID записей (по умолчанию все записи без заполненного столбца)
+        batch_size: Количество записей в одном UPDATE при заполнении всех записей
+        
+    Returns:
+        int: Количество обновленных записей
+    """
+    vector = SearchVector('text', config=settings.FULLTEXT_SEARCH_CONFIG)
+    
+    if entry_ids is not None:
+        return VectorEntry.objects.filter(id__in=list(entry_ids)).update(search_vector=vector)
+    
+    # Порции по ID, чтобы не держать одну длинную транзакцию на всей таблице
+    batch_size = batch_size or settings.VECTOR_INDEX_REBUILD_CHUNK_SIZE
+    updated = 0
+    while True:
+        ids = list(VectorEntry.objects.filter(search_vector__isnull=True).order_by('id').values_list('id', flat=True)[:batch_size])
+        if not ids:
+            break
+        
+        updated += VectorEntry.objects.filter(id__in=ids).update(search_vector=vector)
+    
+    logger.info(f"Updated search vectors for {updated} vector entries")
+    return updated
\ No newline at end of file
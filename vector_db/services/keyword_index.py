@@ -0,0 +1,394 @@
+import re
+import math
+import time
+import logging
+import threading
+import numpy as np
+from typing import List, Dict, Optional, Tuple, Iterable
+from django.conf import settings
+from django.db.models import Max
+from ..models import VectorEntry
+
+logger = logging.getLogger(__name__)
+
+# Параметры BM25
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+# Минимальная длина основы слова после отсечения окончания
+MIN_STEM_LENGTH = 3
+
+# Окончания русских слов, отсекаемые при стемминге (сначала длинные)
+RUSSIAN_ENDINGS = tuple(sorted((
+    'иями', 'ями', 'ами', 'ией', 'ием', 'иям', 'иях', 'ого', 'его', 'ому', 'ему', 'ими', 'ыми', 'ться', 'тся',
+    'ешь', 'ишь', 'ете', 'ите', 'ала', 'ало', 'али', 'ила', 'ило', 'или', 'ует', 'уют', 'ение', 'ения', 'ений',
+    'ия', 'ие', 'ий', 'ый', 'ой', 'ая', 'ое', 'ые', 'ых', 'их', 'ам', 'ям', 'ах', 'ях', 'ом', 'ем', 'ов', 'ев',
+    'ей', 'ую', 'юю', 'ья', 'ью', 'ть', 'ет', 'ит', 'ют', 'ат', 'ят', 'ал', 'ил',
+    'а', 'я', 'о', 'е', 'ы', 'и', 'у', 'ю', 'ь', 'й'
+), key=len, reverse=True))
+
+STOP_WORDS = frozenset((
+    'и', 'в', 'во', 'не', 'что', 'он', 'на', 'я', 'с', 'со', 'как', 'а', 'то', 'все', 'она', 'так', 'его', 'но',
+    'да', 'ты', 'к', 'у', 'же', 'вы', 'за', 'бы', 'по', 'только', 'ее', 'мне', 'было', 'вот', 'от', 'меня', 'еще',
+    'нет', 'о', 'из', 'ему', 'когда', 'даже', 'ну', 'ли', 'если', 'уже', 'или', 'ни', 'быть', 'был', 'него', 'до',
+    'вас', 'там', 'потом', 'себя', 'ей', 'может', 'они', 'тут', 'где', 'есть', 'надо', 'ней', 'для', 'мы', 'их',
+    'чем', 'была', 'без', 'чего', 'тоже', 'себе', 'под', 'будет', 'тогда', 'кто', 'этот', 'того', 'этого', 'какой',
+    'ним', 'здесь', 'этом', 'при', 'об', 'после', 'над', 'через', 'эти', 'нас', 'про', 'них', 'какая', 'эту',
+    'этой', 'перед', 'том', 'такой', 'им', 'между',
+    'the', 'a', 'an', 'and', 'or', 'of', 'to', 'in', 'on', 'for', 'is', 'are', 'with', 'by', 'at', 'be'
+))
+
+TOKEN_PATTERN = re.compile(r'[^\W_]+')
+CYRILLIC_PATTERN = re.compile(r'[а-я]')
+
+
+def stem(token: str) -> str:
+    """
+    Легкий стемминг: отсечение одного окончания русского слова
+    
+    Латинские слова и числа (в том числе номера задач) не изменяются.
+    
+    Args:
+        token: Слово в нижнем регистре
+    
+    Returns:
+        str: Основа слова
+    """
+    if not CYRILLIC_PATTERN.search(token):
+        return token
+    
+    for ending in RUSSIAN_ENDINGS:
+        if token.endswith(ending) and len(token) - len(ending) >= MIN_STEM_LENGTH:
+            return token[:-len(ending)]
+    return token
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Разбиение текста на нормализованные термы
+    
+    Args:
+        text: Текст
+    
+    Returns:
+        List[str]: Основы слов без стоп-слов в порядке следования
+    """
+    tokens = TOKEN_PATTERN.findall((text or '').lower().replace('ё', 'е'))
+    return [
+        stem(token) for token in tokens
+        if token not in STOP_WORDS and (len(token) > 1 or token.isdigit())
+    ]
+
+
+class KeywordIndex:
+    """
+    Инвертированный индекс текстов векторных записей с ранжированием BM25
+    
+    Записи занимают позиции (слоты) в массивах numpy с длинами текстов
+    и кодами типов сущностей, а списки вхождений термов хранятся массивами
+    слотов и частот, поэтому вклад терма в оценки считается одной векторной
+    операцией. Новые вхождения накапливаются в списках и сливаются в массивы
+    при первом поиске по терму, слоты удаленных записей исключаются маской
+    и вычищаются при накоплении. Изменения, сделанные другими процессами,
+    подхватываются периодически по VectorEntry.updated_at.
+    """
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._synced_at = None
+        self._checked_at = 0.0
+        self._clear()
+    
+    def _clear(self) -> None:
+        """
+        Удаление всех записей из индекса
+        """
+        # Слоты записей и атрибуты по слотам
+        self._slots = {}
+        self._size = 0
+        self._dead_count = 0
+        self._entry_ids = np.empty(0, dtype=np.int64)
+        self._lengths = np.empty(0, dtype=np.float32)
+        self._type_codes = np.empty(0, dtype=np.int16)
+        self._alive = np.empty(0, dtype=bool)
+        self._entity_types = []
+        
+        # Вхождения термов: массивы (слоты, частоты) и еще не слитые списки
+        self._postings = {}
+        self._pending = {}
+        self._doc_freq = {}
+        self._doc_terms = {}
+        self._total_length = 0
+    
+    def __len__(self) -> int:
+        return len(self._slots)
+    
+    def _allocate_slot(self, entry_id: int, entity_type: str, length: int) -> int:
+        """
+        Выделение слота для записи с увеличением массивов при необходимости
+        
+        Args:
+            entry_id: ID записи
+            entity_type: Тип сущности
+            length: Количество термов в тексте
+        
+        Returns:
+            int: Слот записи
+        """
+        if self._size == len(self._entry_ids):
+            capacity = max(1024, 2 * len(self._entry_ids))
+            self._entry_ids = np.resize(self._entry_ids, capacity)
+            self._lengths = np.resize(self._lengths, capacity)
+            self._type_codes = np.resize(self._type_codes, capacity)
+            self._alive = np.resize(self._alive, capacity)
+        
+        if entity_type not in self._entity_types:
+            self._entity_types.append(entity_type)
+        
+        slot = self._size
+        self._size += 1
+        self._slots[entry_id] = slot
+        self._entry_ids[slot] = entry_id
+        self._lengths[slot] = length
+        self._type_codes[slot] = self._entity_types.index(entity_type)
+        self._alive[slot] = True
+        return slot
+    
+    def upsert(self, rows: Iterable[Tuple[int, str, str]]) -> None:
+        """
+        Добавление или замена текстов записей
+        
+        Args:
+            rows: Кортежи (ID записи, тип сущности, текст)
+        """
+        with self._lock:
+            for entry_id, entity_type, text in rows:
+                self._remove_one(entry_id)
+                
+                terms = tokenize(text)
+                if not terms:
+                    continue
+                
+                frequencies = {}
+                for term in terms:
+                    frequencies[term] = frequencies.get(term, 0) + 1
+                
+                slot = self._allocate_slot(entry_id, entity_type, len(terms))
+                for term, frequency in frequencies.items():
+                    slots, term_frequencies = self._pending.setdefault(term, ([], []))
+                    slots.append(slot)
+                    term_frequencies.append(frequency)
+                    self._doc_freq[term] = self._doc_freq.get(term, 0) + 1
+                
+                self._doc_terms[slot] = tuple(frequencies)
+                self._total_length += len(terms)
+            
+            self._compact_if_needed()
+    
+    def remove(self, entry_ids: Iterable[int]) -> None:
+        """
+        Удаление записей из индекса
+        
+        Args:
+            entry_ids: ID векторных записей
+        """
+        with self._lock:
+            for entry_id in entry_ids:
+                self._remove_one(int(entry_id))
+            self._compact_if_needed()
+    
+    def _remove_one(self, entry_id: int) -> None:
+        slot = self._slots.pop(entry_id, None)
+        if slot is None:
+            return
+        
+        for term in self._doc_terms.pop(slot):
+            doc_freq = self._doc_freq[term] - 1
+            if doc_freq:
+                self._doc_freq[term] = doc_freq
+            else:
+                del self._doc_freq[term]
+                self._postings.pop(term, None)
+                self._pending.pop(term, None)
+        
+        self._total_length -= int(self._lengths[slot])
+        self._alive[slot] = False
+        self._dead_count += 1
+    
+    def _compact_if_needed(self) -> None:
+        """
+        Удаление слотов удаленных записей при их накоплении
+        
+        Слоты перенумеровываются подряд, вхождения термов сливаются
+        и очищаются от удаленных записей.
+        """
+        if self._dead_count <= max(1024, self._size // 4):
+            return
+        
+        live = np.flatnonzero(self._alive[:self._size])
+        new_slots = np.full(self._size, -1, dtype=np.int64)
+        new_slots[live] = np.arange(len(live))
+        
+        for term in list(self._doc_freq):
+            slots, frequencies = self._get_postings(term)
+            keep = self._alive[slots]
+            self._postings[term] = (new_slots[slots[keep]].astype(np.int32), frequencies[keep])
+        
+        self._doc_terms = {int(new_slots[slot]): terms for slot, terms in self._doc_terms.items()}
+        self._slots = {entry_id: int(new_slots[slot]) for entry_id, slot in self._slots.items()}
+        self._entry_ids = self._entry_ids[live]
+        self._lengths = self._lengths[live]
+        self._type_codes = self._type_codes[live]
+        self._alive = self._alive[live]
+        self._size = len(live)
+        self._dead_count = 0
+    
+    def _get_postings(self, term: str) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+        """
+        Вхождения терма с предварительным слиянием накопленных списков
+        
+        Args:
+            term: Терм
+        
+        Returns:
+            Optional[Tuple[np.ndarray, np.ndarray]]: Слоты записей и частоты терма
+        """
+        postings = self._postings.get(term)
+        pending = self._pending.pop(term, None)
+        if pending is not None:
+            slots = np.array(pending[0], dtype=np.int32)
+            frequencies = np.array(pending[1], dtype=np.float32)
+            if postings is not None:
+                slots = np.concatenate([postings[0], slots])
+                frequencies = np.concatenate([postings[1], frequencies])
+            postings = (slots, frequencies)
+            self._postings[term] = postings
+        return postings
+    
+    def search(self, query: str, top_k: int = 10, entity_types: Optional[List[str]] = None) -> List[Tuple[int, float]]:
+        """
+        Поиск записей по ключевым словам с ранжированием BM25
+        
+        Args:
+            query: Текст запроса
+            top_k: Количество результатов
+            entity_types: Допустимые типы сущностей
+        
+        Returns:
+            List[Tuple[int, float]]: Пары (ID записи, оценка) по убыванию оценки
+        """
+        self.refresh()
+        
+        terms = set(tokenize(query))
+        with self._lock:
+            doc_count = len(self._slots)
+            if not terms or not doc_count:
+                return []
+            
+            average_length = self._total_length / doc_count
+            scores = np.zeros(self._size, dtype=np.float32)
+            for term in terms:
+                postings = self._get_postings(term)
+                if postings is None:
+                    continue
+                
+                slots, frequencies = postings
+                doc_freq = self._doc_freq[term]
+                idf = math.log(1 + (doc_count - doc_freq + 0.5) / (doc_freq + 0.5))
+                norms = BM25_K1 * (1 - BM25_B + BM25_B * self._lengths[slots] / average_length)
+                scores[slots] += idf * frequencies * (BM25_K1 + 1) / (frequencies + norms)
+            
+            mask = self._alive[:self._size]
+            if entity_types:
+                codes = [self._entity_types.index(entity_type) for entity_type in entity_types if entity_type in self._entity_types]
+                mask = mask & np.isin(self._type_codes[:self._size], codes)
+            scores[~mask] = 0
+            
+            candidates = np.flatnonzero(scores)
+            if len(candidates) > top_k:
+                candidates = candidates[np.argpartition(-scores[candidates], top_k - 1)[:top_k]]
+            candidates = candidates[np.argsort(-scores[candidates], kind='stable')]
+            
+            return [(int(self._entry_ids[slot]), float(scores[slot])) for slot in candidates]
+    
+    def load(self) -> None:
+        """
+        Построение индекса по всем векторным записям
+        """
+        chunk_size = settings.VECTOR_INDEX_REBUILD_CHUNK_SIZE
+        synced_at = VectorEntry.objects.aggregate(latest=Max('updated_at'))['latest']
+        
+        rows = VectorEntry.objects.values_list('id', 'entity_type', 'text').iterator(chunk_size=chunk_size)
+        with self._lock:
+            self._clear()
+            self.upsert(rows)
+            self._synced_at = synced_at
+            self._checked_at = time.monotonic()
+        
+        logger.info(f"Loaded keyword index with {len(self)} entries and {len(self._doc_freq)} terms")
+    
+    def refresh(self, force: bool = False) -> int:
+        """
+        Загрузка записей, измененных после последнего обновления индекса
+        
+        Выполняется не чаще раза в KEYWORD_INDEX_REFRESH_INTERVAL секунд.
+        
+        Args:
+            force: Обновить независимо от интервала
+        
+        Returns:
+            int: Количество обновленных записей
+        """
+        with self._lock:
+            if not force and time.monotonic() - self._checked_at < settings.KEYWORD_INDEX_REFRESH_INTERVAL:
+                return 0
+            self._checked_at = time.monotonic()
+            synced_at = self._synced_at
+        
+        entries = VectorEntry.objects.all()
+        if synced_at is not None:
+            # Записи с той же отметкой времени могли сохраниться после прошлого обновления
+            entries = entries.filter(updated_at__gte=synced_at)
+        
+        rows = list(entries.values_list('id', 'entity_type', 'text', 'updated_at'))
+        if not rows:
+            return 0
+        
+        with self._lock:
+            self.upsert((entry_id, entity_type, text) for entry_id, entity_type, text, _ in rows)
+            latest = max(updated_at for _, _, _, updated_at in rows)
+            if self._synced_at is None or latest > self._synced_at:
+                self._synced_at = latest
+        
+        return len(rows)
+
+
+# Инициализация индекса
+_keyword_index = None
+_keyword_index_lock = threading.Lock()
+
+def get_keyword_index() -> KeywordIndex:
+    """
+    Получение экземпляра индекса ключевых слов, загружаемого при первом обращении
+    
+    Returns:
+        KeywordIndex: Экземпляр индекса
+    """
+    global _keyword_index
+    if _keyword_index is None:
+        with _keyword_index_lock:
+            if _keyword_index is None:
+                keyword_index = KeywordIndex()
+                keyword_index.load()
+                _keyword_index = keyword_index
+    return _keyword_index
+
+
+def update_keyword_index(entries: List[VectorEntry]) -> None:
+    """
+    Обновление индекса ключевых слов измененными записями, если он загружен в этом процессе
+    
+    Args:
+        entries: Векторные записи
+    """
+    if _keyword_index is not None:
+        _keyword_index.upsert((entry.id, entry.entity_type, entry.text) for entry in entries if entry is not None)
\ No newline at end of file
@@ -0,0 +1,528 @@
+import json
+import time
+import logging
+import numpy as np
+from typing import List, Dict, Optional, Callable
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import F
+from django_redis import get_redis_connection
+from ..models import VectorEntry, VectorIndex
+from .vector_index import BaseVectorIndexService, record_timing
+
+logger = logging.getLogger(__name__)
+
+# Типы индексов pgvector, выбираемые через VectorIndex.config['index']
+PGVECTOR_INDEX_TYPES = ('hnsw', 'ivfflat')
+
+# Параметры индекса по умолчанию
+DEFAULT_PGVECTOR_CONFIG = {
+    'metric': 'cosine',
+    'index': 'hnsw',
+    'M': 16,  # HNSW: количество связей узла графа
+    'ef_construction': 64,  # HNSW: ширина поиска при построении
+    'ef_search': 40,  # HNSW: ширина поиска при запросе
+    'lists': 100,  # IVFFlat: количество кластеров
+    'probes': 10  # IVFFlat: количество просматриваемых кластеров
+}
+
+# Столбец VectorEntry с эмбеддингом типа vector
+VECTOR_COLUMN = 'embedding_vector'
+
+# Режимы итеративного сканирования (pgvector >= 0.8), поддерживаемые типами индексов
+ITERATIVE_SCAN_MODES = {
+    'hnsw': ('off', 'strict_order', 'relaxed_order'),
+    'ivfflat': ('off', 'relaxed_order')
+}
+
+
+def _format_vector(vector: np.ndarray) -> str:
+    """
+    Текстовое представление вектора для приведения к типу vector
+    
+    Args:
+        vector: Вектор
+    
+    Returns:
+        str: Вектор в формате '[x1,x2,...]'
+    """
+    return '[' + ','.join(repr(float(value)) for value in vector) + ']'
+
+
+class PgVectorIndexService(BaseVectorIndexService):
+    """
+    Сервис векторного индекса, хранящего эмбеддинги в Postgres (расширение pgvector)
+    
+    Векторы хранятся в столбце embedding_vector таблицы VectorEntry с индексом
+    HNSW или IVFFlat, поэтому процессы не держат собственных копий индекса,
+    а фильтры по типу сущности и метаданным выполняются в том же запросе SQL.
+    
+    Расширение, столбец и индекс создаются командой setup_pgvector,
+    сервис при запуске только проверяет схему.
+    """
+    def __init__(self, index_name='default', dimension=None):
+        super().__init__(index_name, dimension)
+        self.config = dict(DEFAULT_PGVECTOR_CONFIG)
+        self.iterative_scan = ''
+        
+        # Последнее прочитанное поколение и время его чтения (см. get_generation)
+        self._generation = None
+        self._generation_read_at = 0.0
+        
+        self.table = connection.ops.quote_name(VectorEntry._meta.db_table)
+        
+        self._load_or_create_index()
+    
+    @property
+    def ann_index_name(self) -> str:
+        """
+        Имя индекса Postgres по столбцу векторов
+        """
+        return f"{VectorEntry._meta.db_table}_{VECTOR_COLUMN}_{self.index_type}"
+    
+    def _load_or_create_index(self) -> None:
+        """
+        Загрузка конфигурации индекса и подготовка столбца и индекса pgvector
+        """
+        try:
+            vector_index, created = VectorIndex.objects.get_or_create(
+                name=self.index_name,
+                defaults={
+                    'index_type': 'pgvector',
+                    'dimension': self.dimension,
+                    'entity_types': [],
+                    'config': {'metric': 'cosine', 'index': settings.PGVECTOR_INDEX_TYPE},
+                    'is_active': True
+                }
+            )
+            
+            # Конфигурация индекса FAISS не переносится на pgvector
+            if vector_index.index_type != 'pgvector' or vector_index.dimension != self.dimension:
+                if vector_index.index_type != 'pgvector':
+                    vector_index.config = {'metric': 'cosine', 'index': settings.PGVECTOR_INDEX_TYPE}
+                vector_index.index_type = 'pgvector'
+                vector_index.dimension = self.dimension
+                vector_index.save()
+            
+            self.config = {**DEFAULT_PGVECTOR_CONFIG, **vector_index.config}
+            if self.index_type not in PGVECTOR_INDEX_TYPES:
+                logger.error(f"Unsupported pgvector index type {self.index_type}, falling back to hnsw")
+                self.config['index'] = 'hnsw'
+            
+            self.iterative_scan = self._get_iterative_scan_mode()
+            
+            # Схема создается командой setup_pgvector, а не при запуске процесса
+            column_type = self._get_column_type()
+            if column_type is None:
+                logger.error(f"Column {VECTOR_COLUMN} does not exist, run manage.py setup_pgvector")
+            elif column_type != self._expected_column_type():
+                logger.error(f"Column {VECTOR_COLUMN} has type {column_type}, expected {self._expected_column_type()}, "
+                             f"run manage.py setup_pgvector")
+        except Exception as e:
+            logger.error(f"Error preparing pgvector index: {e}")
+    
+    def _get_iterative_scan_mode(self) -> str:
+        """
+        Проверенный режим итеративного сканирования из PGVECTOR_ITERATIVE_SCAN
+        
+        Returns:
+            str: Режим или пустая строка, если сканирование выключено или режим не поддерживается
+        """
+        mode = settings.PGVECTOR_ITERATIVE_SCAN
+        if mode and mode not in ITERATIVE_SCAN_MODES[self.index_type]:
+            logger.error(f"Unsupported PGVECTOR_ITERATIVE_SCAN {mode!r} for {self.index_type} index, "
+                         f"expected one of {ITERATIVE_SCAN_MODES[self.index_type]}")
+            return ''
+        return mode
+    
+    def _expected_column_type(self) -> str:
+        """
+        Тип столбца векторов для размерности индекса
+        """
+        return f"vector({int(self.dimension)})"
+    
+    def _get_column_type(self) -> Optional[str]:
+        """
+        Тип столбца векторов в таблице VectorEntry
+        
+        Returns:
+            Optional[str]: Тип столбца или None, если столбца нет
+        """
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT format_type(atttypid, atttypmod) FROM pg_attribute "
+                "WHERE attrelid = %s::regclass AND attname = %s AND NOT attisdropped",
+                [VectorEntry._meta.db_table, VECTOR_COLUMN]
+            )
+            row = cursor.fetchone()
+            return row[0] if row is not None else None
+    
+    def setup_schema(self) -> bool:
+        """
+        Создание расширения, столбца векторов нужной размерности и индекса по нему
+        
+        Вызывается командой setup_pgvector при развертывании.
+        
+        Returns:
+            bool: Был ли столбец создан заново и требует заполнения
+        """
+        with connection.cursor() as cursor:
+            cursor.execute("CREATE EXTENSION IF NOT EXISTS vector")
+            
+            current_type = self._get_column_type()
+            column_type = self._expected_column_type()
+            
+            created = False
+            if current_type != column_type:
+                if current_type is not None:
+                    logger.warning(f"Column {VECTOR_COLUMN} has type {current_type}, expected {column_type}, recreating")
+                    cursor.execute(f"ALTER TABLE {self.table} DROP COLUMN {VECTOR_COLUMN}")
+                cursor.execute(f"ALTER TABLE {self.table} ADD COLUMN {VECTOR_COLUMN} {column_type}")
+                created = True
+            
+            # Индекс другого типа, оставшийся от прежней конфигурации
+            for index_type in PGVECTOR_INDEX_TYPES:
+                if index_type != self.index_type:
+                    cursor.execute(f"DROP INDEX IF EXISTS {VectorEntry._meta.db_table}_{VECTOR_COLUMN}_{index_type}")
+        
+        # Кластеры IVFFlat строятся по уже заполненному столбцу
+        if not created and (self.index_type == 'hnsw' or self._count_vectors()):
+            self._create_ann_index()
+        
+        return created
+    
+    def _create_ann_index(self) -> None:
+        """
+        Создание индекса HNSW или IVFFlat по столбцу векторов, если его нет
+        """
+        if self.index_type == 'hnsw':
+            method = 'hnsw'
+            options = f"m = {int(self.config['M'])}, ef_construction = {int(self.config['ef_construction'])}"
+        else:
+            method = 'ivfflat'
+            options = f"lists = {int(self.config['lists'])}"
+        
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"CREATE INDEX IF NOT EXISTS {self.ann_index_name} ON {self.table} "
+                f"USING {method} ({VECTOR_COLUMN} vector_cosine_ops) WITH ({options})"
+            )
+    
+    def _count_vectors(self) -> int:
+        """
+        Количество записей с заполненным вектором
+        """
+        with connection.cursor() as cursor:
+            cursor.execute(f"SELECT count(*) FROM {self.table} WHERE {VECTOR_COLUMN} IS NOT NULL")
+            return cursor.fetchone()[0]
+    
+    def _get_generation_key(self) -> str:
+        """
+        Ключ Redis со счетчиком поколений индекса
+        """
+        return f"vector_index:{self.index_name}:pg_generation"
+    
+    def _get_stored_generation(self) -> int:
+        """
+        Поколение индекса, сохраненное в БД при последнем перестроении
+        """
+        generation = VectorIndex.objects.filter(name=self.index_name).values_list('generation', flat=True).first()
+        return generation or 0
+    
+    def _set_generation(self, generation: int) -> None:
+        """
+        Запоминание прочитанного или записанного этим процессом поколения
+        """
+        self._generation = generation
+        self._generation_read_at = time.monotonic()
+    
+    def _bump_generation(self, persist: bool = False) -> None:
+        """
+        Увеличение поколения индекса после изменения векторов
+        
+        Изменения видны всем процессам сразу, поэтому поколение общее для них
+        и хранится в счетчике Redis. В БД оно записывается только при перестроении
+        и если Redis недоступен.
+        
+        Args:
+            persist: Записать новое поколение в БД
+        """
+        try:
+            redis = get_redis_connection('default')
+            key = self._get_generation_key()
+            generation = redis.incr(key)
+            if generation == 1:
+                # Счетчика не было (Redis очищен): он продолжается от поколения из БД
+                generation = redis.incrby(key, self._get_stored_generation())
+        except Exception as e:
+            logger.warning(f"Error incrementing pgvector index generation in Redis: {e}")
+            VectorIndex.objects.filter(name=self.index_name).update(generation=F('generation') + 1)
+            self._set_generation(self._get_stored_generation())
+            return
+        
+        if persist:
+            VectorIndex.objects.filter(name=self.index_name).update(generation=generation)
+        self._set_generation(generation)
+    
+    def get_generation(self) -> int:
+        """
+        Поколение индекса, общее для всех процессов
+        
+        Значение читается из Redis не чаще чем раз в PGVECTOR_GENERATION_TTL секунд,
+        поэтому изменения других процессов становятся видны кэшу результатов
+        с этой задержкой. Изменения этого процесса видны сразу.
+        
+        Returns:
+            int: Номер поколения (увеличивается при каждом изменении векторов)
+        """
+        if self._generation is not None and time.monotonic() - self._generation_read_at < settings.PGVECTOR_GENERATION_TTL:
+            return self._generation
+        
+        try:
+            generation = get_redis_connection('default').get(self._get_generation_key())
+            generation = int(generation) if generation is not None else self._get_stored_generation()
+        except Exception as e:
+            logger.warning(f"Error reading pgvector index generation from Redis: {e}")
+            generation = self._get_stored_generation()
+        
+        self._set_generation(generation)
+        return generation
+    
+    def _vector_expression(self) -> str:
+        """
+        Приведение эмбеддинга записи к типу vector (NULL для другой размерности)
+        """
+        return f"CASE WHEN cardinality(embedding) = {int(self.dimension)} THEN embedding::vector({int(self.dimension)}) END"
+    
+    def rebuild(self, progress_callback: Optional[Callable[[int, int], None]] = None) -> int:
+        """
+        Заполнение столбца векторов из эмбеддингов и пересоздание индекса по нему
+        
+        Индекс удаляется на время заполнения, чтобы не перестраиваться
+        на каждой строке; поиск в это время выполняется точным перебором.
+        
+        Args:
+            progress_callback: Функция, получающая количество обработанных и всех записей
+        
+        Returns:
+            int: Количество векторов в индексе
+        """
+        chunk_size = settings.VECTOR_INDEX_REBUILD_CHUNK_SIZE
+        
+        with connection.cursor() as cursor:
+            cursor.execute(f"SELECT count(*) FROM {self.table}")
+            total = cursor.fetchone()[0]
+            
+            cursor.execute(f"DROP INDEX IF EXISTS {self.ann_index_name}")
+            
+            # Порции по диапазонам ID, чтобы не держать одну длинную транзакцию
+            processed = 0
+            last_id = 0
+            while True:
+                cursor.execute(
+                    f"SELECT max(id), count(*) FROM (SELECT id FROM {self.table} WHERE id > %s ORDER BY id LIMIT %s) AS chunk",
+                    [last_id, chunk_size]
+                )
+                upper_id, count = cursor.fetchone()
+                if not count:
+                    break
+                
+                cursor.execute(
+                    f"UPDATE {self.table} SET {VECTOR_COLUMN} = {self._vector_expression()} WHERE id > %s AND id <= %s",
+                    [last_id, upper_id]
+                )
+                processed += count
+                last_id = upper_id
+                
+                if progress_callback is not None:
+                    progress_callback(processed, max(total, processed))
+        
+        self._create_ann_index()
+        self._bump_generation(persist=True)
+        
+        count = self._count_vectors()
+        logger.info(f"Rebuilt pgvector {self.index_type} index {self.index_name} with {count} vectors")
+        return count
+    
+    def reload(self) -> bool:
+        """
+        Изменения записываются в БД и видны всем процессам сразу, загружать нечего
+        
+        Returns:
+            bool: Всегда False
+        """
+        return False
+    
+    def upsert_vectors(self, entries: List[VectorEntry]) -> int:
+        """
+        Запись векторов из сохраненных эмбеддингов записей в столбец pgvector
+        
+        Args:
+            entries: Векторные записи, уже сохраненные в БД
+        
+        Returns:
+            int: Количество записанных векторов
+        """
+        entry_ids = [entry.id for entry in entries if entry is not None and entry.embedding]
+        if not entry_ids:
+            return 0
+        
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    f"UPDATE {self.table} SET {VECTOR_COLUMN} = {self._vector_expression()} "
+                    f"WHERE id = ANY(%s) RETURNING {VECTOR_COLUMN} IS NOT NULL",
+                    [entry_ids]
+                )
+                updated = sum(1 for (stored,) in cursor.fetchall() if stored)
+            
+            self._bump_generation()
+            return updated
+        except Exception as e:
+            logger.error(f"Error upserting vectors to pgvector index: {e}")
+            return 0
+    
+    def remove_vectors(self, entry_ids: List[int]) -> int:
+        """
+        Исключение векторов записей из индекса
+        
+        Args:
+            entry_ids: ID векторных записей
+        
+        Returns:
+            int: Количество исключенных векторов
+        """
+        if not entry_ids:
+            return 0
+        
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    f"UPDATE {self.table} SET {VECTOR_COLUMN} = NULL WHERE id = ANY(%s) AND {VECTOR_COLUMN} IS NOT NULL",
+                    [[int(entry_id) for entry_id in entry_ids]]
+                )
+                removed = cursor.rowcount
+            
+            if removed:
+                self._bump_generation()
+            return removed
+        except Exception as e:
+            logger.error(f"Error removing vectors from pgvector index: {e}")
+            return 0
+    
+    def get_entry_ids(self) -> np.ndarray:
+        """
+        Получение ID записей с заполненным вектором
+        
+        Returns:
+            np.ndarray: Отсортированные ID записей
+        """
+        with connection.cursor() as cursor:
+            cursor.execute(f"SELECT id FROM {self.table} WHERE {VECTOR_COLUMN} IS NOT NULL ORDER BY id")
+            return np.array([row[0] for row in cursor.fetchall()], dtype=np.int64)
+    
+    def reconstruct_vectors(self, entry_ids: np.ndarray) -> np.ndarray:
+        """
+        Получение нормализованных векторов, хранящихся в столбце pgvector
+        
+        Args:
+            entry_ids: ID записей с заполненным вектором
+        
+        Returns:
+            np.ndarray: Векторы в порядке ID
+        """
+        if not len(entry_ids):
+            return np.empty((0, self.dimension), dtype=np.float32)
+        
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"SELECT id, {VECTOR_COLUMN}::real[] FROM {self.table} WHERE id = ANY(%s)",
+                [[int(entry_id) for entry_id in entry_ids]]
+            )
+            rows = dict(cursor.fetchall())
+        
+        vectors = np.array([rows[int(entry_id)] for entry_id in entry_ids], dtype=np.float32)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors / np.maximum(norms, 1e-12)
+    
+    def search_vectors(self, query_vectors: np.ndarray, top_k: int = 10, filter_criteria: Dict = None,
+                       nprobe: Optional[int] = None, ef_search: Optional[int] = None,
+                       timings: Optional[Dict[str, float]] = None) -> List[List[Dict]]:
+        """
+        Поиск ближайших записей по косинусному расстоянию с фильтрами в том же запросе
+        
+        Данные записей и фильтры входят в тот же SQL-запрос, поэтому
+        весь поиск учитывается как index_search_ms.
+        
+        Args:
+            query_vectors: Векторы запросов (по одному в строке)
+            top_k: Количество результатов для каждого запроса
+            filter_criteria: Критерии фильтрации ('entity_types', 'metadata')
+            nprobe: IVFFlat: количество просматриваемых кластеров
+            ef_search: HNSW: ширина поиска
+            timings: Словарь, в который добавляются длительности этапов в миллисекундах
+        
+        Returns:
+            List[List[Dict]]: Результаты поиска для каждого запроса
+        """
+        filter_criteria = filter_criteria or {}
+        
+        conditions = [f"{VECTOR_COLUMN} IS NOT NULL"]
+        filter_params = []
+        if filter_criteria.get('entity_types'):
+            conditions.append("entity_type = ANY(%s)")
+            filter_params.append(list(filter_criteria['entity_types']))
+        
+        # Значения метаданных сравниваются на равенство, как в _apply_filters:
+        # скалярные через @> (jsonb считает 12 и 12.0 равными, а '12' нет),
+        # списки и объекты целиком, а не по вхождению
+        scalar_filters = {}
+        for key, value in (filter_criteria.get('metadata') or {}).items():
+            if isinstance(value, (dict, list)):
+                conditions.append("metadata -> %s = %s::jsonb")
+                filter_params.extend([key, json.dumps(value)])
+            else:
+                scalar_filters[key] = value
+        if scalar_filters:
+            conditions.append("metadata @> %s::jsonb")
+            filter_params.append(json.dumps(scalar_filters))
+        
+        sql = (
+            f"SELECT id, entity_type, entity_id, text, metadata, 1 - ({VECTOR_COLUMN} <=> %s::vector) AS score "
+            f"FROM {self.table} WHERE {' AND '.join(conditions)} "
+            f"ORDER BY {VECTOR_COLUMN} <=> %s::vector LIMIT %s"
+        )
+        
+        all_results = []
+        with record_timing(timings, 'index_search_ms'), transaction.atomic(), connection.cursor() as cursor:
+            # Параметры поиска действуют только внутри этой транзакции
+            if self.index_type == 'hnsw':
+                width = max(int(ef_search or self.config['ef_search']), top_k)
+                cursor.execute(f"SET LOCAL hnsw.ef_search = {width}")
+            else:
+                cursor.execute(f"SET LOCAL ivfflat.probes = {int(nprobe or self.config['probes'])}")
+            
+            # Без итеративного сканирования фильтры могут оставить меньше top_k результатов
+            if filter_criteria and self.iterative_scan:
+                cursor.execute(f"SET LOCAL {self.index_type}.iterative_scan = {self.iterative_scan}")
+            
+            for query_vector in np.asarray(query_vectors, dtype=np.float32):
+                vector = _format_vector(query_vector)
+                cursor.execute(sql, [vector, *filter_params, vector, top_k])
+                
+                results = []
+                for entry_id, entity_type, entity_id, text, metadata, score in cursor.fetchall():
+                    results.append({
+                        'id': entry_id,
+                        'entity_type': entity_type,
+                        'entity_id': entity_id,
+                        'text': text,
+                        'metadata': json.loads(metadata) if isinstance(metadata, str) else metadata,
+                        'score': float(score)
+                    })
+                
+                # Итеративное сканирование с relaxed_order не гарантирует порядок
+                results.sort(key=lambda result: result['score'], reverse=True)
+                all_results.append(results)
+        
+        return all_results
\ No newline at end of file
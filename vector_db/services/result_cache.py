@@ -0,0 +1,175 @@
+import json
+import time
+import hashlib
+import logging
+from typing import List, Dict, Any, Optional
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django_redis import get_redis_connection
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_query(query: str) -> str:
+    """
+    Нормализация текста запроса для ключа кэша
+    
+    Args:
+        query: Текст запроса
+    
+    Returns:
+        str: Запрос в нижнем регистре с единичными пробелами
+    """
+    return ' '.join((query or '').lower().replace('ё', 'е').split())
+
+
+class SearchResultCache:
+    """
+    Кэш результатов поиска в Redis
+    
+    Ключ включает нормализованный запрос, параметры поиска и поколение индекса,
+    поэтому после изменения индекса старые результаты больше не читаются
+    и вытесняются по TTL или ограничению количества записей.
+    Порядок вытеснения хранится в ZSET по времени последнего обращения.
+    """
+    def __init__(self, prefix: str = 'search_cache'):
+        self.prefix = prefix
+        self.lru_key = f"{prefix}:lru"
+        self.stats_key = f"{prefix}:stats"
+    
+    def make_key(self, query: str, top_k: int, entity_types: Optional[List[str]], metadata_filters: Optional[Dict],
+                 generation: Any) -> str:
+        """
+        Построение ключа кэша
+        
+        Args:
+            query: Текст запроса
+            top_k: Количество результатов
+            entity_types: Список типов сущностей
+            metadata_filters: Фильтры по метаданным
+            generation: Поколение индекса
+        
+        Returns:
+            str: Ключ записи кэша
+        """
+        params = json.dumps(
+            [normalize_query(query), top_k, sorted(entity_types or []), metadata_filters or {}],
+            sort_keys=True, ensure_ascii=False, cls=DjangoJSONEncoder
+        )
+        digest = hashlib.sha256(params.encode('utf-8')).hexdigest()
+        return f"{self.prefix}:{generation}:{digest}"
+    
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """
+        Получение результатов из кэша с учетом попаданий и промахов
+        
+        Args:
+            key: Ключ записи кэша
+        
+        Returns:
+            Optional[Dict]: Результаты поиска или None при промахе
+        """
+        try:
+            redis = get_redis_connection('default')
+            payload = redis.get(key)
+            
+            pipeline = redis.pipeline(transaction=False)
+            pipeline.hincrby(self.stats_key, 'hits' if payload is not None else 'misses', 1)
+            if payload is not None:
+                pipeline.zadd(self.lru_key, {key: time.time()})
+            pipeline.execute()
+            
+            return json.loads(payload) if payload is not None else None
+        except Exception as e:
+            logger.warning(f"Error reading search result cache: {e}")
+            return None
+    
+    def set(self, key: str, value: Dict[str, Any]) -> bool:
+        """
+        Сохранение результатов в кэш с вытеснением давно не читавшихся записей
+        
+        Args:
+            key: Ключ записи кэша
+            value: Результаты поиска
+        
+        Returns:
+            bool: Были ли результаты сохранены
+        """
+        try:
+            payload = json.dumps(value, ensure_ascii=False, cls=DjangoJSONEncoder).encode('utf-8')
+            if len(payload) > settings.SEARCH_CACHE_MAX_ENTRY_BYTES:
+                return False
+            
+            now = time.time()
+            redis = get_redis_connection('default')
+            
+            pipeline = redis.pipeline(transaction=False)
+            pipeline.set(key, payload, ex=settings.SEARCH_CACHE_TTL)
+            pipeline.zadd(self.lru_key, {key: now})
+            # Записи, истекшие по TTL, удаляются из порядка вытеснения
+            pipeline.zremrangebyscore(self.lru_key, '-inf', now - settings.SEARCH_CACHE_TTL)
+            pipeline.zcard(self.lru_key)
+            size = pipeline.execute()[-1]
+            
+            overflow = size - settings.SEARCH_CACHE_MAX_ENTRIES
+            if overflow > 0:
+                evicted = [member for member, _ in redis.zpopmin(self.lru_key, overflow)]
+                if evicted:
+                    redis.delete(*evicted)
+                    redis.hincrby(self.stats_key, 'evictions', len(evicted))
+            
+            return True
+        except Exception as e:
+            logger.warning(f"Error writing search result cache: {e}")
+            return False
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Статистика попаданий в кэш
+        
+        Returns:
+            Dict: Попадания, промахи, доля попаданий, вытеснения и количество записей
+        """
+        redis = get_redis_connection('default')
+        stats = {field.decode(): int(value) for field, value in redis.hgetall(self.stats_key).items()}
+        
+        hits, misses = stats.get('hits', 0), stats.get('misses', 0)
+        return {
+            'hits': hits,
+            'misses': misses,
+            'hit_rate': round(hits / (hits + misses), 4) if hits + misses else None,
+            'evictions': stats.get('evictions', 0),
+            'entries': redis.zcard(self.lru_key)
+        }
+    
+    def clear(self) -> int:
+        """
+        Удаление всех записей кэша и статистики
+        
+        Returns:
+            int: Количество удаленных записей
+        """
+        redis = get_redis_connection('default')
+        keys = [member for member in redis.zrange(self.lru_key, 0, -1)]
+        
+        removed = 0
+        for start in range(0, len(keys), 1000):
+            removed += redis.delete(*keys[start:start + 1000])
+        redis.delete(self.lru_key, self.stats_key)
+        return removed
+
+
+# Инициализация кэша
+_search_result_cache = None
+
+def get_search_result_cache() -> SearchResultCache:
+    """
+    Получение экземпляра кэша результатов поиска
+    
+    Returns:
+        SearchResultCache: Экземпляр кэша
+    """
+    global _search_result_cache
+    if _search_result_cache is None:
+        _search_result_cache = SearchResultCache()
+    return _search_result_cache
\ No newline at end of file
@@ -0,0 +1,96 @@
+import logging
+import numpy as np
+from datetime import timedelta
+from typing import List, Dict, Any, Optional
+from django.utils import timezone
+from ..models import SearchLog
+
+logger = logging.getLogger(__name__)
+
+# Префикс запросов поиска по ключевым словам в SearchLog (этапы для них не замеряются)
+KEYWORD_QUERY_PREFIX = 'keywords:'
+
+# Перцентили в отчете
+REPORT_PERCENTILES = (50, 90, 99)
+
+
+def _distribution(values: List[float]) -> Dict[str, Any]:
+    """
+    Распределение длительностей в миллисекундах
+    
+    Args:
+        values: Длительности
+    
+    Returns:
+        Dict: Количество, среднее, перцентили и максимум
+    """
+    if not values:
+        return {'count': 0}
+    
+    array = np.array(values, dtype=np.float64)
+    summary = {'count': len(values), 'mean': round(float(array.mean()), 3)}
+    for percentile in REPORT_PERCENTILES:
+        summary[f'p{percentile}'] = round(float(np.percentile(array, percentile)), 3)
+    summary['max'] = round(float(array.max()), 3)
+    return summary
+
+
+def _stage_report(rows: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Распределение общей длительности и длительностей этапов для группы поисков
+    
+    Доля этапа — отношение суммы его длительностей к сумме общих длительностей.
+    
+    Args:
+        rows: Записи SearchLog (значения полей)
+    
+    Returns:
+        Dict: Распределения по этапам
+    """
+    total_duration = sum(row['duration_ms'] for row in rows)
+    
+    stages = {}
+    for stage in SearchLog.TIMING_FIELDS:
+        values = [row[stage] for row in rows if row[stage] is not None]
+        if not values:
+            continue
+        
+        stages[stage] = _distribution(values)
+        stages[stage]['share'] = round(sum(values) / total_duration, 4) if total_duration else None
+    
+    return {
+        'duration_ms': _distribution([row['duration_ms'] for row in rows]),
+        'stages': stages
+    }
+
+
+def search_latency_report(since_days: Optional[int] = 7) -> Dict[str, Any]:
+    """
+    Перцентили длительности семантического поиска по этапам из SearchLog
+    
+    Поиски из кэша и без него считаются отдельно, потому что
+    у них разный набор этапов.
+    
+    Args:
+        since_days: Учитывать поиски за последние дни (None — все)
+    
+    Returns:
+        Dict: Доля попаданий в кэш и распределения длительностей по группам
+    """
+    logs = SearchLog.objects.exclude(query__startswith=KEYWORD_QUERY_PREFIX)
+    if since_days:
+        logs = logs.filter(created_at__gte=timezone.now() - timedelta(days=since_days))
+    
+    rows = list(logs.values('duration_ms', 'cache_hit', *SearchLog.TIMING_FIELDS))
+    cached = [row for row in rows if row['cache_hit']]
+    uncached = [row for row in rows if not row['cache_hit']]
+    
+    logger.info(f"Built search latency report from {len(rows)} logged searches")
+    
+    return {
+        'searches': len(rows),
+        'since_days': since_days,
+        'cache_hit_rate': round(len(cached) / len(rows), 4) if rows else None,
+        'uncached': _stage_report(uncached),
+        'cached': _stage_report(cached)
+    }
\ No newline at end of file
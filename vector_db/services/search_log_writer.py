@@ -0,0 +1,204 @@
+import os
+import atexit
+import logging
+import threading
+from collections import deque
+from typing import List, Dict, Any, Optional
+from django.conf import settings
+from django.db import close_old_connections
+from ..models import SearchLog
+
+logger = logging.getLogger(__name__)
+
+# Способы записи накопленных записей
+SEARCH_LOG_BACKENDS = ('thread', 'celery')
+
+# Предупреждение о переполнении выводится для первой и каждой N-й отброшенной записи
+DROP_WARNING_EVERY = 1000
+
+
+class SearchLogWriter:
+    """
+    Буфер записей SearchLog с пакетной записью вне пути запроса
+    
+    Поиск только добавляет запись в ограниченный буфер. Фоновый поток
+    сохраняет накопленные записи через bulk_create (или передает пакет
+    задаче Celery), как только их набирается batch_size или проходит
+    flush_interval секунд. При переполнении буфера новые записи
+    отбрасываются и учитываются в счетчике dropped.
+    """
+    def __init__(self, max_size: int = None, batch_size: int = None, flush_interval: float = None,
+                 backend: str = None):
+        self.max_size = max_size or settings.SEARCH_LOG_BUFFER_SIZE
+        self.batch_size = batch_size or settings.SEARCH_LOG_BATCH_SIZE
+        self.flush_interval = flush_interval or settings.SEARCH_LOG_FLUSH_INTERVAL
+        self.backend = backend or settings.SEARCH_LOG_BACKEND
+        if self.backend not in SEARCH_LOG_BACKENDS:
+            raise ValueError(f"Unsupported search log backend: {self.backend}")
+        
+        self.dropped = 0
+        self.written = 0
+        self.failed = 0
+        
+        self._buffer = deque()
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread = None
+        self._pid = None
+        
+        # Оставшиеся записи сохраняются при завершении процесса
+        atexit.register(self.flush)
+    
+    def write(self, fields: Dict[str, Any]) -> bool:
+        """
+        Постановка записи в буфер без ожидания сохранения
+        
+        Args:
+            fields: Значения полей SearchLog
+        
+        Returns:
+            bool: Принята ли запись (False — буфер переполнен)
+        """
+        with self._lock:
+            self._ensure_thread()
+            
+            if len(self._buffer) >= self.max_size:
+                self.dropped += 1
+                dropped = self.dropped
+            else:
+                self._buffer.append(fields)
+                if len(self._buffer) >= self.batch_size:
+                    self._wakeup.set()
+                return True
+        
+        if dropped == 1 or dropped % DROP_WARNING_EVERY == 0:
+            logger.warning(f"Search log buffer is full ({self.max_size} records), {dropped} records dropped so far")
+        return False
+    
+    def _ensure_thread(self) -> None:
+        """
+        Запуск фонового потока при первой записи и после fork
+        
+        Вызывается под self._lock.
+        """
+        pid = os.getpid()
+        if self._thread is not None and self._pid == pid:
+            return
+        
+        # Дочерний процесс не наследует поток, а унаследованные записи сохранит родитель
+        if self._pid is not None:
+            self._buffer.clear()
+        
+        self._pid = pid
+        self._thread = threading.Thread(target=self._run, name='search-log-writer', daemon=True)
+        self._thread.start()
+    
+    def _run(self) -> None:
+        """
+        Сохранение записей по заполнении пакета или по интервалу
+        """
+        while True:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            try:
+                self.flush()
+            finally:
+                # Соединение закрывается только в своем потоке: flush() из потока
+                # запроса не должен закрывать соединение его транзакции
+                close_old_connections()
+    
+    def flush(self) -> int:
+        """
+        Сохранение всех накопленных записей пакетами
+        
+        При ошибке записи пакет отбрасывается, а оставшиеся записи
+        ждут следующего сохранения.
+        
+        Returns:
+            int: Количество сохраненных записей
+        """
+        written = 0
+        with self._flush_lock:
+            while True:
+                with self._lock:
+                    batch = [self._buffer.popleft() for _ in range(min(self.batch_size, len(self._buffer)))]
+                if not batch:
+                    break
+                
+                try:
+                    self._write_batch(batch)
+                except Exception as e:
+                    self.failed += len(batch)
+                    logger.error(f"Error writing {len(batch)} search log records: {e}")
+                    break
+                
+                written += len(batch)
+                self.written += len(batch)
+        
+        return written
+    
+    def _write_batch(self, batch: List[Dict[str, Any]]) -> None:
+        """
+        Запись одного пакета выбранным способом
+        
+        Args:
+            batch: Значения полей SearchLog
+        """
+        if self.backend == 'celery':
+            from ..tasks import write_search_logs
+            write_search_logs.delay(batch)
+            return
+        
+        SearchLog.objects.bulk_create([SearchLog(**fields) for fields in batch])
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Состояние буфера в текущем процессе
+        
+        Returns:
+            Dict: Записи в буфере, сохраненные, отброшенные при переполнении и потерянные при ошибках
+        """
+        with self._lock:
+            buffered = len(self._buffer)
+        
+        return {
+            'backend': self.backend,
+            'buffered': buffered,
+            'written': self.written,
+            'dropped': self.dropped,
+            'failed': self.failed
+        }
+
+
+# Инициализация буфера
+_search_log_writer = None
+_search_log_writer_lock = threading.Lock()
+
+def get_search_log_writer() -> SearchLogWriter:
+    """
+    Получение экземпляра буфера записей SearchLog
+    
+    Returns:
+        SearchLogWriter: Экземпляр буфера
+    """
+    global _search_log_writer
+    if _search_log_writer is None:
+        with _search_log_writer_lock:
+            if _search_log_writer is None:
+                _search_log_writer = SearchLogWriter()
+    return _search_log_writer
+
+
+def log_search(**fields) -> None:
+    """
+    Запись поиска в SearchLog через буфер или сразу, если SEARCH_LOG_ASYNC выключен
+    
+    Args:
+        fields: Значения полей SearchLog
+    """
+    if not settings.SEARCH_LOG_ASYNC:
+        SearchLog.objects.create(**fields)
+        return
+    
+    get_search_log_writer().write(fields)
\ No newline at end of file
@@ -0,0 +1,205 @@
+import json
+import time
+import logging
+import numpy as np
+from datetime import timedelta
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, Optional
+from django.db import close_old_connections
+from django.utils import timezone
+from ..models import SearchLog
+from .search_service import get_search_service
+from .search_latency import KEYWORD_QUERY_PREFIX
+
+logger = logging.getLogger(__name__)
+
+# Количество запросов с наименьшим совпадением в отчете
+REPORT_EXAMPLES = 20
+
+
+def sample_logged_queries(limit: int, since_days: Optional[int] = None, distinct: bool = False) -> List[str]:
+    """
+    Случайная выборка семантических запросов из SearchLog
+    
+    Без distinct повторяющиеся запросы попадают в выборку с частотой,
+    с которой они встречаются в реальной нагрузке.
+    
+    Args:
+        limit: Количество запросов
+        since_days: Брать только запросы за последние дни
+        distinct: Исключить повторы запросов
+    
+    Returns:
+        List[str]: Тексты запросов
+    """
+    logs = SearchLog.objects.exclude(query__startswith=KEYWORD_QUERY_PREFIX).exclude(query='')
+    if since_days:
+        logs = logs.filter(created_at__gte=timezone.now() - timedelta(days=since_days))
+    
+    if distinct:
+        queries = list(logs.values_list('query', flat=True).distinct())
+        rng = np.random.default_rng()
+        if len(queries) > limit:
+            queries = [queries[i] for i in rng.choice(len(queries), limit, replace=False)]
+        return queries
+    
+    return list(logs.order_by('?').values_list('query', flat=True)[:limit])
+
+
+def _get_ranked_ids(response: Dict[str, Any]) -> List[int]:
+    """
+    ID записей из ответа SearchService.search в порядке убывания оценки
+    
+    Args:
+        response: Ответ поиска с результатами, сгруппированными по типам
+    
+    Returns:
+        List[int]: ID векторных записей
+    """
+    results = [result for group in response.get('results', {}).values() for result in group]
+    # При гибридном поиске порядок задает объединенная оценка
+    results.sort(key=lambda result: result.get('fused_score', result.get('score')) or 0, reverse=True)
+    return [result['id'] for result in results]
+
+
+def _replay_query(query: str, top_k: int) -> Dict[str, Any]:
+    """
+    Выполнение одного запроса через SearchService с замером времени
+    
+    Args:
+        query: Текст запроса
+        top_k: Количество результатов
+    
+    Returns:
+        Dict: Задержка, ID результатов и ошибка
+    """
+    try:
+        start = time.perf_counter()
+        response = get_search_service().search(query, top_k=top_k, log=False, use_cache=False)
+        latency_ms = (time.perf_counter() - start) * 1000
+        
+        return {
+            'query': query,
+            'latency_ms': round(latency_ms, 3),
+            'ids': _get_ranked_ids(response),
+            'error': response.get('error')
+        }
+    finally:
+        close_old_connections()
+
+
+def _latency_summary(latencies: List[float]) -> Dict[str, Optional[float]]:
+    """
+    Распределение задержек в миллисекундах
+    
+    Args:
+        latencies: Задержки запросов
+    
+    Returns:
+        Dict: Среднее, перцентили и максимум
+    """
+    if not latencies:
+        return {'mean': None, 'p50': None, 'p90': None, 'p99': None, 'max': None}
+    
+    values = np.array(latencies)
+    return {
+        'mean': round(float(values.mean()), 3),
+        'p50': round(float(np.percentile(values, 50)), 3),
+        'p90': round(float(np.percentile(values, 90)), 3),
+        'p99': round(float(np.percentile(values, 99)), 3),
+        'max': round(float(values.max()), 3)
+    }
+
+
+def replay_queries(queries: List[str], concurrency: int = 1, top_k: int = 10) -> Dict[str, Any]:
+    """
+    Воспроизведение запросов через SearchService.search с заданной параллельностью
+    
+    Запросы выполняются без записи в SearchLog, чтобы воспроизведение
+    не попадало в следующие выборки.
+    
+    Args:
+        queries: Тексты запросов
+        concurrency: Количество одновременно выполняемых запросов
+        top_k: Количество результатов для каждого запроса
+    
+    Returns:
+        Dict: Параметры, распределение задержек и результаты по запросам
+    """
+    # Индекс загружается до начала замеров
+    get_search_service()
+    
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max(concurrency, 1)) as executor:
+        runs = list(executor.map(lambda query: _replay_query(query, top_k), queries))
+    wall_seconds = time.perf_counter() - start
+    
+    errors = sum(1 for run in runs if run['error'])
+    logger.info(f"Replayed {len(runs)} queries with concurrency {concurrency} in {wall_seconds:.1f}s, {errors} errors")
+    
+    return {
+        'parameters': {'queries': len(queries), 'concurrency': concurrency, 'top_k': top_k},
+        'latency_ms': _latency_summary([run['latency_ms'] for run in runs if not run['error']]),
+        'throughput_qps': round(len(runs) / wall_seconds, 2) if wall_seconds else None,
+        'errors': errors,
+        'runs': runs
+    }
+
+
+def compare_with_baseline(report: Dict[str, Any], baseline: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Сравнение результатов воспроизведения с сохраненным эталоном
+    
+    Совпадение запроса — доля ID эталонных результатов, найденных снова.
+    
+    Args:
+        report: Результат replay_queries
+        baseline: Ранее сохраненный результат replay_queries
+    
+    Returns:
+        Dict: Среднее совпадение, изменившиеся запросы и изменение задержек
+    """
+    baseline_ids = {run['query']: run['ids'] for run in baseline.get('runs', []) if not run.get('error')}
+    
+    overlaps = []
+    for run in report['runs']:
+        expected = baseline_ids.get(run['query'])
+        if run['error'] or expected is None:
+            continue
+        
+        overlap = len(set(run['ids']).intersection(expected)) / len(expected) if expected else float(not run['ids'])
+        overlaps.append((overlap, run['query']))
+    
+    overlaps.sort(key=lambda item: item[0])
+    values = [overlap for overlap, _ in overlaps]
+    
+    latency_delta = {}
+    for key, value in report['latency_ms'].items():
+        baseline_value = baseline.get('latency_ms', {}).get(key)
+        latency_delta[key] = round(value - baseline_value, 3) if value is not None and baseline_value is not None else None
+    
+    return {
+        'compared': len(values),
+        'mean_overlap': round(float(np.mean(values)), 4) if values else None,
+        'min_overlap': round(values[0], 4) if values else None,
+        'changed_queries': sum(1 for value in values if value < 1),
+        'lowest_overlap': [
+            {'query': query, 'overlap': round(overlap, 4)}
+            for overlap, query in overlaps[:REPORT_EXAMPLES] if overlap < 1
+        ],
+        'latency_delta_ms': latency_delta
+    }
+
+
+def load_baseline(path: str) -> Dict[str, Any]:
+    """
+    Загрузка эталона воспроизведения из файла JSON
+    
+    Args:
+        path: Путь к файлу
+    
+    Returns:
+        Dict: Сохраненный результат replay_queries
+    """
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
\ No newline at end of file
@@ -0,0 +1,484 @@
+import os
+import json
+import time
+import queue
+import socket
+import struct
+import logging
+import threading
+import socketserver
+import numpy as np
+from typing import List, Dict, Any, Optional, Union, Callable
+from django.conf import settings
+from django.db import close_old_connections
+from ..models import VectorEntry
+from .vector_index import BaseVectorIndexService, record_timing
+
+logger = logging.getLogger(__name__)
+
+# Заголовок сообщения: длина тела в байтах (big-endian)
+HEADER = struct.Struct('>I')
+
+
+def _send_message(sock: socket.socket, payload: Dict) -> None:
+    """
+    Отправка сообщения в формате JSON с заголовком длины
+    
+    Args:
+        sock: Сокет
+        payload: Сообщение
+    """
+    body = json.dumps(payload).encode('utf-8')
+    sock.sendall(HEADER.pack(len(body)) + body)
+
+
+def _recv_exactly(sock: socket.socket, size: int) -> Optional[bytes]:
+    """
+    Чтение заданного количества байт из сокета
+    
+    Args:
+        sock: Сокет
+        size: Количество байт
+    
+    Returns:
+        Optional[bytes]: Данные или None, если соединение закрыто
+    """
+    chunks = []
+    while size:
+        chunk = sock.recv(min(size, 1 << 20))
+        if not chunk:
+            return None
+        chunks.append(chunk)
+        size -= len(chunk)
+    return b''.join(chunks)
+
+
+def _recv_message(sock: socket.socket) -> Optional[Dict]:
+    """
+    Чтение сообщения в формате JSON с заголовком длины
+    
+    Args:
+        sock: Сокет
+    
+    Returns:
+        Optional[Dict]: Сообщение или None, если соединение закрыто
+    """
+    header = _recv_exactly(sock, HEADER.size)
+    if header is None:
+        return None
+    
+    body = _recv_exactly(sock, HEADER.unpack(header)[0])
+    if body is None:
+        return None
+    return json.loads(body.decode('utf-8'))
+
+
+class _PendingSearch:
+    """
+    Запрос поиска, ожидающий выполнения в пакете
+    """
+    def __init__(self, query_vectors: np.ndarray, top_k: int, filter_criteria: Optional[Dict],
+                 nprobe: Optional[int], ef_search: Optional[int]):
+        self.query_vectors = query_vectors
+        self.top_k = top_k
+        self.filter_criteria = filter_criteria
+        self.nprobe = nprobe
+        self.ef_search = ef_search
+        self.results = None
+        self.error = None
+        self.done = threading.Event()
+    
+    @property
+    def group_key(self) -> tuple:
+        """Запросы с одинаковыми параметрами выполняются одним вызовом FAISS"""
+        return (self.top_k, json.dumps(self.filter_criteria, sort_keys=True), self.nprobe, self.ef_search)
+
+
+class SearchBatcher:
+    """
+    Объединение одновременных запросов поиска в пакеты
+    
+    Запросы, поступившие в течение batch_wait секунд, выполняются одним
+    вызовом FAISS по объединенной матрице векторов, который распараллеливается
+    по всем ядрам.
+    """
+    def __init__(self, service: BaseVectorIndexService, batch_size: int = None, batch_wait: float = None):
+        self.service = service
+        self.batch_size = batch_size or settings.VECTOR_SEARCH_SERVER_BATCH_SIZE
+        self.batch_wait = batch_wait if batch_wait is not None else settings.VECTOR_SEARCH_SERVER_BATCH_WAIT_MS / 1000
+        self._queue = queue.Queue()
+        
+        thread = threading.Thread(target=self._run, name='vector-search-batcher', daemon=True)
+        thread.start()
+    
+    def search(self, query_vectors: np.ndarray, top_k: int, filter_criteria: Optional[Dict] = None,
+               nprobe: Optional[int] = None, ef_search: Optional[int] = None) -> List[List[Dict]]:
+        """
+        Постановка запроса в очередь и ожидание результатов
+        
+        Args:
+            query_vectors: Векторы запросов
+            top_k: Количество результатов для каждого запроса
+            filter_criteria: Критерии фильтрации результатов
+            nprobe: IVF: количество просматриваемых кластеров
+            ef_search: HNSW: ширина поиска
+        
+        Returns:
+            List[List[Dict]]: Результаты поиска для каждого вектора
+        """
+        request = _PendingSearch(query_vectors, top_k, filter_criteria, nprobe, ef_search)
+        self._queue.put(request)
+        request.done.wait()
+        
+        if request.error is not None:
+            raise request.error
+        return request.results
+    
+    def _run(self) -> None:
+        """
+        Сбор запросов из очереди в пакеты и их выполнение
+        """
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.batch_wait
+            
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            
+            groups = {}
+            for request in batch:
+                groups.setdefault(request.group_key, []).append(request)
+            
+            for requests in groups.values():
+                self._execute(requests)
+    
+    def _execute(self, requests: List[_PendingSearch]) -> None:
+        """
+        Выполнение группы запросов с одинаковыми параметрами
+        
+        Args:
+            requests: Запросы группы
+        """
+        first = requests[0]
+        try:
+            close_old_connections()
+            results = self.service.search_vectors(
+                np.vstack([request.query_vectors for request in requests]),
+                first.top_k, first.filter_criteria, first.nprobe, first.ef_search
+            )
+            
+            # Результаты разбиваются обратно по запросам
+            offset = 0
+            for request in requests:
+                count = len(request.query_vectors)
+                request.results = results[offset:offset + count]
+                offset += count
+        except Exception as e:
+            logger.error(f"Error executing batch of {len(requests)} vector searches: {e}")
+            for request in requests:
+                request.error = e
+        finally:
+            for request in requests:
+                request.done.set()
+
+
+class _RequestHandler(socketserver.BaseRequestHandler):
+    """
+    Обработка запросов одного клиента до закрытия соединения
+    """
+    def handle(self):
+        while True:
+            request = _recv_message(self.request)
+            if request is None:
+                return
+            
+            close_old_connections()
+            _send_message(self.request, self.server.dispatch(request))
+
+
+class VectorSearchServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """
+    Сервер векторного поиска, единолично владеющий индексом
+    
+    Веб-процессы и воркеры Celery обращаются к нему через RemoteVectorIndexService
+    по Unix-сокету, поэтому векторы хранятся в памяти одного процесса.
+    """
+    daemon_threads = True
+    
+    def __init__(self, socket_path: str, service: BaseVectorIndexService):
+        self.socket_path = socket_path
+        self.service = service
+        self.batcher = SearchBatcher(service)
+        
+        # Сокет, оставшийся от предыдущего запуска
+        if os.path.exists(socket_path):
+            os.remove(socket_path)
+        
+        super().__init__(socket_path, _RequestHandler)
+    
+    def server_close(self):
+        super().server_close()
+        if os.path.exists(self.socket_path):
+            os.remove(self.socket_path)
+    
+    def dispatch(self, request: Dict) -> Dict:
+        """
+        Выполнение операции клиента
+        
+        Args:
+            request: Запрос с полем 'op' и параметрами операции
+        
+        Returns:
+            Dict: Ответ с полем 'result' или 'error'
+        """
+        op = request.get('op')
+        try:
+            if op == 'search':
+                result = self.batcher.search(
+                    np.array(request['query_vectors'], dtype=np.float32),
+                    request['top_k'],
+                    request.get('filter_criteria'),
+                    request.get('nprobe'),
+                    request.get('ef_search')
+                )
+            elif op == 'upsert':
+                # Клиент передает только ID, эмбеддинги читаются из БД
+                entries = list(VectorEntry.objects.filter(id__in=request['entry_ids']))
+                result = self.service.upsert_vectors(entries)
+            elif op == 'remove':
+                result = self.service.remove_vectors(request['entry_ids'])
+            elif op == 'flush':
+                result = self.service.flush()
+            elif op == 'entry_ids':
+                result = self.service.get_entry_ids().tolist()
+            elif op == 'generation':
+                result = self.service.get_generation()
+            elif op == 'config':
+                result = self.service.config
+            elif op == 'reconstruct':
+                result = self.service.reconstruct_vectors(np.array(request['entry_ids'], dtype=np.int64)).tolist()
+            elif op == 'train':
+                vectors = request.get('vectors')
+                result = self.service.train(np.array(vectors, dtype=np.float32) if vectors is not None else None)
+            elif op == 'compact':
+                result = self.service.compact()
+            elif op == 'reload':
+                result = self.service.check_for_update()
+            elif op == 'rebuild':
+                result = self.service.rebuild()
+            else:
+                return {'error': f"Unknown operation {op}"}
+            
+            return {'result': result}
+        except Exception as e:
+            logger.error(f"Error handling vector search server operation {op}: {e}")
+            return {'error': str(e)}
+
+
+class RemoteVectorIndexService(BaseVectorIndexService):
+    """
+    Клиент сервера векторного поиска с интерфейсом BaseVectorIndexService
+    
+    Индекс в процессе клиента не загружается: поиск, изменения и обслуживание
+    индекса выполняет сервер, а эмбеддинги запросов и логирование остаются
+    на стороне клиента.
+    """
+    def __init__(self, socket_path: str, index_name='default', dimension=None):
+        super().__init__(index_name, dimension)
+        self.socket_path = socket_path
+        
+        # Соединение с сервером открывается отдельно для каждого потока
+        self._local = threading.local()
+    
+    def _get_connection(self) -> socket.socket:
+        """
+        Получение соединения с сервером для текущего потока
+        
+        Returns:
+            socket.socket: Соединение
+        """
+        sock = getattr(self._local, 'sock', None)
+        if sock is None:
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            sock.settimeout(settings.VECTOR_SEARCH_SERVER_TIMEOUT)
+            try:
+                sock.connect(self.socket_path)
+            except OSError:
+                sock.close()
+                raise
+            self._local.sock = sock
+        return sock
+    
+    def _close_connection(self) -> None:
+        """
+        Закрытие соединения текущего потока
+        """
+        sock = getattr(self._local, 'sock', None)
+        if sock is not None:
+            sock.close()
+            self._local.sock = None
+    
+    def _call(self, request: Dict, wait: bool = False) -> Any:
+        """
+        Выполнение операции на сервере
+        
+        Операции идемпотентны, поэтому при обрыве соединения запрос
+        повторяется один раз через новое соединение.
+        
+        Args:
+            request: Запрос
+            wait: Ждать ответа без VECTOR_SEARCH_SERVER_TIMEOUT (для долгих операций)
+        
+        Returns:
+            Any: Результат операции
+        """
+        for attempt in range(2):
+            try:
+                sock = self._get_connection()
+                if wait:
+                    sock.settimeout(None)
+                try:
+                    _send_message(sock, request)
+                    response = _recv_message(sock)
+                finally:
+                    if wait:
+                        sock.settimeout(settings.VECTOR_SEARCH_SERVER_TIMEOUT)
+                if response is None:
+                    raise ConnectionError("Vector search server closed the connection")
+                break
+            except OSError:
+                self._close_connection()
+                if attempt:
+                    raise
+        
+        if 'error' in response:
+            raise RuntimeError(f"Vector search server error: {response['error']}")
+        return response['result']
+    
+    def search_vectors(self, query_vectors: np.ndarray, top_k: int = 10, filter_criteria: Dict = None,
+                       nprobe: Optional[int] = None, ef_search: Optional[int] = None,
+                       timings: Optional[Dict[str, float]] = None) -> List[List[Dict]]:
+        """
+        Поиск на сервере по векторам запросов
+        
+        Загрузка и фильтрация записей выполняются на сервере, поэтому
+        весь вызов учитывается как index_search_ms.
+        """
+        with record_timing(timings, 'index_search_ms'):
+            return self._call({
+                'op': 'search',
+                'query_vectors': np.asarray(query_vectors, dtype=np.float32).tolist(),
+                'top_k': top_k,
+                'filter_criteria': filter_criteria,
+                'nprobe': nprobe,
+                'ef_search': ef_search
+            })
+    
+    def upsert_vectors(self, entries: List[VectorEntry]) -> int:
+        """
+        Добавление или замена векторов в индексе сервера
+        """
+        entry_ids = [entry.id for entry in entries if entry is not None and entry.embedding]
+        if not entry_ids:
+            return 0
+        
+        try:
+            return self._call({'op': 'upsert', 'entry_ids': entry_ids})
+        except Exception as e:
+            logger.error(f"Error upserting vectors via search server: {e}")
+            return 0
+    
+    def remove_vectors(self, entry_ids: List[int]) -> int:
+        """
+        Удаление векторов из индекса сервера
+        """
+        if not entry_ids:
+            return 0
+        
+        try:
+            return self._call({'op': 'remove', 'entry_ids': [int(entry_id) for entry_id in entry_ids]})
+        except Exception as e:
+            logger.error(f"Error removing vectors via search server: {e}")
+            return 0
+    
+    def flush(self) -> bool:
+        """
+        Сохранение индекса сервера на диск
+        """
+        try:
+            return self._call({'op': 'flush'})
+        except Exception as e:
+            logger.error(f"Error flushing index via search server: {e}")
+            return False
+    
+    def get_generation(self) -> Union[int, str]:
+        """
+        Поколение индекса сервера
+        """
+        return self._call({'op': 'generation'})
+    
+    def get_entry_ids(self) -> np.ndarray:
+        """
+        Получение ID записей, хранящихся в индексе сервера
+        """
+        return np.array(self._call({'op': 'entry_ids'}), dtype=np.int64)
+    
+    @property
+    def config(self) -> Dict:
+        """
+        Конфигурация индекса сервера
+        """
+        return self._call({'op': 'config'})
+    
+    def reconstruct_vectors(self, entry_ids: np.ndarray) -> np.ndarray:
+        """
+        Получение векторов, хранящихся в индексе сервера, по ID записей
+        """
+        vectors = self._call({'op': 'reconstruct', 'entry_ids': [int(entry_id) for entry_id in entry_ids]})
+        return np.array(vectors, dtype=np.float32).reshape(-1, self.dimension)
+    
+    def train(self, vectors: Optional[np.ndarray] = None) -> bool:
+        """
+        Обучение индекса сервера (по умолчанию на выборке из VectorEntry)
+        """
+        return self._call({
+            'op': 'train',
+            'vectors': np.asarray(vectors, dtype=np.float32).tolist() if vectors is not None else None
+        })
+    
+    def compact(self) -> int:
+        """
+        Физическое удаление помеченных на удаление векторов на сервере
+        """
+        return self._call({'op': 'compact'})
+    
+    def reload(self) -> bool:
+        """
+        Переход сервера на последнее сохраненное поколение индекса
+        """
+        return self._call({'op': 'reload'})
+    
+    def rebuild(self, progress_callback: Optional[Callable[[int, int], None]] = None) -> int:
+        """
+        Перестроение индекса сервером в новое поколение
+        
+        Индекс перестраивает процесс сервера, владеющий им: изменения, сделанные
+        во время построения, он применяет к новому индексу сам. Прогресс
+        по ходу построения не передается, функция получает только итог.
+        
+        Args:
+            progress_callback: Функция, получающая количество обработанных и всех записей
+            
+        Returns:
+            int: Количество векторов в новом индексе
+        """
+        count = self._call({'op': 'rebuild'}, wait=True)
+        if progress_callback is not None:
+            progress_callback(count, count)
+        return count
\ No newline at end of file
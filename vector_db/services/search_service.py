@@ -1,23 +1,70 @@
 import logging
-from typing import List, Dict, Any, Optional
-from django.db.models import Q
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, Optional, Tuple, Iterable
+from django.conf import settings
+from django.core.cache import cache
+from django.contrib.postgres.search import SearchQuery, SearchRank
+from django.db.models import F
+from django.db.models.functions import Substr
 from django.utils import timezone
-from django.db import connection
+from django.db import connection, close_old_connections
 from ..models import VectorEntry, SearchLog
-from .vector_index import get_vector_index_service
+from .vector_index import get_vector_index_service, record_timing
+from .keyword_index import get_keyword_index
+from .result_cache import get_search_result_cache
+from .search_log_writer import log_search
 from planfix_integration.models import Project, Task, Employee, Comment, Document
 
 logger = logging.getLogger(__name__)
 
+# Длина предпросмотра содержимого документа в результатах поиска
+CONTENT_PREVIEW_LENGTH = 500
+
+# Данные, добавляемые к результатам поиска по типам сущностей:
+# модель, поля сущности и поля связанных сущностей
+_RELATED_FIELDS = ('id', 'planfix_id', 'name')
+ENRICHMENT_PROJECTIONS = {
+    'project': (Project, ('id', 'planfix_id', 'name', 'description', 'status'), ()),
+    'task': (
+        Task,
+        ('id', 'planfix_id', 'name', 'description', 'status', 'priority', 'due_date'),
+        (('project', _RELATED_FIELDS), ('assignee', _RELATED_FIELDS))
+    ),
+    'employee': (Employee, ('id', 'planfix_id', 'name', 'email', 'position'), ()),
+    'comment': (
+        Comment,
+        ('id', 'planfix_id', 'text'),
+        (('task', _RELATED_FIELDS), ('author', _RELATED_FIELDS))
+    ),
+    'document': (
+        Document,
+        ('id', 'planfix_id', 'name', 'description', 'file_url', 'file_type'),
+        (('project', _RELATED_FIELDS),)
+    ),
+    'document_content': (
+        Document,
+        ('id', 'planfix_id', 'name', 'description', 'file_url', 'file_type'),
+        (('project', _RELATED_FIELDS),)
+    ),
+}
+
 class SearchService:
     """
     Сервис для семантического поиска по данным из Planfix
     """
     def __init__(self):
         self.vector_index = get_vector_index_service()
+        self.result_cache = get_search_result_cache() if settings.SEARCH_CACHE_ENABLED else None
+        
+        # Поиск по ключевым словам выполняется параллельно с векторным
+        self._keyword_executor = None
+        if settings.HYBRID_SEARCH_ENABLED:
+            self._keyword_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix='keyword-search')
+            # Индекс ключевых слов загружается в фоне, не задерживая первый запрос
+            self._keyword_executor.submit(get_keyword_index)
     
     def search(self, query: str, top_k: int = 10, entity_types: List[str] = None, 
-               metadata_filters: Dict = None) -> Dict[str, Any]:
+               metadata_filters: Dict = None, log: bool = True, use_cache: bool = True) -> Dict[str, Any]:
         """
         Выполнение семантического поиска по данным
         
@@ -26,11 +73,14 @@ class SearchService:
             top_k: Количество результатов
             entity_types: Список типов сущностей для поиска
             metadata_filters: Фильтры по метаданным
+            log: Записывать ли запрос в SearchLog (отключается при воспроизведении журнала)
+            use_cache: Использовать ли кэш результатов (отключается при замерах производительности)
             
         Returns:
             Dict: Результаты поиска с группировкой по типам
         """
         start_time = timezone.now()
+        timings = {}
         
         try:
             # Подготовка фильтров
@@ -40,29 +90,60 @@ class SearchService:
             if metadata_filters:
                 filter_criteria['metadata'] = metadata_filters
             
-            # Выполнение поиска
-            vector_results = self.vector_index.search(query, top_k=top_k, filter_criteria=filter_criteria)
+            # Повторные запросы обслуживаются из кэша, пока индекс не изменился
+            cached = None
+            with record_timing(timings, 'cache_ms'):
+                cache_key = self._get_cache_key(query, top_k, entity_types, metadata_filters) if use_cache else None
+                if cache_key is not None:
+                    cached = self.result_cache.get(cache_key)
+            
+            if cached is not None:
+                end_time = timezone.now()
+                duration_ms = int((end_time - start_time).total_seconds() * 1000)
+                
+                if log:
+                    self._log_search(query, cached['total_results'], duration_ms, timings, cache_hit=True)
+                
+                return {**cached, 'query': query, 'duration_ms': duration_ms, 'cached': True}
+            
+            keyword_future = None
+            if self._keyword_executor is not None:
+                keyword_future = self._keyword_executor.submit(self._search_keyword_index, query, top_k * 2, entity_types)
+            
+            # Выполнение поиска: для слияния с ключевыми словами нужно больше кандидатов
+            candidates = top_k * 2 if keyword_future is not None else top_k
+            search_results = self.vector_index.search(
+                query, top_k=candidates, filter_criteria=filter_criteria, timings=timings
+            )
+            
+            if keyword_future is not None:
+                # Учитывается только ожидание, не перекрытое векторным поиском
+                with record_timing(timings, 'keyword_ms'):
+                    search_results = self._fuse_results(search_results, keyword_future.result(), top_k, filter_criteria)
             
             # Группировка результатов по типам
-            grouped_results = self._group_results_by_type(vector_results)
+            grouped_results = self._group_results_by_type(search_results)
             
             # Обогащение результатов данными из моделей
-            enriched_results = self._enrich_results(grouped_results)
+            with record_timing(timings, 'enrichment_ms'):
+                enriched_results = self._enrich_results(grouped_results)
+            
+            # Пустые результаты не кэшируются: их причиной может быть временная ошибка эмбеддингов
+            if cache_key is not None and search_results:
+                self.result_cache.set(cache_key, {'total_results': len(search_results), 'results': enriched_results})
             
             # Логирование поиска
             end_time = timezone.now()
             duration_ms = int((end_time - start_time).total_seconds() * 1000)
             
-            SearchLog.objects.create(
-                query=query,
-                results_count=len(vector_results),
-                duration_ms=duration_ms
-            )
+            if log:
+                self._log_search(query, len(search_results), duration_ms, timings)
             
             return {
                 'query': query,
-                'total_results': len(vector_results),
+                'total_results': len(search_results),
                 'duration_ms': duration_ms,
+                'timings': {stage: round(value, 3) for stage, value in timings.items()},
                 'results': enriched_results
             }
         except Exception as e:
@@ -72,11 +153,8 @@ class SearchService:
             end_time = timezone.now()
             duration_ms = int((end_time - start_time).total_seconds() * 1000)
             
-            SearchLog.objects.create(
-                query=query,
-                results_count=0,
-                duration_ms=duration_ms
-            )
+            if log:
+                self._log_search(query, 0, duration_ms, timings)
             
             return {
                 'query': query,
@@ -86,6 +164,130 @@ class SearchService:
                 'results': {}
             }
     
+    def _log_search(self, query: str, results_count: int, duration_ms: int,
+                    timings: Dict[str, float], cache_hit: bool = False) -> None:
+        """
+        Запись логического поиска в SearchLog вместе с длительностями этапов
+        
+        Args:
+            query: Поисковый запрос
+            results_count: Количество результатов
+            duration_ms: Общая длительность поиска
+            timings: Длительности выполненных этапов в миллисекундах
+            cache_hit: Получены ли результаты из кэша
+        """
+        stage_timings = {
+            stage: round(value, 3) for stage, value in timings.items() if stage in SearchLog.TIMING_FIELDS
+        }
+        log_search(
+            query=query,
+            results_count=results_count,
+            duration_ms=duration_ms,
+            cache_hit=cache_hit,
+            **stage_timings
+        )
+    
+    def _get_cache_key(self, query: str, top_k: int, entity_types: Optional[List[str]],
+                       metadata_filters: Optional[Dict]) -> Optional[str]:
+        """
+        Ключ кэша результатов для текущего поколения индекса
+        
+        Args:
+            query: Поисковый запрос
+            top_k: Количество результатов
+            entity_types: Список типов сущностей для поиска
+            metadata_filters: Фильтры по метаданным
+            
+        Returns:
+            Optional[str]: Ключ или None, если кэш выключен или поколение индекса недоступно
+        """
+        if self.result_cache is None:
+            return None
+        
+        try:
+            generation = self.vector_index.get_generation()
+        except Exception as e:
+            logger.warning(f"Error getting vector index generation for result cache: {e}")
+            return None
+        
+        return self.result_cache.make_key(query, top_k, entity_types, metadata_filters, generation)
+    
+    def _search_keyword_index(self, query: str, top_k: int, entity_types: Optional[List[str]]) -> List[Tuple[int, float]]:
+        """
+        Поиск по индексу ключевых слов (выполняется в отдельном потоке)
+        
+        Args:
+            query: Поисковый запрос
+            top_k: Количество результатов
+            entity_types: Список типов сущностей для поиска
+            
+        Returns:
+            List[Tuple[int, float]]: Пары (ID записи, оценка BM25)
+        """
+        close_old_connections()
+        try:
+            return get_keyword_index().search(query, top_k, entity_types)
+        except Exception as e:
+            logger.error(f"Error in keyword index search: {e}")
+            return []
+    
+    def _fuse_results(self, vector_results: List[Dict], keyword_hits: List[Tuple[int, float]], top_k: int,
+                      filter_criteria: Dict) -> List[Dict]:
+        """
+        Слияние результатов векторного поиска и поиска по ключевым словам (reciprocal rank fusion)
+        
+        Оценка записи — сумма 1 / (k + позиция) по спискам, в которые она попала,
+        поэтому оценки разной природы (косинус и BM25) не нужно приводить к одной шкале.
+        Объединенная оценка возвращается в fused_score, а score остается косинусным
+        сходством (None для записей, найденных только по ключевым словам).
+        
+        Args:
+            vector_results: Результаты векторного поиска по убыванию сходства
+            keyword_hits: Пары (ID записи, оценка BM25) по убыванию оценки
+            top_k: Количество результатов
+            filter_criteria: Критерии фильтрации для записей, найденных только по ключевым словам
+            
+        Returns:
+            List[Dict]: Результаты по убыванию объединенной оценки
+        """
+        rrf_k = settings.HYBRID_RRF_K
+        fused_scores = {}
+        results_by_id = {}
+        
+        for rank, result in enumerate(vector_results):
+            fused_scores[result['id']] = 1 / (rrf_k + rank + 1)
+            results_by_id[result['id']] = result
+        
+        keyword_scores = {}
+        for rank, (entry_id, score) in enumerate(keyword_hits):
+            fused_scores[entry_id] = fused_scores.get(entry_id, 0.0) + 1 / (rrf_k + rank + 1)
+            keyword_scores[entry_id] = score
+        
+        # Записи, найденные только по ключевым словам, загружаются одним запросом
+        missing_hits = [(entry_id, score) for entry_id, score in keyword_hits if entry_id not in results_by_id]
+        if missing_hits:
+            hydrated = self.vector_index.hydrate_results(missing_hits)
+            
+            # Записи, удаленные из БД, удаляются и из индекса ключевых слов
+            deleted_ids = {entry_id for entry_id, _ in missing_hits} - {result['id'] for result in hydrated}
+            if deleted_ids:
+                get_keyword_index().remove(deleted_ids)
+            
+            for result in hydrated:
+                if not filter_criteria or self.vector_index._apply_filters(result, filter_criteria):
+                    results_by_id[result['id']] = {**result, 'score': None}
+        
+        ranked_ids = sorted(results_by_id, key=lambda entry_id: fused_scores[entry_id], reverse=True)[:top_k]
+        
+        results = []
+        for entry_id in ranked_ids:
+            result = {**results_by_id[entry_id], 'fused_score': fused_scores[entry_id]}
+            if entry_id in keyword_scores:
+                result['keyword_score'] = keyword_scores[entry_id]
+            results.append(result)
+        
+        return results
+    
     def _group_results_by_type(self, results: List[Dict]) -> Dict[str, List[Dict]]:
         """
         Группировка результатов поиска по типам сущностей
@@ -119,192 +321,125 @@ class SearchService:
         """
         enriched = {}
         
-        # Обогащение для проектов
-        if 'project' in grouped_results:
-            project_ids = [result['entity_id'] for result in grouped_results['project']]
-            projects = {p.id: p for p in Project.objects.filter(id__in=project_ids)}
-            
-            enriched_projects = []
-            for result in grouped_results['project']:
-                project_id = result['entity_id']
-                if project_id in projects:
-                    result['project'] = {
-                        'id': projects[project_id].id,
-                        'planfix_id': projects[project_id].planfix_id,
-                        'name': projects[project_id].name,
-                        'description': projects[project_id].description,
-                        'status': projects[project_id].status
-                    }
-                enriched_projects.append(result)
-            
-            enriched['project'] = enriched_projects
-        
-        # Обогащение для задач
-        if 'task' in grouped_results:
-            task_ids = [result['entity_id'] for result in grouped_results['task']]
-            tasks = {t.id: t for t in Task.objects.filter(id__in=task_ids)}
-            
-            enriched_tasks = []
-            for result in grouped_results['task']:
-                task_id = result['entity_id']
-                if task_id in tasks:
-                    task = tasks[task_id]
-                    task_data = {
-                        'id': task.id,
-                        'planfix_id': task.planfix_id,
-                        'name': task.name,
-                        'description': task.description,
-                        'status': task.status,
-                        'priority': task.priority,
-                        'due_date': task.due_date.isoformat() if task.due_date else None
-                    }
-                    
-                    if task.project:
-                        task_data['project'] = {
-                            'id': task.project.id,
-                            'planfix_id': task.project.planfix_id,
-                            'name': task.project.name
-                        }
-                    
-                    if task.assignee:
-                        task_data['assignee'] = {
-                            'id': task.assignee.id,
-                            'planfix_id': task.assignee.planfix_id,
-                            'name': task.assignee.name
-                        }
-                    
-                    result['task'] = task_data
-                enriched_tasks.append(result)
-            
-            enriched['task'] = enriched_tasks
-        
-        # Обогащение для сотрудников
-        if 'employee' in grouped_results:
-            employee_ids = [result['entity_id'] for result in grouped_results['employee']]
-            employees = {e.id: e for e in Employee.objects.filter(id__in=employee_ids)}
-            
-            enriched_employees = []
-            for result in grouped_results['employee']:
-                employee_id = result['entity_id']
-                if employee_id in employees:
-                    result['employee'] = {
-                        'id': employees[employee_id].id,
-                        'planfix_id': employees[employee_id].planfix_id,
-                        'name': employees[employee_id].name,
-                        'email': employees[employee_id].email,
-                        'position': employees[employee_id].position
-                    }
-                enriched_employees.append(result)
-            
-            enriched['employee'] = enriched_employees
-        
-        # Обогащение для комментариев
-        if 'comment' in grouped_results:
-            comment_ids = [result['entity_id'] for result in grouped_results['comment']]
-            comments = {c.id: c for c in Comment.objects.filter(id__in=comment_ids)}
-            
-            enriched_comments = []
-            for result in grouped_results['comment']:
-                comment_id = result['entity_id']
-                if comment_id in comments:
-                    comment = comments[comment_id]
-                    comment_data = {
-                        'id': comment.id,
-                        'planfix_id': comment.planfix_id,
-                        'text': comment.text
-                    }
-                    
-                    if comment.task:
-                        comment_data['task'] = {
-                            'id': comment.task.id,
-                            'planfix_id': comment.task.planfix_id,
-                            'name': comment.task.name
-                        }
-                    
-                    if comment.author:
-                        comment_data['author'] = {
-                            'id': comment.author.id,
-                            'planfix_id': comment.author.planfix_id,
-                            'name': comment.author.name
-                        }
-                    
-                    result['comment'] = comment_data
-                enriched_comments.append(result)
-            
-            enriched['comment'] = enriched_comments
-        
-        # Обогащение для документов
-        if 'document' in grouped_results:
-            document_ids = [result['entity_id'] for result in grouped_results['document']]
-            documents = {d.id: d for d in Document.objects.filter(id__in=document_ids)}
-            
-            enriched_documents = []
-            for result in grouped_results['document']:
-                document_id = result['entity_id']
-                if document_id in documents:
-                    document = documents[document_id]
-                    document_data = {
-                        'id': document.id,
-                        'planfix_id': document.planfix_id,
-                        'name': document.name,
-                        'description': document.description,
-                        'file_url': document.file_url,
-                        'file_type': document.file_type
-                    }
-                    
-                    if document.project:
-                        document_data['project'] = {
-                            'id': document.project.id,
-                            'planfix_id': document.project.planfix_id,
-                            'name': document.project.name
-                        }
-                    
-                    result['document'] = document_data
-                enriched_documents.append(result)
-            
-            enriched['document'] = enriched_documents
-        
-        # Обогащение для содержимого документов
-        if 'document_content' in grouped_results:
-            document_ids = [result['entity_id'] for result in grouped_results['document_content']]
-            documents = {d.id: d for d in Document.objects.filter(id__in=document_ids)}
-            
-            enriched_document_contents = []
-            for result in grouped_results['document_content']:
-                document_id = result['entity_id']
-                if document_id in documents:
-                    document = documents[document_id]
-                    document_data = {
-                        'id': document.id,
-                        'planfix_id': document.planfix_id,
-                        'name': document.name,
-                        'description': document.description,
-                        'file_url': document.file_url,
-                        'file_type': document.file_type,
-                        'content_preview': document.content[:500] + '...' if document.content and len(document.content) > 500 else document.content
-                    }
-                    
-                    if document.project:
-                        document_data['project'] = {
-                            'id': document.project.id,
-                            'planfix_id': document.project.planfix_id,
-                            'name': document.project.name
-                        }
-                    
-                    result['document_content'] = document_data
-                enriched_document_contents.append(result)
-            
-            enriched['document_content'] = enriched_document_contents
+        for entity_type, results in grouped_results.items():
+            if entity_type not in ENRICHMENT_PROJECTIONS:
+                continue
+            
+            projections = self._get_projections(entity_type, {result['entity_id'] for result in results})
+            for result in results:
+                projection = projections.get(result['entity_id'])
+                if projection is not None:
+                    result[entity_type] = projection
+            
+            enriched[entity_type] = results
         
         return enriched
     
-    def search_by_keywords(self, keywords: str, entity_types: List[str] = None) -> Dict[str, Any]:
+    def _get_projections(self, entity_type: str, entity_ids: Iterable[int]) -> Dict[int, Dict]:
+        """
+        Данные сущностей для результатов поиска с кэшированием по времени изменения
+        
+        Ключ кэша включает updated_at сущности, поэтому измененная сущность
+        загружается заново, а повторное обогащение неизмененных стоит
+        одного запроса ID и updated_at.
+        
+        Args:
+            entity_type: Тип сущности
+            entity_ids: ID сущностей
+            
+        Returns:
+            Dict[int, Dict]: Данные сущностей по ID (отсутствующие в БД не включаются)
+        """
+        model = ENRICHMENT_PROJECTIONS[entity_type][0]
+        versions = model.objects.filter(id__in=list(entity_ids)).values_list('id', 'updated_at')
+        keys = {
+            entity_id: f"enrichment:{entity_type}:{entity_id}:{updated_at.isoformat()}"
+            for entity_id, updated_at in versions
+        }
+        if not keys:
+            return {}
+        
+        try:
+            cached = cache.get_many(list(keys.values()))
+        except Exception as e:
+            logger.warning(f"Error reading enrichment cache: {e}")
+            cached = {}
+        
+        projections = {entity_id: cached[key] for entity_id, key in keys.items() if key in cached}
+        missing = [entity_id for entity_id in keys if entity_id not in projections]
+        if not missing:
+            return projections
+        
+        fetched = self._fetch_projections(entity_type, missing)
+        projections.update(fetched)
+        
+        try:
+            cache.set_many(
+                {keys[entity_id]: projection for entity_id, projection in fetched.items()},
+                timeout=settings.ENRICHMENT_CACHE_TTL
+            )
+        except Exception as e:
+            logger.warning(f"Error writing enrichment cache: {e}")
+        
+        return projections
+    
+    def _fetch_projections(self, entity_type: str, entity_ids: List[int]) -> Dict[int, Dict]:
+        """
+        Загрузка данных сущностей одним запросом только нужных столбцов
+        
+        Связанные сущности присоединяются в том же запросе, от содержимого
+        документа загружается только начало для предпросмотра.
+        
+        Args:
+            entity_type: Тип сущности
+            entity_ids: ID сущностей
+            
+        Returns:
+            Dict[int, Dict]: Данные сущностей по ID
+        """
+        model, fields, related = ENRICHMENT_PROJECTIONS[entity_type]
+        
+        rows = model.objects.filter(id__in=entity_ids)
+        columns = list(fields)
+        if entity_type == 'document_content':
+            # Лишний символ показывает, что содержимое длиннее предпросмотра
+            rows = rows.annotate(content_start=Substr('content', 1, CONTENT_PREVIEW_LENGTH + 1))
+            columns.append('content_start')
+        columns.extend(f"{relation}__{field}" for relation, related_fields in related for field in related_fields)
+        
+        projections = {}
+        for row in rows.values(*columns):
+            projection = {field: row[field] for field in fields}
+            if projection.get('due_date') is not None:
+                projection['due_date'] = projection['due_date'].isoformat()
+            
+            if entity_type == 'document_content':
+                content = row['content_start']
+                projection['content_preview'] = (
+                    content[:CONTENT_PREVIEW_LENGTH] + '...' if content and len(content) > CONTENT_PREVIEW_LENGTH else content
+                )
+            
+            for relation, related_fields in related:
+                if row[f"{relation}__id"] is not None:
+                    projection[relation] = {field: row[f"{relation}__{field}"] for field in related_fields}
+            
+            projections[row['id']] = projection
+        
+        return projections
+    
+    def search_by_keywords(self, keywords: str, entity_types: List[str] = None,
+                           limit: int = 20, offset: int = 0) -> Dict[str, Any]:
         """
         Поиск по ключевым словам с использованием полнотекстового поиска
         
+        Запрос выполняется по столбцу search_vector (индекс GIN) с ранжированием
+        ts_rank, а ограничение и смещение применяются в SQL.
+        
         Args:
             keywords: Ключевые слова для поиска
             entity_types: Список типов сущностей для поиска
+            limit: Количество результатов на странице
+            offset: Смещение от начала результатов
             
         Returns:
             Dict: Результаты поиска
@@ -312,32 +447,41 @@ class SearchService:
         start_time = timezone.now()
         
         try:
-            # Построение запроса
-            query = Q()
+            # Запись подходит, если содержит хотя бы одно из слов
+            search_query = None
             for keyword in keywords.split():
-                query |= Q(text__icontains=keyword)
-            
-            # Фильтрация по типам сущностей
-            if entity_types:
-                entity_type_query = Q()
-                for entity_type in entity_types:
-                    entity_type_query |= Q(entity_type=entity_type)
-                query &= entity_type_query
-            
-            # Выполнение поиска
-            results = VectorEntry.objects.filter(query)
-            
-            # Преобразование результатов
-            vector_results = []
-            for entry in results:
-                vector_results.append({
-                    'id': entry.id,
-                    'entity_type': entry.entity_type,
-                    'entity_id': entry.entity_id,
-                    'text': entry.text,
-                    'metadata': entry.metadata,
-                    'score': 1.0  # Нет оценки релевантности для полнотекстового поиска
-                })
+                keyword_query = SearchQuery(keyword, config=settings.FULLTEXT_SEARCH_CONFIG)
+                search_query = keyword_query if search_query is None else search_query | keyword_query
+            
+            if search_query is None:
+                total_results, vector_results = 0, []
+            else:
+                entries = VectorEntry.objects.filter(search_vector=search_query)
+                
+                # Фильтрация по типам сущностей
+                if entity_types:
+                    entries = entries.filter(entity_type__in=entity_types)
+                
+                total_results = entries.count()
+                
+                # Эмбеддинги не загружаются, для результатов нужны только текст и метаданные
+                ranked_entries = entries.annotate(
+                    rank=SearchRank(F('search_vector'), search_query)
+                ).order_by('-rank', 'id').values(
+                    'id', 'entity_type', 'entity_id', 'text', 'metadata', 'rank'
+                )[offset:offset + limit]
+                
+                # Преобразование результатов
+                vector_results = []
+                for entry in ranked_entries:
+                    vector_results.append({
+                        'id': entry['id'],
+                        'entity_type': entry['entity_type'],
+                        'entity_id': entry['entity_id'],
+                        'text': entry['text'],
+                        'metadata': entry['metadata'],
+                        'score': entry['rank']
+                    })
             
             # Группировка и обогащение результатов
             grouped_results = self._group_results_by_type(vector_results)
@@ -347,7 +491,7 @@ class SearchService:
             end_time = timezone.now()
             duration_ms = int((end_time - start_time).total_seconds() * 1000)
             
-            SearchLog.objects.create(
+            log_search(
                 query=f"keywords:{keywords}",
                 results_count=len(vector_results),
                 duration_ms=duration_ms
@@ -355,7 +499,9 @@ class SearchService:
             
             return {
                 'query': keywords,
-                'total_results': len(vector_results),
+                'total_results': total_results,
+                'limit': limit,
+                'offset': offset,
                 'duration_ms': duration_ms,
                 'results': enriched_results
             }
@@ -366,7 +512,7 @@ class SearchService:
             end_time = timezone.now()
             duration_ms = int((end_time - start_time).total_seconds() * 1000)
             
-            SearchLog.objects.create(
+            log_search(
                 query=f"keywords:{keywords}",
                 results_count=0,
                 duration_ms=duration_ms
@@ -0,0 +1,547 @@
+import os
+import re
+import hashlib
+import heapq
+import logging
+import threading
+import numpy as np
+import faiss
+from itertools import chain
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager, ExitStack
+from typing import List, Dict, Optional, Iterable, Callable
+from django.conf import settings
+from django.db.models import Q
+from ..models import VectorEntry, VectorIndex
+from .vector_index import BaseVectorIndexService, VectorIndexService, DEFAULT_INDEX_CONFIG, record_timing
+
+logger = logging.getLogger(__name__)
+
+# Шард для записей, в метаданных которых нет ключа шардирования
+NO_SHARD_VALUE = 'none'
+
+
+class ShardedVectorIndexService(BaseVectorIndexService):
+    """
+    Векторный индекс, разделенный на шарды по ключу метаданных записей
+    
+    Каждый шард — отдельный VectorIndexService со своим файлом и записью
+    VectorIndex, связанной с родительской записью реестра. Запросы с фильтром
+    по ключу шардирования выполняются только в своем шарде, остальные
+    параллельно во всех шардах с объединением результатов.
+    """
+    def __init__(self, index_name='default', dimension=None, shard_by=None, hot_reload: Optional[bool] = None,
+                 load: bool = True):
+        super().__init__(index_name, dimension)
+        self.shard_by = shard_by or settings.VECTOR_INDEX_SHARD_BY
+        
+        # Без загрузки шарды создаются пустыми построителями (см. build_generation)
+        self._load = load
+        
+        # Шарды по значению ключа и шард, в котором хранится каждая запись
+        self.shards = {}
+        self._entry_shards = {}
+        
+        self._lock = threading.RLock()
+        self._executor = ThreadPoolExecutor(
+            max_workers=settings.VECTOR_INDEX_SHARD_WORKERS,
+            thread_name_prefix=f"vector-index-shards-{index_name}"
+        )
+        
+        self._registry = None
+        try:
+            self._registry = self._get_registry()
+            if load:
+                self._load_shards()
+        except Exception as e:
+            logger.error(f"Error loading sharded FAISS index {index_name}: {e}")
+        
+        # Новые поколения шардов загружаются одним общим потоком
+        if load and (settings.VECTOR_INDEX_HOT_RELOAD if hot_reload is None else hot_reload):
+            self._start_reload_listener()
+    
+    @classmethod
+    def build_generation(cls, index_name: str = 'default',
+                         progress_callback: Optional[Callable[[int, int], None]] = None) -> int:
+        """
+        Построение новых поколений всех шардов или одного шарда без загрузки текущих
+        
+        Args:
+            index_name: Имя шардированного индекса или индекса шарда
+            progress_callback: Функция, получающая количество обработанных и всех записей
+            
+        Returns:
+            int: Количество векторов в перестроенных шардах
+        """
+        registry = VectorIndex.objects.filter(name=index_name).select_related('parent').first()
+        if registry is None:
+            raise ValueError(f"Unknown vector index {index_name}")
+        
+        parent = registry.parent or registry
+        builder = cls(parent.name, parent.dimension, shard_by=parent.config.get('shard_by'), hot_reload=False, load=False)
+        try:
+            shard_values = [registry.shard_value] if registry.parent_id is not None else None
+            return builder.rebuild(progress_callback, shard_values=shard_values)
+        finally:
+            builder._executor.shutdown(wait=False)
+    
+    def _get_registry(self) -> VectorIndex:
+        """
+        Получение родительской записи реестра индексов
+        
+        Returns:
+            VectorIndex: Запись реестра
+        """
+        registry, created = VectorIndex.objects.get_or_create(
+            name=self.index_name,
+            defaults={
+                'index_type': 'faiss',
+                'dimension': self.dimension,
+                'entity_types': [],
+                'config': {'metric': 'cosine', 'index': settings.VECTOR_INDEX_TYPE, 'shard_by': self.shard_by},
+                'is_active': True
+            }
+        )
+        
+        if registry.config.get('shard_by') != self.shard_by:
+            registry.config = {**registry.config, 'shard_by': self.shard_by}
+            registry.save(update_fields=['config', 'last_updated'])
+        
+        return registry
+    
+    @property
+    def config(self) -> Dict:
+        """
+        Конфигурация индекса шардов из родительской записи реестра
+        """
+        registry_config = self._registry.config if self._registry is not None else {}
+        return {**DEFAULT_INDEX_CONFIG, **registry_config, 'index': self.index_type}
+    
+    @property
+    def index_type(self) -> str:
+        """
+        Тип индекса FAISS шардов
+        """
+        if self._registry is None:
+            return settings.VECTOR_INDEX_TYPE
+        return self._registry.config.get('index', settings.VECTOR_INDEX_TYPE)
+    
+    def _get_shard_value(self, metadata: Optional[Dict]) -> str:
+        """
+        Получение значения ключа шардирования для записи
+        
+        Args:
+            metadata: Метаданные записи
+        
+        Returns:
+            str: Значение ключа шардирования
+        """
+        value = (metadata or {}).get(self.shard_by)
+        return NO_SHARD_VALUE if value is None else str(value)
+    
+    def _get_shard_name(self, value: str) -> str:
+        """
+        Получение имени индекса шарда
+        
+        Args:
+            value: Значение ключа шардирования
+        
+        Returns:
+            str: Имя индекса
+        """
+        return f"{self.index_name}__{self.shard_by}_{value}"
+    
+    def _get_shard_filter(self, value: str) -> Q:
+        """
+        Условие отбора записей шарда
+        
+        Args:
+            value: Значение ключа шардирования
+        
+        Returns:
+            Q: Условие для VectorEntry
+        """
+        key = f"metadata__{self.shard_by}"
+        if value == NO_SHARD_VALUE:
+            return ~Q(metadata__has_key=self.shard_by) | Q(**{key: None})
+        
+        # В метаданных ID хранятся числами, а значение шарда — строкой
+        candidates = [value]
+        if re.fullmatch(r'-?\d+', value):
+            candidates.append(int(value))
+        return Q(**{f"{key}__in": candidates})
+    
+    def _get_shard_values_from_db(self) -> List[str]:
+        """
+        Получение всех значений ключа шардирования из векторных записей
+        
+        Returns:
+            List[str]: Значения ключа шардирования
+        """
+        values = VectorEntry.objects.values_list(f"metadata__{self.shard_by}", flat=True).distinct()
+        return sorted({NO_SHARD_VALUE if value is None else str(value) for value in values})
+    
+    def _get_shard(self, value: str) -> VectorIndexService:
+        """
+        Получение шарда с его созданием при необходимости
+        
+        Args:
+            value: Значение ключа шардирования
+        
+        Returns:
+            VectorIndexService: Индекс шарда
+        """
+        shard = self.shards.get(value)
+        if shard is not None:
+            return shard
+        
+        name = self._get_shard_name(value)
+        VectorIndex.objects.get_or_create(
+            name=name,
+            defaults={
+                'index_type': 'faiss',
+                'dimension': self.dimension,
+                'entity_types': [],
+                'config': {
+                    'metric': 'cosine',
+                    'index': self.index_type
+                },
+                'is_active': True,
+                'parent': self._registry,
+                'shard_value': value
+            }
+        )
+        
+        shard = VectorIndexService(name, self.dimension, entry_filter=self._get_shard_filter(value), hot_reload=False,
+                                   load=self._load)
+        if self._load:
+            entry_ids = shard.get_entry_ids()
+        else:
+            shard._load_config()
+            entry_ids = np.empty(0, dtype=np.int64)
+        
+        with self._lock:
+            if value in self.shards:
+                return self.shards[value]
+            
+            self.shards[value] = shard
+            for entry_id in entry_ids.tolist():
+                self._entry_shards[entry_id] = value
+        
+        return shard
+    
+    def _load_shards(self) -> None:
+        """
+        Параллельная загрузка всех известных шардов
+        """
+        values = set(self._registry.shards.values_list('shard_value', flat=True))
+        values.update(self._get_shard_values_from_db())
+        
+        list(self._executor.map(self._get_shard, sorted(values)))
+        logger.info(f"Loaded {len(self.shards)} shards of FAISS index {self.index_name} by {self.shard_by}")
+    
+    def _select_shards(self, filter_criteria: Optional[Dict]) -> List[VectorIndexService]:
+        """
+        Выбор шардов, в которых нужно выполнить поиск
+        
+        Args:
+            filter_criteria: Критерии фильтрации результатов
+        
+        Returns:
+            List[VectorIndexService]: Шарды
+        """
+        metadata = (filter_criteria or {}).get('metadata') or {}
+        if self.shard_by in metadata:
+            shard = self.shards.get(self._get_shard_value(metadata))
+            return [shard] if shard is not None else []
+        return list(self.shards.values())
+    
+    def search_vectors(self, query_vectors: np.ndarray, top_k: int = 10, filter_criteria: Dict = None,
+                       nprobe: Optional[int] = None, ef_search: Optional[int] = None,
+                       timings: Optional[Dict[str, float]] = None) -> List[List[Dict]]:
+        """
+        Поиск по шардам с объединением лучших результатов
+        
+        Args:
+            query_vectors: Векторы запросов (по одному в строке)
+            top_k: Количество результатов для каждого запроса
+            filter_criteria: Критерии фильтрации результатов
+            nprobe: IVF: количество просматриваемых кластеров
+            ef_search: HNSW: ширина поиска
+            timings: Словарь, в который добавляются длительности этапов в миллисекундах
+        
+        Returns:
+            List[List[Dict]]: Результаты поиска для каждого запроса
+        """
+        query_vectors = np.array(query_vectors, dtype=np.float32)
+        
+        shards = self._select_shards(filter_criteria)
+        if not shards:
+            return [[] for _ in range(len(query_vectors))]
+        
+        def search_shard(shard):
+            return shard._search_hits(query_vectors, top_k, filter_criteria, nprobe, ef_search)
+        
+        with record_timing(timings, 'index_search_ms'):
+            # Нормализация векторов для косинусного сходства
+            faiss.normalize_L2(query_vectors)
+            
+            if len(shards) == 1:
+                shard_results = [search_shard(shards[0])]
+            else:
+                shard_results = list(self._executor.map(search_shard, shards))
+            
+            # Если хотя бы один шард не применил фильтры при поиске, они проверяются целиком
+            residual_criteria = filter_criteria if any(residual for _, residual in shard_results) else {}
+            limit = top_k * 3 if residual_criteria else top_k
+            
+            hits = [
+                heapq.nlargest(limit, chain.from_iterable(shard_hits[q] for shard_hits, _ in shard_results), key=lambda hit: hit[1])
+                for q in range(len(query_vectors))
+            ]
+        
+        return self._hydrate_hits(hits, top_k, residual_criteria, timings)
+    
+    def upsert_vectors(self, entries: List[VectorEntry]) -> int:
+        """
+        Добавление или замена векторов в шардах по их метаданным
+        
+        Args:
+            entries: Векторные записи
+        
+        Returns:
+            int: Количество записанных векторов
+        """
+        groups = {}
+        moved = {}
+        for entry in entries:
+            if entry is None or not entry.embedding:
+                continue
+            
+            value = self._get_shard_value(entry.metadata)
+            groups.setdefault(value, []).append(entry)
+            
+            # Запись, сменившая значение ключа, удаляется из прежнего шарда
+            previous = self._entry_shards.get(entry.id)
+            if previous is not None and previous != value:
+                moved.setdefault(previous, []).append(entry.id)
+        
+        for value, entry_ids in moved.items():
+            self.shards[value].remove_vectors(entry_ids)
+        
+        count = 0
+        for value, group in groups.items():
+            written = self._get_shard(value).upsert_vectors(group)
+            if written:
+                with self._lock:
+                    for entry in group:
+                        self._entry_shards[entry.id] = value
+            count += written
+        
+        return count
+    
+    def remove_vectors(self, entry_ids: List[int]) -> int:
+        """
+        Удаление векторов из шардов, в которых они хранятся
+        
+        Args:
+            entry_ids: ID векторных записей
+        
+        Returns:
+            int: Количество помеченных на удаление векторов
+        """
+        groups = {}
+        with self._lock:
+            for entry_id in entry_ids:
+                value = self._entry_shards.pop(int(entry_id), None)
+                if value is not None:
+                    groups.setdefault(value, []).append(int(entry_id))
+        
+        return sum(self.shards[value].remove_vectors(ids) for value, ids in groups.items())
+    
+    def flush(self) -> bool:
+        """
+        Сохранение измененных шардов на диск
+        
+        Returns:
+            bool: Был ли сохранен хотя бы один шард
+        """
+        return any([shard.flush() for shard in list(self.shards.values())])
+    
+    @contextmanager
+    def batch(self):
+        """
+        Пакетные изменения всех шардов с сохранением при выходе из блока
+        """
+        with ExitStack() as stack:
+            for shard in list(self.shards.values()):
+                stack.enter_context(shard.batch())
+            yield self
+    
+    def train(self, vectors: Optional[np.ndarray] = None) -> bool:
+        """
+        Обучение шардов на выборках их эмбеддингов
+        
+        Args:
+            vectors: Нормализованные векторы, из которых берется выборка
+                     (по умолчанию выборка загружается из записей каждого шарда)
+        
+        Returns:
+            bool: Готовы ли все шарды к добавлению векторов
+        """
+        return all([shard.train(vectors) for shard in list(self.shards.values())])
+    
+    def compact(self) -> int:
+        """
+        Физическое удаление помеченных на удаление векторов из всех шардов
+        
+        Returns:
+            int: Количество удаленных векторов
+        """
+        return sum(shard.compact() for shard in list(self.shards.values()))
+    
+    def reload(self) -> bool:
+        """
+        Переход шардов на их последние сохраненные поколения
+        
+        Returns:
+            bool: Был ли загружен новый индекс хотя бы одного шарда
+        """
+        return any([shard.reload() for shard in list(self.shards.values())])
+    
+    def reconstruct_vectors(self, entry_ids: np.ndarray) -> np.ndarray:
+        """
+        Получение векторов, хранящихся в шардах, по ID записей
+        
+        Args:
+            entry_ids: ID записей, присутствующих в индексе
+            
+        Returns:
+            np.ndarray: Векторы в порядке ID
+        """
+        entry_ids = np.asarray(entry_ids, dtype=np.int64)
+        vectors = np.empty((len(entry_ids), self.dimension), dtype=np.float32)
+        
+        positions = {}
+        with self._lock:
+            for position, entry_id in enumerate(entry_ids.tolist()):
+                positions.setdefault(self._entry_shards[entry_id], []).append(position)
+        
+        for value, shard_positions in positions.items():
+            vectors[shard_positions] = self.shards[value].reconstruct_vectors(entry_ids[shard_positions])
+        return vectors
+    
+    def get_generation(self) -> str:
+        """
+        Поколение индекса, изменяющееся при любом изменении шардов
+        
+        Returns:
+            str: Хэш поколений всех шардов, упорядоченных по значению ключа шардирования
+        """
+        generations = sorted((str(value), str(shard.get_generation())) for value, shard in list(self.shards.items()))
+        return hashlib.sha256(repr(generations).encode('utf-8')).hexdigest()[:16]
+    
+    def get_entry_ids(self) -> np.ndarray:
+        """
+        Получение ID записей, хранящихся во всех шардах
+        
+        Returns:
+            np.ndarray: Отсортированные ID записей
+        """
+        ids = [shard.get_entry_ids() for shard in list(self.shards.values())]
+        if not ids:
+            return np.empty(0, dtype=np.int64)
+        return np.sort(np.concatenate(ids))
+    
+    def rebuild(self, progress_callback: Optional[Callable[[int, int], None]] = None,
+                shard_values: Optional[Iterable[str]] = None) -> int:
+        """
+        Параллельное перестроение шардов по данным БД
+        
+        Args:
+            progress_callback: Функция, получающая количество обработанных и всех записей
+            shard_values: Значения ключа шардирования (по умолчанию все значения из БД)
+            
+        Returns:
+            int: Количество векторов в перестроенных шардах
+        """
+        values = [str(value) for value in shard_values] if shard_values is not None else self._get_shard_values_from_db()
+        shards = [self._get_shard(value) for value in values]
+        
+        # Прогресс шардов суммируется в общий
+        progress = {}
+        progress_lock = threading.Lock()
+        
+        def rebuild_shard(value, shard):
+            def report_progress(processed, total):
+                with progress_lock:
+                    progress[value] = (processed, total)
+                    if progress_callback is not None:
+                        progress_callback(sum(p for p, _ in progress.values()), sum(t for _, t in progress.values()))
+            
+            count = shard.rebuild(report_progress)
+            return count, shard.get_entry_ids()
+        
+        # Перестроение выполняется в отдельном пуле и не занимает потоки поиска
+        total_count = 0
+        with ThreadPoolExecutor(max_workers=settings.VECTOR_INDEX_SHARD_WORKERS,
+                                thread_name_prefix=f"vector-index-rebuild-{self.index_name}") as executor:
+            for value, (count, entry_ids) in zip(values, executor.map(rebuild_shard, values, shards)):
+                with self._lock:
+                    for entry_id in entry_ids.tolist():
+                        self._entry_shards[entry_id] = value
+                total_count += count
+        
+        logger.info(f"Rebuilt {len(shards)} shards of FAISS index {self.index_name}")
+        return total_count
+    
+    def get_shard_value(self, shard_name: str) -> Optional[str]:
+        """
+        Получение значения ключа шардирования по имени индекса шарда
+        
+        Args:
+            shard_name: Имя индекса шарда
+            
+        Returns:
+            Optional[str]: Значение ключа или None, если имя не относится к этому индексу
+        """
+        prefix = self._get_shard_name('')
+        if not shard_name.startswith(prefix):
+            return None
+        return shard_name[len(prefix):]
+    
+    def _get_generation_pattern(self) -> str:
+        """
+        Шаблон каналов Redis, в которые публикуются новые поколения шардов
+        
+        Returns:
+            str: Шаблон каналов
+        """
+        return f"vector_index:{self.index_name}__*:generation"
+    
+    def check_for_update(self) -> bool:
+        """
+        Загрузка новых поколений шардов и шардов, созданных другими процессами
+        
+        Returns:
+            bool: Был ли загружен хотя бы один новый индекс
+        """
+        reloaded = False
+        
+        # Шарды, созданные другими процессами, обнаруживаются по файлам метаданных
+        pattern = re.compile(rf"^index_{re.escape(self.index_name)}__{re.escape(self.shard_by)}_(.+)\.meta\.json$")
+        index_dir = os.path.join(settings.BASE_DIR, 'vector_indices')
+        if os.path.exists(index_dir):
+            for file_name in os.listdir(index_dir):
+                match = pattern.match(file_name)
+                if match and match.group(1) not in self.shards:
+                    try:
+                        self._get_shard(match.group(1))
+                        reloaded = True
+                    except Exception as e:
+                        logger.error(f"Error loading new shard {match.group(1)}: {e}")
+        
+        for shard in list(self.shards.values()):
+            reloaded = shard.check_for_update() or reloaded
+        
+        return reloaded
\ No newline at end of file
@@ -1,154 +1,381 @@
 import os
+import re
+import time
+import atexit
 import logging
+import threading
 import numpy as np
 import faiss
 import json
-from typing import List, Dict, Any, Optional, Tuple
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from typing import List, Dict, Any, Optional, Tuple, Callable, Union, Type
 from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.db.models import Q, QuerySet
 from django.utils import timezone
-from ..models import VectorEntry, VectorIndex, SearchLog
-from .embeddings_service import generate_embeddings
+from django_redis import get_redis_connection
+from ..models import VectorEntry, VectorIndex
+from .embeddings_service import generate_embeddings, generate_batch_embeddings
+from .filter_index import EntryFilterIndex
+from .bulk_export import export_embeddings
+from .search_log_writer import log_search
 
 logger = logging.getLogger(__name__)
 
-class VectorIndexService:
+# Типы индексов FAISS, выбираемые через VectorIndex.config['index']
+FAISS_INDEX_TYPES = ('flat', 'ivf', 'hnsw', 'ivfpq', 'opq')
+
+# Индексы на основе инвертированных списков, требующие обучения
+IVF_INDEX_TYPES = ('ivf', 'ivfpq', 'opq')
+
+# Индексы, хранящие сжатые векторы (product quantization)
+COMPRESSED_INDEX_TYPES = ('ivfpq', 'opq')
+
+# Флаги чтения индекса с отображением в память без копирования векторов
+# в память процесса. IO_FLAG_MMAP_IFC (есть в новых версиях FAISS) отображает
+# данные индексов любого типа, IO_FLAG_MMAP - только инвертированные списки IVF
+MMAP_IFC_SUPPORTED = hasattr(faiss, 'IO_FLAG_MMAP_IFC')
+
+# Параметры индекса по умолчанию
+DEFAULT_INDEX_CONFIG = {
+    'metric': 'cosine',
+    'index': 'flat',
+    'nlist': 1024,  # IVF: количество кластеров
+    'nprobe': 16,  # IVF: количество просматриваемых кластеров
+    'M': 32,  # HNSW: количество связей узла графа
+    'ef_construction': 200,  # HNSW: ширина поиска при построении
+    'ef_search': 64,  # HNSW: ширина поиска при запросе
+    'pq_m': 64,  # PQ: количество подквантователей (байт на вектор при 8 битах)
+    'pq_nbits': 8,  # PQ: бит на код подквантователя
+    'rerank_factor': 4,  # PQ: во сколько раз больше кандидатов переранжируется точно
+    'train_sample_size': 50000  # Размер обучающей выборки
+}
+
+
+def create_faiss_index(dimension: int, config: Dict = None) -> faiss.Index:
     """
-    Сервис для работы с векторными индексами с использованием FAISS
+    Создание пустого индекса FAISS по конфигурации
+    
+    Все индексы используют VectorEntry.id в качестве идентификаторов FAISS
+    и скалярное произведение нормализованных векторов (косинусное сходство).
+    
+    Args:
+        dimension: Размерность векторов
+        config: Конфигурация индекса (VectorIndex.config)
+        
+    Returns:
+        faiss.Index: Пустой индекс
+    """
+    config = {**DEFAULT_INDEX_CONFIG, **(config or {})}
+    index_type = config['index']
+    
+    if index_type == 'flat':
+        return faiss.index_factory(dimension, "IDMap2,Flat", faiss.METRIC_INNER_PRODUCT)
+    
+    if index_type in IVF_INDEX_TYPES:
+        # IVF хранит ID в инвертированных списках и не нуждается в IDMap
+        if index_type == 'ivf':
+            description = f"IVF{config['nlist']},Flat"
+        else:
+            description = f"IVF{config['nlist']},PQ{config['pq_m']}x{config['pq_nbits']}"
+            if index_type == 'opq':
+                # Поворот пространства перед квантованием уменьшает ошибку PQ
+                description = f"OPQ{config['pq_m']},{description}"
+        
+        index = faiss.index_factory(dimension, description, faiss.METRIC_INNER_PRODUCT)
+        faiss.extract_index_ivf(index).nprobe = config['nprobe']
+        return index
+    
+    if index_type == 'hnsw':
+        index = faiss.index_factory(dimension, f"IDMap2,HNSW{config['M']}", faiss.METRIC_INNER_PRODUCT)
+        hnsw_index = faiss.downcast_index(index.index)
+        hnsw_index.hnsw.efConstruction = config['ef_construction']
+        hnsw_index.hnsw.efSearch = config['ef_search']
+        return index
+    
+    raise ValueError(f"Unsupported FAISS index type: {index_type}")
+
+
+def get_mmap_io_flags(index_type: str) -> int:
+    """
+    Флаги чтения индекса FAISS с отображением файла в память
+    
+    Args:
+        index_type: Тип индекса
+        
+    Returns:
+        int: Флаги faiss.read_index (0, если индекс этого типа
+        не отображается в память данной версией FAISS)
+    """
+    if MMAP_IFC_SUPPORTED:
+        return faiss.IO_FLAG_MMAP_IFC | faiss.IO_FLAG_READ_ONLY
+    if index_type in IVF_INDEX_TYPES:
+        return faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY
+    return 0
+
+
+def get_faiss_index_type(index: faiss.Index) -> Optional[str]:
+    """
+    Определение типа загруженного индекса FAISS
+    
+    Args:
+        index: Индекс FAISS
+        
+    Returns:
+        Optional[str]: Тип индекса или None, если индекс не хранит ID записей
+    """
+    if isinstance(index, faiss.IndexIDMap2):
+        base_index = faiss.downcast_index(index.index)
+        if isinstance(base_index, faiss.IndexFlat):
+            return 'flat'
+        if isinstance(base_index, faiss.IndexHNSW):
+            return 'hnsw'
+    
+    if isinstance(index, faiss.IndexPreTransform):
+        if isinstance(faiss.downcast_index(index.index), faiss.IndexIVFPQ):
+            return 'opq'
+    
+    if isinstance(index, faiss.IndexIVFPQ):
+        return 'ivfpq'
+    
+    if isinstance(index, faiss.IndexIVFFlat):
+        return 'ivf'
+    
+    return None
+
+
+def get_faiss_index_ids(index: faiss.Index) -> np.ndarray:
+    """
+    Получение ID записей, хранящихся в индексе FAISS
+    
+    Args:
+        index: Индекс FAISS
+        
+    Returns:
+        np.ndarray: Отсортированные ID записей
+    """
+    if isinstance(index, faiss.IndexIDMap2):
+        ids = faiss.vector_to_array(index.id_map)
+        # Векторы HNSW без ID не считаются хранящимися в индексе
+        ids = ids[ids != -1]
+    else:
+        invlists = faiss.extract_index_ivf(index).invlists
+        ids_parts = [np.empty(0, dtype=np.int64)]
+        for list_no in range(invlists.nlist):
+            list_size = invlists.list_size(list_no)
+            if list_size:
+                ids_parts.append(faiss.rev_swig_ptr(invlists.get_ids(list_no), list_size).copy())
+        ids = np.concatenate(ids_parts)
+    
+    return np.sort(ids.astype(np.int64))
+
+
+
+@contextmanager
+def record_timing(timings: Optional[Dict[str, float]], stage: str):
+    """
+    Замер длительности этапа поиска
+    
+    Повторные замеры одного этапа суммируются.
+    
+    Args:
+        timings: Длительности этапов в миллисекундах (None — замер не нужен)
+        stage: Название этапа (поле SearchLog)
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        if timings is not None:
+            timings[stage] = timings.get(stage, 0.0) + (time.perf_counter() - start) * 1000
+
+class BaseVectorIndexService(ABC):
+    """
+    Общий интерфейс сервисов векторного индекса
+    
+    Бэкенды (FAISS в процессе, шардированный FAISS, сервер поиска, pgvector)
+    реализуют поиск по векторам и изменение индекса. Поиск по тексту, загрузка
+    данных записей и фильтры, проверяемые после поиска, общие для всех бэкендов.
     """
     def __init__(self, index_name='default', dimension=None):
         self.index_name = index_name
         self.dimension = dimension or settings.VECTOR_DIMENSION
-        self.index = None
-        self.id_to_entry_map = {}
+    
+    def _get_entries(self) -> QuerySet:
+        """
+        Получение векторных записей, хранящихся в этом индексе
         
-        # Попытка загрузить существующий индекс
-        self._load_or_create_index()
+        Returns:
+            QuerySet: Записи VectorEntry
+        """
+        return VectorEntry.objects.all()
     
-    def _load_or_create_index(self) -> None:
+    @property
+    def index_type(self) -> str:
         """
-        Загрузка существующего или создание нового индекса
+        Тип индекса из конфигурации
         """
-        try:
-            # Попытка получить информацию об индексе из БД
-            vector_index, created = VectorIndex.objects.get_or_create(
-                name=self.index_name,
-                defaults={
-                    'index_type': 'faiss',
-                    'dimension': self.dimension,
-                    'entity_types': [],
-                    'config': {'metric': 'cosine'},
-                    'is_active': True
-                }
-            )
+        return self.config['index']
+    
+    @abstractmethod
+    def search_vectors(self, query_vectors: np.ndarray, top_k: int = 10, filter_criteria: Dict = None,
+                       nprobe: Optional[int] = None, ef_search: Optional[int] = None,
+                       timings: Optional[Dict[str, float]] = None) -> List[List[Dict]]:
+        """
+        Поиск по индексу для нескольких векторов запросов
+        
+        Args:
+            query_vectors: Векторы запросов (по одному в строке)
+            top_k: Количество результатов для каждого запроса
+            filter_criteria: Критерии фильтрации результатов, общие для всех запросов
+            nprobe: IVF: количество просматриваемых кластеров
+            ef_search: HNSW: ширина поиска
+            timings: Словарь, в который добавляются длительности этапов в миллисекундах
             
-            # Обновляем размерность, если она была изменена
-            if vector_index.dimension != self.dimension:
-                vector_index.dimension = self.dimension
-                vector_index.save()
+        Returns:
+            List[List[Dict]]: Результаты поиска для каждого запроса
+        """
+    
+    @abstractmethod
+    def upsert_vectors(self, entries: List[VectorEntry]) -> int:
+        """
+        Добавление или замена векторов в индексе без его перестроения
+        
+        Args:
+            entries: Векторные записи
             
-            # Путь к файлу индекса
-            index_file = f"index_{self.index_name}.faiss"
-            index_path = os.path.join(settings.BASE_DIR, 'vector_indices', index_file)
+        Returns:
+            int: Количество записанных векторов
+        """
+    
+    @abstractmethod
+    def remove_vectors(self, entry_ids: List[int]) -> int:
+        """
+        Удаление векторов из индекса
+        
+        Args:
+            entry_ids: ID векторных записей
             
-            # Проверка наличия директории
-            index_dir = os.path.dirname(index_path)
-            if not os.path.exists(index_dir):
-                os.makedirs(index_dir)
+        Returns:
+            int: Количество удаленных векторов
+        """
+    
+    @abstractmethod
+    def rebuild(self, progress_callback: Optional[Callable[[int, int], None]] = None) -> int:
+        """
+        Перестроение индекса по данным БД
+        
+        Args:
+            progress_callback: Функция, получающая количество обработанных и всех записей
             
-            # Проверка наличия файла индекса
-            if os.path.exists(index_path):
-                # Загрузка существующего индекса
-                self.index = faiss.read_index(index_path)
-                logger.info(f"Loaded existing FAISS index from {index_path}")
-                
-                # Загрузка маппинга ID к записям
-                self._load_id_mapping()
-            else:
-                # Создание нового индекса
-                self.index = faiss.IndexFlatIP(self.dimension)  # Cosine similarity using IP (inner product)
-                logger.info("Created new FAISS index")
-                
-                # Добавление всех существующих векторных записей в индекс
-                self._rebuild_index()
-        except Exception as e:
-            logger.error(f"Error loading/creating FAISS index: {e}")
-            # Создание резервного индекса в памяти
-            self.index = faiss.IndexFlatIP(self.dimension)
+        Returns:
+            int: Количество векторов в новом индексе
+        """
     
-    def _load_id_mapping(self) -> None:
+    @abstractmethod
+    def get_generation(self) -> Union[int, str]:
         """
-        Загрузка маппинга идентификаторов к записям
+        Поколение индекса, по которому видны изменения для кэша результатов
+        
+        Returns:
+            Union[int, str]: Значение, меняющееся при каждом изменении индекса
         """
-        try:
-            entries = VectorEntry.objects.all()
-            for i, entry in enumerate(entries):
-                self.id_to_entry_map[i] = entry.id
-            logger.info(f"Loaded {len(self.id_to_entry_map)} entries to ID mapping")
-        except Exception as e:
-            logger.error(f"Error loading ID mapping: {e}")
-            self.id_to_entry_map = {}
     
-    def _rebuild_index(self) -> None:
+    @abstractmethod
+    def reload(self) -> bool:
         """
-        Перестроение индекса с использованием всех существующих векторных записей
+        Переход на последнее сохраненное поколение индекса
+        
+        Returns:
+            bool: Был ли загружен новый индекс
         """
-        try:
-            entries = VectorEntry.objects.all()
-            if not entries:
-                logger.info("No vector entries found for rebuilding index")
-                return
-            
-            # Сбор векторов
-            vectors = []
-            self.id_to_entry_map = {}
-            
-            for i, entry in enumerate(entries):
-                vectors.append(np.array(entry.embedding, dtype=np.float32))
-                self.id_to_entry_map[i] = entry.id
-            
-            if vectors:
-                # Объединение векторов в массив
-                vectors_array = np.vstack(vectors).astype(np.float32)
-                
-                # Нормализация векторов для косинусного сходства
-                faiss.normalize_L2(vectors_array)
-                
-                # Добавление векторов в индекс
-                self.index = faiss.IndexFlatIP(self.dimension)
-                self.index.add(vectors_array)
-                
-                # Сохранение индекса
-                self._save_index()
-                
-                logger.info(f"Rebuilt index with {len(vectors)} vectors")
-            else:
-                logger.warning("No valid vectors found for rebuilding index")
-        except Exception as e:
-            logger.error(f"Error rebuilding index: {e}")
     
-    def _save_index(self) -> None:
+    @abstractmethod
+    def get_entry_ids(self) -> np.ndarray:
         """
-        Сохранение индекса на диск
+        Получение ID записей, хранящихся в индексе
+        
+        Returns:
+            np.ndarray: Отсортированные ID записей
         """
-        try:
-            index_file = f"index_{self.index_name}.faiss"
-            index_path = os.path.join(settings.BASE_DIR, 'vector_indices', index_file)
-            
-            # Проверка наличия директории
-            index_dir = os.path.dirname(index_path)
-            if not os.path.exists(index_dir):
-                os.makedirs(index_dir)
+    
+    @abstractmethod
+    def reconstruct_vectors(self, entry_ids: np.ndarray) -> np.ndarray:
+        """
+        Получение векторов, хранящихся в индексе, по ID записей
+        
+        Args:
+            entry_ids: ID записей, присутствующих в индексе
             
-            faiss.write_index(self.index, index_path)
+        Returns:
+            np.ndarray: Нормализованные векторы в порядке ID
+        """
+    
+    @classmethod
+    def build_generation(cls, index_name: str = 'default',
+                         progress_callback: Optional[Callable[[int, int], None]] = None) -> int:
+        """
+        Перестроение индекса по данным БД отдельным экземпляром сервиса
+        
+        Используется фоновой задачей перестроения. Бэкенды, хранящие индекс
+        в процессе, строят новое поколение без загрузки текущего.
+        
+        Args:
+            index_name: Имя индекса
+            progress_callback: Функция, получающая количество обработанных и всех записей
             
-            # Обновление записи индекса в БД
-            VectorIndex.objects.filter(name=self.index_name).update(
-                last_updated=timezone.now()
-            )
+        Returns:
+            int: Количество векторов в новом индексе
+        """
+        return cls(index_name).rebuild(progress_callback)
+    
+    def check_for_update(self) -> bool:
+        """
+        Проверка появления нового поколения индекса с его загрузкой
+        
+        Returns:
+            bool: Был ли загружен новый индекс
+        """
+        return self.reload()
+    
+    def train(self, vectors: Optional[np.ndarray] = None) -> bool:
+        """
+        Обучение индекса (бэкендам без обучения не требуется)
+        
+        Args:
+            vectors: Нормализованные векторы, из которых берется выборка
             
-            logger.info(f"Saved FAISS index to {index_path}")
-        except Exception as e:
-            logger.error(f"Error saving FAISS index: {e}")
+        Returns:
+            bool: Готов ли индекс к добавлению векторов
+        """
+        return True
+    
+    def flush(self) -> bool:
+        """
+        Сохранение несохраненных изменений индекса
+        
+        Returns:
+            bool: Был ли индекс сохранен
+        """
+        return False
+    
+    @contextmanager
+    def batch(self):
+        """
+        Контекстный менеджер для пакетных изменений индекса
+        """
+        yield self
+    
+    def compact(self) -> int:
+        """
+        Физическое удаление помеченных на удаление векторов
+        
+        Returns:
+            int: Количество удаленных векторов
+        """
+        return 0
     
     def add_vector(self, entry: VectorEntry) -> bool:
         """
@@ -160,27 +387,7 @@ class VectorIndexService:
         Returns:
             bool: Успешно ли добавлен вектор
         """
-        try:
-            # Преобразование эмбеддинга в numpy массив
-            vector = np.array([entry.embedding], dtype=np.float32)
-            
-            # Нормализация вектора для косинусного сходства
-            faiss.normalize_L2(vector)
-            
-            # Добавление вектора в индекс
-            self.index.add(vector)
-            
-            # Обновление маппинга
-            idx = self.index.ntotal - 1
-            self.id_to_entry_map[idx] = entry.id
-            
-            # Сохранение индекса
-            self._save_index()
-            
-            return True
-        except Exception as e:
-            logger.error(f"Error adding vector to index: {e}")
-            return False
+        return self.upsert_vectors([entry]) > 0
     
     def remove_vector(self, entry_id: int) -> bool:
         """
@@ -192,28 +399,7 @@ class VectorIndexService:
         Returns:
             bool: Успешно ли удален вектор
         """
-        try:
-            # Поиск индекса в маппинге
-            idx_to_remove = None
-            for idx, entry_id_mapped in self.id_to_entry_map.items():
-                if entry_id_mapped == entry_id:
-                    idx_to_remove = idx
-                    break
-            
-            if idx_to_remove is not None:
-                # FAISS не поддерживает прямое удаление, поэтому нужно перестроить индекс
-                del self.id_to_entry_map[idx_to_remove]
-                
-                # Перестроение индекса
-                self._rebuild_index()
-                
-                return True
-            else:
-                logger.warning(f"Vector entry with ID {entry_id} not found in mapping")
-                return False
-        except Exception as e:
-            logger.error(f"Error removing vector from index: {e}")
-            return False
+        return self.remove_vectors([entry_id]) > 0
     
     def update_vector(self, entry: VectorEntry) -> bool:
         """
@@ -225,28 +411,32 @@ class VectorIndexService:
         Returns:
             bool: Успешно ли обновлен вектор
         """
-        # Удаление старого вектора и добавление нового
-        if self.remove_vector(entry.id):
-            return self.add_vector(entry)
-        return False
+        return self.upsert_vectors([entry]) > 0
     
-    def search(self, query: str, top_k: int = 10, filter_criteria: Dict = None) -> List[Dict]:
+    def search(self, query: str, top_k: int = 10, filter_criteria: Dict = None,
+               nprobe: Optional[int] = None, ef_search: Optional[int] = None,
+               timings: Optional[Dict[str, float]] = None) -> List[Dict]:
         """
         Поиск по индексу с использованием текстового запроса
         
+        Запрос не записывается в SearchLog: это делает SearchService
+        один раз на логический поиск вместе с длительностями этапов.
+        
         Args:
             query: Текстовый запрос
             top_k: Количество результатов
             filter_criteria: Критерии фильтрации результатов
+            nprobe: IVF: количество просматриваемых кластеров для этого запроса
+            ef_search: HNSW: ширина поиска для этого запроса
+            timings: Словарь, в который добавляются длительности этапов в миллисекундах
             
         Returns:
             List[Dict]: Список результатов поиска
         """
-        start_time = timezone.now()
-        
         try:
             # Генерация вектора для запроса
-            query_vector = generate_embeddings(query)
+            with record_timing(timings, 'embedding_ms'):
+                query_vector = generate_embeddings(query)
             
             if query_vector is None:
                 logger.error("Failed to generate embedding for query")
@@ -255,75 +445,144 @@ class VectorIndexService:
             # Преобразование в numpy массив
             query_vector_np = np.array([query_vector], dtype=np.float32)
             
-            # Нормализация вектора для косинусного сходства
-            faiss.normalize_L2(query_vector_np)
-            
-            # Поиск ближайших векторов
-            scores, indices = self.index.search(query_vector_np, top_k * 3)  # Запрашиваем больше, чтобы после фильтрации осталось достаточно
-            
-            # Преобразование результатов
-            results = []
+            return self.search_vectors(query_vector_np, top_k, filter_criteria, nprobe, ef_search, timings)[0]
+        except Exception as e:
+            logger.error(f"Error searching in index: {e}")
+            return []
+    
+    def search_many(self, queries: List[str], top_k: int = 10, filter_criteria: Dict = None,
+                    nprobe: Optional[int] = None, ef_search: Optional[int] = None) -> List[List[Dict]]:
+        """
+        Поиск по индексу для нескольких текстовых запросов
+        
+        Эмбеддинги всех запросов генерируются пакетно, поиск выполняется одним
+        вызовом FAISS, а записи для всех результатов загружаются одним запросом к БД.
+        
+        Args:
+            queries: Текстовые запросы
+            top_k: Количество результатов для каждого запроса
+            filter_criteria: Критерии фильтрации результатов, общие для всех запросов
+            nprobe: IVF: количество просматриваемых кластеров
+            ef_search: HNSW: ширина поиска
             
-            for i in range(len(indices[0])):
-                idx = indices[0][i]
-                score = float(scores[0][i])
-                
-                if idx != -1 and idx in self.id_to_entry_map:
-                    entry_id = self.id_to_entry_map[idx]
-                    
-                    try:
-                        entry = VectorEntry.objects.get(id=entry_id)
-                        
-                        # Применение фильтров
-                        if filter_criteria and not self._apply_filters(entry, filter_criteria):
-                            continue
-                        
-                        results.append({
-                            'id': entry.id,
-                            'entity_type': entry.entity_type,
-                            'entity_id': entry.entity_id,
-                            'text': entry.text,
-                            'metadata': entry.metadata,
-                            'score': score
-                        })
-                    except VectorEntry.DoesNotExist:
-                        logger.warning(f"Vector entry with ID {entry_id} not found in database")
+        Returns:
+            List[List[Dict]]: Результаты поиска в порядке запросов
+        """
+        start_time = timezone.now()
+        results = [[] for _ in queries]
+        
+        try:
+            # Генерация векторов для всех запросов
+            embeddings = generate_batch_embeddings(queries)
             
-            # Обрезание до запрошенного количества
-            results = results[:top_k]
+            valid = [i for i, embedding in enumerate(embeddings) if embedding is not None]
+            if len(valid) < len(queries):
+                logger.error(f"Failed to generate embeddings for {len(queries) - len(valid)} of {len(queries)} queries")
             
-            # Логирование поиска
-            end_time = timezone.now()
-            duration_ms = int((end_time - start_time).total_seconds() * 1000)
+            if valid:
+                query_vectors = np.array([embeddings[i] for i in valid], dtype=np.float32)
+                batch_results = self.search_vectors(query_vectors, top_k, filter_criteria, nprobe, ef_search)
+                for i, query_results in zip(valid, batch_results):
+                    results[i] = query_results
+        except Exception as e:
+            logger.error(f"Error searching {len(queries)} queries in index: {e}")
+        
+        # Логирование поиска: длительность общая для всего пакета
+        end_time = timezone.now()
+        duration_ms = int((end_time - start_time).total_seconds() * 1000)
+        
+        for query, query_results in zip(queries, results):
+            log_search(query=query, results_count=len(query_results), duration_ms=duration_ms)
+        
+        return results
+    
+    def _hydrate_hits(self, hits: List[List[Tuple[int, float]]], top_k: int,
+                      residual_criteria: Optional[Dict] = None,
+                      timings: Optional[Dict[str, float]] = None) -> List[List[Dict]]:
+        """
+        Загрузка данных записей для результатов нескольких запросов
+        
+        Args:
+            hits: Пары (ID записи, оценка) для каждого запроса
+            top_k: Количество результатов для каждого запроса
+            residual_criteria: Критерии фильтрации, не примененные при поиске
+            timings: Словарь, в который добавляются длительности этапов в миллисекундах
             
-            SearchLog.objects.create(
-                query=query,
-                results_count=len(results),
-                duration_ms=duration_ms
-            )
+        Returns:
+            List[List[Dict]]: Результаты поиска для каждого запроса
+        """
+        # Данные записей для всех запросов загружаются одним запросом к БД
+        with record_timing(timings, 'hydration_ms'):
+            entries_by_id = self._fetch_entries({entry_id for row_hits in hits for entry_id, _ in row_hits})
+        
+        all_results = []
+        for row_hits in hits:
+            with record_timing(timings, 'hydration_ms'):
+                results = self.hydrate_results(row_hits, entries_by_id)
             
-            return results
-        except Exception as e:
-            logger.error(f"Error searching in index: {e}")
+            # Применение фильтров, не поддерживаемых индексом
+            if residual_criteria:
+                with record_timing(timings, 'filter_ms'):
+                    results = [result for result in results if self._apply_filters(result, residual_criteria)]
             
-            # Логирование ошибки
-            end_time = timezone.now()
-            duration_ms = int((end_time - start_time).total_seconds() * 1000)
+            # Обрезание до запрошенного количества
+            all_results.append(results[:top_k])
+        
+        return all_results
+    
+    def _fetch_entries(self, entry_ids) -> Dict[int, Dict]:
+        """
+        Загрузка данных векторных записей одним запросом
+        
+        Args:
+            entry_ids: ID векторных записей
             
-            SearchLog.objects.create(
-                query=query,
-                results_count=0,
-                duration_ms=duration_ms
-            )
+        Returns:
+            Dict[int, Dict]: Данные записей по ID
+        """
+        if not entry_ids:
+            return {}
+        
+        # Эмбеддинги не загружаются, для результатов нужны только текст и метаданные
+        entries = VectorEntry.objects.filter(id__in=list(entry_ids)).values(
+            'id', 'entity_type', 'entity_id', 'text', 'metadata'
+        )
+        return {entry['id']: entry for entry in entries}
+    
+    def hydrate_results(self, hits: List[Tuple[int, float]], entries_by_id: Optional[Dict[int, Dict]] = None) -> List[Dict]:
+        """
+        Получение данных векторных записей для результатов поиска одним запросом
+        
+        Args:
+            hits: Пары (ID записи, оценка) в порядке убывания оценки
+            entries_by_id: Уже загруженные данные записей (по умолчанию загружаются из БД)
             
+        Returns:
+            List[Dict]: Результаты поиска в том же порядке
+        """
+        if not hits:
             return []
+        
+        if entries_by_id is None:
+            entries_by_id = self._fetch_entries([entry_id for entry_id, _ in hits])
+        
+        results = []
+        for entry_id, score in hits:
+            entry = entries_by_id.get(entry_id)
+            if entry is None:
+                logger.warning(f"Vector entry with ID {entry_id} not found in database")
+                continue
+            
+            results.append({**entry, 'score': score})
+        
+        return results
     
-    def _apply_filters(self, entry: VectorEntry, filter_criteria: Dict) -> bool:
+    def _apply_filters(self, result: Dict, filter_criteria: Dict) -> bool:
         """
         Применение фильтров к результатам поиска
         
         Args:
-            entry: Векторная запись
+            result: Результат поиска
             filter_criteria: Критерии фильтрации
             
         Returns:
@@ -331,29 +590,1355 @@ class VectorIndexService:
         """
         # Фильтрация по типу сущности
         if 'entity_types' in filter_criteria and filter_criteria['entity_types']:
-            if entry.entity_type not in filter_criteria['entity_types']:
+            if result['entity_type'] not in filter_criteria['entity_types']:
                 return False
         
         # Фильтрация по метаданным
         if 'metadata' in filter_criteria and filter_criteria['metadata']:
+            metadata = result['metadata']
             for key, value in filter_criteria['metadata'].items():
-                if key not in entry.metadata or entry.metadata[key] != value:
+                if key not in metadata or metadata[key] != value:
                     return False
         
         return True
+    
+    def _get_generation_channel(self) -> str:
+        """
+        Получение канала Redis, в который публикуются новые поколения индекса
+        
+        Returns:
+            str: Имя канала
+        """
+        return f"vector_index:{self.index_name}:generation"
+    
+    def _get_generation_pattern(self) -> str:
+        """
+        Получение шаблона каналов Redis, уведомления из которых приводят к проверке индекса
+        
+        Returns:
+            str: Шаблон каналов
+        """
+        return self._get_generation_channel()
+    
+    def _start_reload_listener(self) -> None:
+        """
+        Запуск фонового потока, отслеживающего новые поколения индекса
+        """
+        thread = threading.Thread(
+            target=self._listen_for_generations,
+            name=f"vector-index-reload-{self.index_name}",
+            daemon=True
+        )
+        thread.start()
+    
+    def _listen_for_generations(self) -> None:
+        """
+        Ожидание уведомлений о новых поколениях индекса
+        
+        Уведомления приходят через Redis pub/sub. Если сообщение потеряно
+        или Redis недоступен, файл метаданных проверяется не реже
+        чем раз в VECTOR_INDEX_RELOAD_INTERVAL секунд.
+        """
+        interval = settings.VECTOR_INDEX_RELOAD_INTERVAL
+        pubsub = None
+        
+        while True:
+            try:
+                if pubsub is None:
+                    pubsub = get_redis_connection('default').pubsub(ignore_subscribe_messages=True)
+                    pubsub.psubscribe(self._get_generation_pattern())
+                pubsub.get_message(timeout=interval)
+            except Exception as e:
+                logger.warning(f"Vector index generation channel unavailable: {e}")
+                pubsub = None
+                time.sleep(interval)
+            
+            self.check_for_update()
+
+
+class VectorIndexService(BaseVectorIndexService):
+    """
+    Сервис для работы с векторными индексами с использованием FAISS
+    """
+    def __init__(self, index_name='default', dimension=None, entry_filter: Optional[Q] = None,
+                 hot_reload: Optional[bool] = None, load: bool = True):
+        super().__init__(index_name, dimension)
+        
+        # Условие отбора записей для индекса (например, записи одного шарда)
+        self.entry_filter = entry_filter
+        self.index = None
+        self.config = dict(DEFAULT_INDEX_CONFIG)
+        
+        # Поколение загруженного индекса, увеличивается при каждом сохранении
+        self.generation = 0
+        self._meta_mtime = None
+        
+        # Индекс, отображенный в память, доступен только для чтения
+        self.read_only = False
+        self._entry_ids = None
+        
+        # Атрибуты записей для фильтрации внутри FAISS
+        self._filter_index = None
+        
+        # ID записей, удаленных из индекса, но еще физически хранящихся в нем
+        self._tombstones = set()
+        
+        # Количество векторов HNSW, лишенных ID, но оставшихся в графе
+        self._dead_count = 0
+        
+        # Исключаемые из поиска ID и селектор FAISS для них (см. _get_exclusions)
+        self._exclusions = None
+        
+        # Состояние отложенного сохранения индекса на диск
+        self._lock = threading.RLock()
+        self._dirty_count = 0
+        self._batch_depth = 0
+        self._flush_timer = None
+        
+        # Случайная метка несохраненных изменений для ключей кэша результатов (см. get_generation)
+        self._dirty_epoch = None
+        
+        # ID записей, измененных во время перестроения индекса
+        self._rebuild_changes = None
+        
+        # Сервис без загрузки (построение нового поколения, замеры) не сохраняет
+        # индекс при завершении процесса и не отслеживает новые поколения
+        if not load:
+            return
+        
+        # Попытка загрузить существующий индекс
+        self._load_or_create_index()
+        
+        # Несохраненные изменения записываются при завершении процесса
+        atexit.register(self.flush)
+        
+        # Переход на новые поколения индекса, сохраненные другими процессами
+        if settings.VECTOR_INDEX_HOT_RELOAD if hot_reload is None else hot_reload:
+            self._start_reload_listener()
+    
+    def _get_entries(self) -> QuerySet:
+        """
+        Получение векторных записей, хранящихся в этом индексе
+        
+        Returns:
+            QuerySet: Записи VectorEntry
+        """
+        if self.entry_filter is None:
+            return VectorEntry.objects.all()
+        return VectorEntry.objects.filter(self.entry_filter)
+    
+    def _get_index_dir(self) -> str:
+        """
+        Получение директории файлов индекса
+        
+        Returns:
+            str: Путь к директории
+        """
+        return os.path.join(settings.BASE_DIR, 'vector_indices')
+    
+    def _get_index_path(self, generation: Optional[int] = None) -> str:
+        """
+        Получение пути к файлу индекса
+        
+        Args:
+            generation: Поколение индекса (None — файл старого формата без поколения)
+            
+        Returns:
+            str: Путь к файлу индекса
+        """
+        if generation is None:
+            index_file = f"index_{self.index_name}.faiss"
+        else:
+            index_file = f"index_{self.index_name}.{generation}.faiss"
+        return os.path.join(self._get_index_dir(), index_file)
+    
+    def _get_sidecar_path(self, suffix: str, generation: Optional[int] = None) -> str:
+        """
+        Получение пути к служебному файлу, сохраняемому рядом с индексом
+        
+        Args:
+            suffix: Суффикс файла ('ids.npy', 'attrs.npz' или 'meta.json')
+            generation: Поколение индекса (None для файла, общего для всех поколений)
+            
+        Returns:
+            str: Путь к файлу
+        """
+        if generation is None:
+            index_file = f"index_{self.index_name}.{suffix}"
+        else:
+            index_file = f"index_{self.index_name}.{generation}.{suffix}"
+        return os.path.join(self._get_index_dir(), index_file)
+    
+    def _read_meta(self) -> Optional[Dict]:
+        """
+        Чтение метаданных последнего сохраненного поколения индекса
+        
+        Файл метаданных заменяется последним при сохранении, поэтому
+        он всегда указывает на полностью записанное поколение.
+        
+        Returns:
+            Optional[Dict]: Метаданные или None, если индекс еще не сохранялся
+        """
+        meta_path = self._get_sidecar_path('meta.json')
+        if not os.path.exists(meta_path):
+            return None
+        
+        with open(meta_path, encoding='utf-8') as f:
+            return json.load(f)
+    
+    def _load_generation_files(self, meta: Dict, mmap: bool) -> Tuple[faiss.Index, Optional[EntryFilterIndex], np.ndarray]:
+        """
+        Загрузка файлов поколения индекса
+        
+        Args:
+            meta: Метаданные поколения
+            mmap: Отобразить файлы в память только для чтения
+            
+        Returns:
+            Tuple[faiss.Index, Optional[EntryFilterIndex], np.ndarray]: Индекс, индекс атрибутов
+            (None, если файл атрибутов не сохранялся) и ID записей
+        """
+        generation = meta['generation']
+        index_type = {**DEFAULT_INDEX_CONFIG, **meta['config']}['index']
+        io_flags = get_mmap_io_flags(index_type) if mmap else 0
+        
+        index = faiss.read_index(self._get_index_path(generation), io_flags)
+        entry_ids = np.load(self._get_sidecar_path('ids.npy', generation), mmap_mode='r' if mmap else None)
+        
+        # Без файла атрибутов фильтры применяются после поиска
+        filter_index = None
+        attrs_path = self._get_sidecar_path('attrs.npz', generation)
+        if os.path.exists(attrs_path):
+            filter_index = EntryFilterIndex.load(attrs_path)
+        
+        return index, filter_index, entry_ids
+    
+    def _load_read_only_index(self) -> bool:
+        """
+        Загрузка индекса только для чтения с отображением файла в память
+        
+        Конфигурация и ID записей читаются из служебных файлов рядом с индексом,
+        поэтому процесс запускается без обращения к БД. Данные индекса
+        отображаются в память и разделяются процессами через page cache.
+        Версии FAISS без IO_FLAG_MMAP_IFC отображают в память только
+        инвертированные списки IVF, индексы flat и hnsw в этом случае
+        копируются в память процесса.
+        
+        Returns:
+            bool: Загружен ли индекс
+        """
+        meta = self._read_meta()
+        if meta is None:
+            return False
+        
+        self.index, self._filter_index, self._entry_ids = self._load_generation_files(meta, mmap=True)
+        self.config = {**DEFAULT_INDEX_CONFIG, **meta['config']}
+        if not get_mmap_io_flags(self.index_type):
+            logger.warning(f"FAISS {faiss.__version__} cannot memory-map {self.index_type} indexes, "
+                           f"index is loaded into process memory")
+        self.dimension = meta['dimension']
+        self.generation = meta['generation']
+        self._dead_count = self._count_dead_vectors()
+        self._exclusions = None
+        self.read_only = True
+        
+        logger.info(f"Loaded read-only FAISS index generation {self.generation} with {len(self._entry_ids)} entries")
+        return True
+    
+    def _load_config(self) -> None:
+        """
+        Загрузка конфигурации индекса из реестра VectorIndex с созданием записи реестра
+        """
+        vector_index, created = VectorIndex.objects.get_or_create(
+            name=self.index_name,
+            defaults={
+                'index_type': 'faiss',
+                'dimension': self.dimension,
+                'entity_types': [],
+                'config': {'metric': 'cosine', 'index': settings.VECTOR_INDEX_TYPE},
+                'is_active': True
+            }
+        )
+        
+        # Обновляем размерность, если она была изменена
+        if vector_index.dimension != self.dimension:
+            vector_index.dimension = self.dimension
+            vector_index.save()
+        
+        self.config = {**DEFAULT_INDEX_CONFIG, **vector_index.config}
+        if self.index_type not in FAISS_INDEX_TYPES:
+            logger.error(f"Unsupported FAISS index type {self.index_type}, falling back to flat")
+            self.config['index'] = 'flat'
+    
+    def _load_or_create_index(self) -> None:
+        """
+        Загрузка существующего или создание нового индекса
+        """
+        if settings.VECTOR_INDEX_MMAP:
+            try:
+                if self._load_read_only_index():
+                    return
+                logger.warning("Read-only FAISS index files not found, loading index for writing")
+            except Exception as e:
+                logger.error(f"Error loading read-only FAISS index: {e}")
+        
+        try:
+            self._load_config()
+            
+            # Проверка наличия директории
+            index_dir = self._get_index_dir()
+            if not os.path.exists(index_dir):
+                os.makedirs(index_dir)
+            
+            # Последнее сохраненное поколение или файл старого формата
+            meta = self._read_meta()
+            legacy_path = self._get_index_path()
+            filter_index = None
+            
+            if meta is not None and os.path.exists(self._get_index_path(meta['generation'])):
+                self.index, filter_index, _ = self._load_generation_files(meta, mmap=False)
+                self.generation = meta['generation']
+                index_path = self._get_index_path(self.generation)
+            elif os.path.exists(legacy_path):
+                self.index = faiss.read_index(legacy_path)
+                index_path = legacy_path
+            else:
+                # Создание нового индекса
+                self.index = self._create_empty_index()
+                logger.info("Created new FAISS index")
+                
+                # Векторные записи добавляются в индекс фоновой задачей
+                self._schedule_rebuild()
+                return
+            
+            logger.info(f"Loaded existing FAISS index from {index_path}")
+            
+            # Индексы старого формата хранили позиции вместо ID записей,
+            # такие индексы, как и индексы другого типа, перестраиваются
+            loaded_type = get_faiss_index_type(self.index)
+            if loaded_type != self.index_type:
+                logger.warning(f"FAISS index {index_path} has type {loaded_type}, expected {self.index_type}, rebuilding")
+                self.index = self._create_empty_index()
+                self._schedule_rebuild()
+            else:
+                self._dead_count = self._count_dead_vectors()
+                self._exclusions = None
+                self._filter_index = filter_index if filter_index is not None else self._load_filter_index()
+        except Exception as e:
+            logger.error(f"Error loading/creating FAISS index: {e}")
+            # Создание резервного индекса в памяти
+            self.index = self._create_empty_index()
+    
+    def _load_filter_index(self) -> EntryFilterIndex:
+        """
+        Построение индекса атрибутов записей по данным БД
+        
+        Returns:
+            EntryFilterIndex: Индекс атрибутов
+        """
+        filter_index = EntryFilterIndex()
+        filter_index.upsert(list(self._get_entries().values_list('id', 'entity_type', 'metadata')))
+        logger.info(f"Built filter index with {len(filter_index)} entries from database")
+        return filter_index
+    
+    def _next_generation(self) -> int:
+        """
+        Атомарное увеличение номера поколения индекса в БД
+        
+        Returns:
+            int: Номер нового поколения
+        """
+        try:
+            with transaction.atomic():
+                vector_index = VectorIndex.objects.select_for_update().get(name=self.index_name)
+                vector_index.generation = max(vector_index.generation, self.generation) + 1
+                vector_index.save(update_fields=['generation', 'last_updated'])
+                return vector_index.generation
+        except Exception as e:
+            logger.error(f"Error updating vector index generation: {e}")
+            return self.generation + 1
+    
+    def _publish_generation(self, generation: int) -> None:
+        """
+        Уведомление других процессов о новом поколении индекса
+        
+        Args:
+            generation: Номер поколения
+        """
+        try:
+            get_redis_connection('default').publish(self._get_generation_channel(), generation)
+        except Exception as e:
+            logger.warning(f"Error publishing vector index generation {generation}: {e}")
+    
+    def _remove_old_generations(self, generation: int) -> None:
+        """
+        Удаление файлов устаревших поколений индекса
+        
+        Предыдущее поколение сохраняется для процессов, которые еще его загружают.
+        Процессы, отобразившие удаленные файлы в память, продолжают работать с ними до перезагрузки.
+        
+        Args:
+            generation: Номер текущего поколения
+        """
+        pattern = re.compile(rf"^index_{re.escape(self.index_name)}\.(\d+)\.(faiss|ids\.npy|attrs\.npz)$")
+        index_dir = self._get_index_dir()
+        
+        stale_files = [self._get_index_path()]
+        for file_name in os.listdir(index_dir):
+            match = pattern.match(file_name)
+            if match and int(match.group(1)) < generation - 1:
+                stale_files.append(os.path.join(index_dir, file_name))
+        
+        for path in stale_files:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+    
+    def reload(self) -> bool:
+        """
+        Переход на последнее сохраненное поколение индекса
+        
+        Файлы нового поколения загружаются без блокировки, затем индекс
+        подменяется одной операцией под блокировкой. Выполняющиеся запросы
+        дорабатывают со старым индексом, на который у них есть ссылка.
+        
+        Returns:
+            bool: Был ли загружен новый индекс
+        """
+        meta = self._read_meta()
+        if meta is None or meta['generation'] <= self.generation:
+            return False
+        
+        # Несохраненные изменения этого процесса не должны потеряться
+        if self._dirty_count or self._tombstones:
+            logger.warning(f"Skipping reload of FAISS index generation {meta['generation']}: index has unsaved changes")
+            return False
+        
+        index, filter_index, entry_ids = self._load_generation_files(meta, mmap=self.read_only)
+        if filter_index is None and not self.read_only:
+            filter_index = self._load_filter_index()
+        
+        with self._lock:
+            if meta['generation'] <= self.generation or self._dirty_count or self._tombstones:
+                return False
+            
+            self.index = index
+            self._filter_index = filter_index
+            self._entry_ids = entry_ids if self.read_only else None
+            self.config = {**DEFAULT_INDEX_CONFIG, **meta['config']}
+            self.generation = meta['generation']
+            self._dead_count = self._count_dead_vectors()
+            self._exclusions = None
+        
+        logger.info(f"Reloaded FAISS index generation {self.generation} with {index.ntotal} vectors")
+        return True
+    
+    def check_for_update(self) -> bool:
+        """
+        Дешевая проверка появления нового поколения индекса с его загрузкой
+        
+        Файл метаданных читается только при изменении времени его модификации.
+        
+        Returns:
+            bool: Был ли загружен новый индекс
+        """
+        try:
+            mtime = os.stat(self._get_sidecar_path('meta.json')).st_mtime_ns
+        except FileNotFoundError:
+            return False
+        
+        if mtime == self._meta_mtime:
+            return False
+        
+        try:
+            reloaded = self.reload()
+            self._meta_mtime = mtime
+            return reloaded
+        except Exception as e:
+            logger.error(f"Error reloading FAISS index: {e}")
+            return False
+    
+    def _create_empty_index(self) -> faiss.Index:
+        """
+        Создание пустого индекса, хранящего VectorEntry.id в качестве идентификаторов FAISS
+        
+        Returns:
+            faiss.Index: Пустой индекс
+        """
+        return create_faiss_index(self.dimension, self.config)
+    
+    def train(self, vectors: Optional[np.ndarray] = None) -> bool:
+        """
+        Обучение индекса на выборке эмбеддингов
+        
+        Требуется для IVF перед добавлением первых векторов.
+        
+        Args:
+            vectors: Нормализованные векторы, из которых берется выборка
+                     (по умолчанию выборка загружается из VectorEntry)
+            
+        Returns:
+            bool: Готов ли индекс к добавлению векторов
+        """
+        with self._lock:
+            if self.index.is_trained:
+                return True
+            
+            index = self._train_index(self.index, vectors)
+            if index is None:
+                return False
+            
+            self.index = index
+            return True
+    
+    def _train_index(self, index: faiss.Index, vectors: Optional[np.ndarray] = None) -> Optional[faiss.Index]:
+        """
+        Обучение переданного индекса на выборке эмбеддингов
+        
+        Args:
+            index: Необученный индекс
+            vectors: Нормализованные векторы, из которых берется выборка
+                     (по умолчанию выборка загружается из VectorEntry)
+            
+        Returns:
+            Optional[faiss.Index]: Обученный индекс (пересоздается, если выборка меньше nlist)
+            или None, если обучить индекс не удалось
+        """
+        sample_size = self.config['train_sample_size']
+        if vectors is None:
+            sample = self._sample_training_vectors(sample_size)
+        elif len(vectors) > sample_size:
+            rows = np.random.default_rng().choice(len(vectors), sample_size, replace=False)
+            sample = vectors[np.sort(rows)]
+        else:
+            sample = vectors
+        
+        if not len(sample):
+            logger.warning("No vectors available for training FAISS index")
+            return None
+        
+        # Квантователю PQ нужно не меньше 2^nbits векторов на каждый подквантователь
+        if self.index_type in COMPRESSED_INDEX_TYPES and len(sample) < 2 ** self.config['pq_nbits']:
+            logger.warning(f"Training sample of {len(sample)} vectors is too small for {self.index_type} index")
+            return None
+        
+        # Количество кластеров не может превышать размер обучающей выборки
+        if index.ntotal == 0 and len(sample) < self.config['nlist']:
+            logger.warning(f"Training sample of {len(sample)} vectors is smaller than nlist={self.config['nlist']}, reducing nlist")
+            index = create_faiss_index(self.dimension, {**self.config, 'nlist': len(sample)})
+        
+        index.train(sample)
+        logger.info(f"Trained FAISS {self.index_type} index on {len(sample)} vectors")
+        return index
+    
+    def _sample_training_vectors(self, sample_size: int) -> np.ndarray:
+        """
+        Случайная выборка эмбеддингов VectorEntry для обучения индекса
+        
+        Args:
+            sample_size: Размер выборки
+            
+        Returns:
+            np.ndarray: Нормализованные векторы выборки
+        """
+        ids = np.array(self._get_entries().values_list('id', flat=True), dtype=np.int64)
+        if len(ids) > sample_size:
+            ids = np.random.default_rng().choice(ids, sample_size, replace=False)
+        
+        embeddings = VectorEntry.objects.filter(id__in=ids.tolist()).values_list('embedding', flat=True)
+        vectors = np.array(list(embeddings), dtype=np.float32).reshape(-1, self.dimension)
+        faiss.normalize_L2(vectors)
+        return vectors
+    
+    def _remove_ids(self, ids: np.ndarray) -> int:
+        """
+        Удаление векторов из индекса по ID записей
+        
+        HNSW не поддерживает удаление, поэтому его векторы лишаются ID и перестают
+        попадать в результаты поиска, а граф перестраивается при компактификации.
+        
+        Args:
+            ids: ID векторных записей
+            
+        Returns:
+            int: Количество удаленных векторов
+        """
+        if self.index_type != 'hnsw':
+            return self.index.remove_ids(faiss.IDSelectorBatch(ids))
+        
+        id_map = faiss.vector_to_array(self.index.id_map)
+        mask = np.isin(id_map, ids)
+        removed = int(mask.sum())
+        
+        if removed:
+            id_map[mask] = -1
+            faiss.copy_array_to_vector(id_map, self.index.id_map)
+            self.index.construct_rev_map()
+            self._dead_count += removed
+            self._exclusions = None
+        
+        return removed
+    
+    def _count_dead_vectors(self) -> int:
+        """
+        Подсчет векторов HNSW, лишенных ID
+        
+        Returns:
+            int: Количество таких векторов
+        """
+        if self.index_type != 'hnsw':
+            return 0
+        return int((faiss.vector_to_array(self.index.id_map) == -1).sum())
+    
+    def _rebuild_hnsw_graph(self) -> None:
+        """
+        Перестроение графа HNSW только по векторам, сохранившим ID
+        """
+        id_map = faiss.vector_to_array(self.index.id_map)
+        vectors = faiss.downcast_index(self.index.index).reconstruct_n(0, self.index.ntotal)
+        live = id_map != -1
+        
+        index = self._create_empty_index()
+        index.add_with_ids(vectors[live], id_map[live])
+        
+        self.index = index
+        self._dead_count = 0
+        self._exclusions = None
+        logger.info(f"Rebuilt HNSW graph with {int(live.sum())} vectors")
+    
+    def _rerank_exact(self, query_vectors: np.ndarray, indices: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Точное переранжирование кандидатов сжатого индекса по эмбеддингам из БД
+        
+        Args:
+            query_vectors: Нормализованные векторы запросов
+            indices: ID кандидатов для каждого запроса
+            
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: Точные оценки и ID кандидатов, упорядоченные по убыванию оценки
+        """
+        candidate_ids = np.unique(indices[indices != -1])
+        rows = list(VectorEntry.objects.filter(id__in=candidate_ids.tolist()).values_list('id', 'embedding'))
+        
+        scores = np.full(indices.shape, -np.inf, dtype=np.float32)
+        reranked_ids = np.full(indices.shape, -1, dtype=np.int64)
+        if not rows:
+            return scores, reranked_ids
+        
+        position = {entry_id: i for i, (entry_id, _) in enumerate(rows)}
+        embeddings = np.array([embedding for _, embedding in rows], dtype=np.float32)
+        faiss.normalize_L2(embeddings)
+        exact_scores = query_vectors @ embeddings.T
+        
+        for q in range(indices.shape[0]):
+            for j, entry_id in enumerate(indices[q]):
+                pos = position.get(int(entry_id))
+                if pos is not None:
+                    scores[q, j] = exact_scores[q, pos]
+                    reranked_ids[q, j] = entry_id
+        
+        order = np.argsort(-scores, axis=1, kind='stable')
+        return np.take_along_axis(scores, order, axis=1), np.take_along_axis(reranked_ids, order, axis=1)
+    
+    def _get_search_params(self, index: faiss.Index, index_type: str, nprobe: Optional[int] = None,
+                           ef_search: Optional[int] = None,
+                           selector: Optional[faiss.IDSelector] = None) -> Optional[faiss.SearchParameters]:
+        """
+        Параметры поиска для отдельного запроса
+        
+        Args:
+            index: Индекс, по которому выполняется поиск
+            index_type: Тип индекса
+            nprobe: IVF: количество просматриваемых кластеров
+            ef_search: HNSW: ширина поиска
+            selector: Селектор допустимых ID записей
+            
+        Returns:
+            Optional[faiss.SearchParameters]: Параметры поиска или None для параметров индекса
+        """
+        if nprobe is None and ef_search is None and selector is None:
+            return None
+        
+        # Незаданные параметры берутся из индекса, а не из значений FAISS по умолчанию
+        if index_type in IVF_INDEX_TYPES:
+            params = faiss.SearchParametersIVF()
+            params.nprobe = nprobe if nprobe is not None else faiss.extract_index_ivf(index).nprobe
+        elif index_type == 'hnsw':
+            params = faiss.SearchParametersHNSW()
+            params.efSearch = ef_search if ef_search is not None else faiss.downcast_index(index.index).hnsw.efSearch
+        else:
+            params = faiss.SearchParameters()
+        
+        if selector is not None:
+            params.sel = selector
+            params.referenced_objects = [selector]
+        
+        # Для OPQ параметры передаются индексу IVF после преобразования
+        if index_type == 'opq':
+            ivf_params = params
+            params = faiss.SearchParametersPreTransform()
+            params.index_params = ivf_params
+            params.referenced_objects = [ivf_params]
+        
+        return params
+    
+    @classmethod
+    def build_generation(cls, index_name: str = 'default',
+                         progress_callback: Optional[Callable[[int, int], None]] = None,
+                         entry_filter: Optional[Q] = None) -> int:
+        """
+        Построение нового поколения индекса без загрузки текущего
+        
+        Сервис-построитель не отслеживает новые поколения и не сохраняет индекс
+        при завершении процесса, поэтому после построения от него ничего
+        не остается. Процессы, работающие с индексом, загружают новое поколение.
+        
+        Args:
+            index_name: Имя индекса в реестре VectorIndex
+            progress_callback: Функция, получающая количество обработанных и всех записей
+            entry_filter: Условие отбора записей (для шардов)
+            
+        Returns:
+            int: Количество векторов в новом поколении
+        """
+        registry = VectorIndex.objects.filter(name=index_name).first()
+        if registry is None:
+            raise ValueError(f"Unknown vector index {index_name}")
+        if registry.parent_id is not None and entry_filter is None:
+            raise ValueError(f"Vector index {index_name} is a shard and is rebuilt by its sharded index")
+        
+        builder = cls(index_name, registry.dimension, entry_filter=entry_filter, hot_reload=False, load=False)
+        builder._load_config()
+        try:
+            return builder.rebuild(progress_callback)
+        finally:
+            builder._cancel_flush_timer()
+    
+    def rebuild(self, progress_callback: Optional[Callable[[int, int], None]] = None) -> int:
+        """
+        Перестроение индекса по данным БД в новое поколение
+        
+        Пока новый индекс строится, текущий продолжает обслуживать запросы.
+        Изменения, сделанные за время построения, применяются к новому индексу
+        перед подменой, после чего он сохраняется новым поколением.
+        
+        Args:
+            progress_callback: Функция, получающая количество обработанных и всех записей
+            
+        Returns:
+            int: Количество векторов в новом индексе
+        """
+        if self.read_only:
+            logger.warning("Cannot rebuild read-only FAISS index")
+            return 0
+        
+        with self._lock:
+            if self._rebuild_changes is not None:
+                logger.warning(f"Rebuild of FAISS index {self.index_name} is already in progress")
+                return 0
+            self._rebuild_changes = set()
+        
+        try:
+            vectors, ids, filter_rows = self._stream_embeddings(progress_callback)
+            
+            # Нормализация векторов для косинусного сходства
+            faiss.normalize_L2(vectors)
+            
+            index = self._create_empty_index()
+            if len(ids):
+                if not index.is_trained:
+                    index = self._train_index(index, vectors)
+                    if index is None:
+                        return 0
+                
+                # Добавление векторов в индекс под их ID из БД
+                index.add_with_ids(vectors, ids)
+            
+            filter_index = EntryFilterIndex()
+            filter_index.upsert(filter_rows)
+            
+            with self._lock:
+                changed_ids = self._rebuild_changes
+                self._rebuild_changes = None
+                
+                self.index = index
+                self._filter_index = filter_index
+                self._tombstones = set()
+                self._dead_count = 0
+                self._exclusions = None
+                
+                # Повторное применение изменений, сделанных во время построения
+                if changed_ids:
+                    entries = list(self._get_entries().filter(id__in=changed_ids))
+                    self.upsert_vectors(entries)
+                    self.remove_vectors(list(changed_ids - {entry.id for entry in entries}))
+                
+                # Сохранение индекса
+                self._save_index()
+            
+            logger.info(f"Rebuilt index with {len(ids)} vectors")
+            return len(ids)
+        finally:
+            with self._lock:
+                self._rebuild_changes = None
+    
+    def _stream_embeddings(self, progress_callback: Optional[Callable[[int, int], None]] = None
+                           ) -> Tuple[np.ndarray, np.ndarray, List[Tuple[int, str, Dict]]]:
+        """
+        Потоковое чтение эмбеддингов из БД в заранее выделенный массив
+        
+        В Postgres используется двоичный COPY (см. bulk_export), в остальных БД
+        строки читаются курсором порциями по VECTOR_INDEX_REBUILD_CHUNK_SIZE.
+        Модели VectorEntry не создаются.
+        
+        Args:
+            progress_callback: Функция, получающая количество обработанных и всех записей
+            
+        Returns:
+            Tuple[np.ndarray, np.ndarray, List[Tuple[int, str, Dict]]]: Векторы, ID записей
+            и строки для индекса атрибутов
+        """
+        entries = self._get_entries()
+        
+        # В Postgres эмбеддинги выгружаются через COPY в двоичном формате
+        if connection.vendor == 'postgresql':
+            ids, vectors = export_embeddings(entries, self.dimension, progress_callback)
+            filter_rows = list(entries.values_list('id', 'entity_type', 'metadata'))
+            return vectors, ids, filter_rows
+        
+        chunk_size = settings.VECTOR_INDEX_REBUILD_CHUNK_SIZE
+        total = entries.count()
+        
+        vectors = np.empty((total, self.dimension), dtype=np.float32)
+        ids = np.empty(total, dtype=np.int64)
+        filter_rows = []
+        count = 0
+        
+        rows = entries.order_by('id').values_list('id', 'entity_type', 'metadata', 'embedding')
+        for entry_id, entity_type, metadata, embedding in rows.iterator(chunk_size=chunk_size):
+            if not embedding:
+                continue
+            
+            # Записи, добавленные после подсчета
+            if count == len(ids):
+                extra = max(chunk_size, len(ids))
+                vectors = np.concatenate([vectors, np.empty((extra, self.dimension), dtype=np.float32)])
+                ids = np.concatenate([ids, np.empty(extra, dtype=np.int64)])
+            
+            vectors[count] = embedding
+            ids[count] = entry_id
+            filter_rows.append((entry_id, entity_type, metadata))
+            count += 1
+            
+            if progress_callback is not None and count % chunk_size == 0:
+                progress_callback(count, total)
+        
+        if progress_callback is not None:
+            progress_callback(count, max(total, count))
+        
+        return vectors[:count], ids[:count], filter_rows
+    
+    def _schedule_rebuild(self) -> None:
+        """
+        Постановка перестроения индекса в очередь Celery
+        
+        Задача ставится одним процессом, остальные процессы продолжают
+        работать с пустым индексом и получат новое поколение после сохранения.
+        """
+        from ..tasks import rebuild_vector_index
+        
+        lock_key = f"vector_index_rebuild:{self.index_name}"
+        try:
+            if cache.add(lock_key, True, settings.VECTOR_INDEX_REBUILD_LOCK_TIMEOUT):
+                rebuild_vector_index.delay(self.index_name)
+                logger.info(f"Scheduled rebuild of FAISS index {self.index_name}")
+        except Exception as e:
+            logger.error(f"Error scheduling FAISS index rebuild, rebuilding synchronously: {e}")
+            cache.delete(lock_key)
+            self.rebuild()
+    
+    def _save_index(self) -> None:
+        """
+        Сохранение индекса на диск новым поколением
+        
+        Файлы поколения записываются под собственными именами, затем файл
+        метаданных атомарно заменяется и начинает указывать на них, поэтому
+        читатели никогда не видят поколение частично.
+        """
+        if self.read_only:
+            return
+        
+        try:
+            # Проверка наличия директории
+            index_dir = self._get_index_dir()
+            if not os.path.exists(index_dir):
+                os.makedirs(index_dir)
+            
+            with self._lock:
+                # Удаленные векторы не должны попадать в файл индекса
+                self.compact()
+                
+                generation = self._next_generation()
+                index_path = self._get_index_path(generation)
+                ids_path = self._get_sidecar_path('ids.npy', generation)
+                attrs_path = self._get_sidecar_path('attrs.npz', generation)
+                meta_path = self._get_sidecar_path('meta.json')
+                meta = {
+                    'index_name': self.index_name,
+                    'generation': generation,
+                    'dimension': self.dimension,
+                    'config': self.config,
+                    'ntotal': int(self.index.ntotal),
+                    'saved_at': timezone.now().isoformat()
+                }
+                
+                # Служебные файлы для загрузки индекса без обращения к БД
+                paths = (ids_path, attrs_path, index_path, meta_path) if self._filter_index is not None else (ids_path, index_path, meta_path)
+                tmp_paths = {path: f"{path}.tmp.{os.getpid()}" for path in paths}
+                try:
+                    with open(tmp_paths[ids_path], 'wb') as f:
+                        np.save(f, get_faiss_index_ids(self.index))
+                    if self._filter_index is not None:
+                        self._filter_index.save(tmp_paths[attrs_path])
+                    faiss.write_index(self.index, tmp_paths[index_path])
+                    with open(tmp_paths[meta_path], 'w', encoding='utf-8') as f:
+                        json.dump(meta, f)
+                    
+                    # Файл метаданных заменяется последним
+                    for path, tmp_path in tmp_paths.items():
+                        os.replace(tmp_path, path)
+                finally:
+                    for tmp_path in tmp_paths.values():
+                        if os.path.exists(tmp_path):
+                            os.remove(tmp_path)
+                
+                self.generation = generation
+                self._dirty_count = 0
+                self._dirty_epoch = None
+                self._cancel_flush_timer()
+            
+            self._remove_old_generations(generation)
+            self._publish_generation(generation)
+            
+            logger.info(f"Saved FAISS index generation {generation} to {index_path}")
+        except Exception as e:
+            logger.error(f"Error saving FAISS index: {e}")
+    
+    def _mark_dirty(self, count: int) -> None:
+        """
+        Отметка индекса как измененного с отложенным сохранением на диск
+        
+        Индекс сохраняется сразу при накоплении VECTOR_INDEX_FLUSH_BATCH изменений,
+        иначе не позднее чем через VECTOR_INDEX_FLUSH_INTERVAL секунд.
+        Внутри batch() сохранение откладывается до выхода из блока.
+        
+        Args:
+            count: Количество измененных векторов
+        """
+        with self._lock:
+            self._dirty_count += count
+            self._dirty_epoch = os.urandom(6).hex()
+            
+            if self._batch_depth:
+                return
+            
+            if self._dirty_count >= settings.VECTOR_INDEX_FLUSH_BATCH:
+                self._save_index()
+            elif self._flush_timer is None:
+                self._flush_timer = threading.Timer(settings.VECTOR_INDEX_FLUSH_INTERVAL, self.flush)
+                self._flush_timer.daemon = True
+                self._flush_timer.start()
+    
+    def _cancel_flush_timer(self) -> None:
+        """
+        Отмена запланированного сохранения индекса
+        """
+        if self._flush_timer is not None:
+            self._flush_timer.cancel()
+            self._flush_timer = None
+    
+    def flush(self) -> bool:
+        """
+        Сохранение индекса на диск, если в нем есть несохраненные изменения
+        
+        Returns:
+            bool: Был ли индекс сохранен
+        """
+        with self._lock:
+            if self.read_only or (not self._dirty_count and not self._tombstones):
+                return False
+            
+            self._save_index()
+            return True
+    
+    @contextmanager
+    def batch(self):
+        """
+        Контекстный менеджер для пакетных изменений индекса
+        
+        Все изменения внутри блока сохраняются на диск одной записью при выходе.
+        """
+        with self._lock:
+            self._batch_depth += 1
+        try:
+            yield self
+        finally:
+            with self._lock:
+                self._batch_depth -= 1
+                if not self._batch_depth:
+                    self.flush()
+    
+    def upsert_vectors(self, entries: List[VectorEntry]) -> int:
+        """
+        Добавление или замена векторов в индексе без его перестроения
+        
+        Args:
+            entries: Векторные записи
+            
+        Returns:
+            int: Количество записанных векторов
+        """
+        entries = [entry for entry in entries if entry is not None and entry.embedding]
+        if not entries:
+            return 0
+        
+        if self.read_only:
+            logger.warning(f"Cannot upsert {len(entries)} vectors into read-only FAISS index")
+            return 0
+        
+        try:
+            # Преобразование эмбеддингов в numpy массив
+            vectors = np.array([entry.embedding for entry in entries], dtype=np.float32)
+            ids = np.array([entry.id for entry in entries], dtype=np.int64)
+            
+            # Нормализация векторов для косинусного сходства
+            faiss.normalize_L2(vectors)
+            
+            with self._lock:
+                if self._rebuild_changes is not None:
+                    self._rebuild_changes.update(ids.tolist())
+                
+                if not self.train():
+                    return 0
+                
+                # Старые версии векторов удаляются одним проходом по индексу
+                self._remove_ids(ids)
+                self._tombstones.difference_update(ids.tolist())
+                self._exclusions = None
+                
+                # Добавление векторов в индекс под ID записей
+                self.index.add_with_ids(vectors, ids)
+                
+                if self._filter_index is not None:
+                    self._filter_index.upsert([(entry.id, entry.entity_type, entry.metadata) for entry in entries])
+                
+                self._mark_dirty(len(entries))
+            
+            return len(entries)
+        except Exception as e:
+            logger.error(f"Error upserting vectors to index: {e}")
+            return 0
+    
+    def remove_vectors(self, entry_ids: List[int]) -> int:
+        """
+        Удаление векторов из индекса
+        
+        Векторы помечаются как удаленные и исключаются из результатов поиска,
+        а физически удаляются из индекса при компактификации.
+        
+        Args:
+            entry_ids: ID векторных записей
+            
+        Returns:
+            int: Количество помеченных на удаление векторов
+        """
+        if not entry_ids:
+            return 0
+        
+        if self.read_only:
+            logger.warning(f"Cannot remove {len(entry_ids)} vectors from read-only FAISS index")
+            return 0
+        
+        try:
+            with self._lock:
+                if self._rebuild_changes is not None:
+                    self._rebuild_changes.update(int(entry_id) for entry_id in entry_ids)
+                
+                self._tombstones.update(int(entry_id) for entry_id in entry_ids)
+                self._exclusions = None
+                if self._filter_index is not None:
+                    self._filter_index.remove(entry_ids)
+                
+                # Компактификация при накоплении удаленных векторов
+                if len(self._tombstones) + self._dead_count > self.index.ntotal * settings.VECTOR_INDEX_COMPACT_RATIO:
+                    self.compact()
+                
+                self._mark_dirty(len(entry_ids))
+            
+            return len(entry_ids)
+        except Exception as e:
+            logger.error(f"Error removing vectors from index: {e}")
+            return 0
+    
+    def compact(self) -> int:
+        """
+        Физическое удаление помеченных на удаление векторов из индекса
+        
+        Returns:
+            int: Количество удаленных векторов
+        """
+        with self._lock:
+            removed = 0
+            if self._tombstones:
+                tombstones = np.array(sorted(self._tombstones), dtype=np.int64)
+                removed = self._remove_ids(tombstones)
+                self._tombstones = set()
+                self._exclusions = None
+            
+            # Граф HNSW перестраивается при накоплении векторов без ID
+            if self._dead_count > self.index.ntotal * settings.VECTOR_INDEX_COMPACT_RATIO:
+                self._rebuild_hnsw_graph()
+            
+            if not removed:
+                return 0
+        
+        logger.info(f"Compacted FAISS index, removed {removed} vectors")
+        return removed
+    
+    def get_generation(self) -> Union[int, str]:
+        """
+        Поколение индекса, по которому видны изменения для кэша результатов
+        
+        Несохраненные изменения не увеличивают номер поколения, поэтому к нему
+        добавляется метка, меняющаяся при каждом изменении. Метка случайная:
+        у процессов с разными несохраненными изменениями ключи кэша не совпадают.
+        
+        Returns:
+            Union[int, str]: Номер поколения (увеличивается при сохранении и перезагрузке
+            индекса) или номер с меткой несохраненных изменений
+        """
+        dirty_epoch = self._dirty_epoch
+        if dirty_epoch is None:
+            return self.generation
+        return f"{self.generation}+{dirty_epoch}"
+    
+    def get_entry_ids(self) -> np.ndarray:
+        """
+        Получение ID записей, хранящихся в индексе
+        
+        Returns:
+            np.ndarray: Отсортированные ID записей без помеченных на удаление
+        """
+        if self.read_only:
+            return self._entry_ids
+        
+        with self._lock:
+            ids = get_faiss_index_ids(self.index)
+            if self._tombstones:
+                ids = ids[~np.isin(ids, list(self._tombstones))]
+            return ids
+    
+    def reconstruct_vectors(self, entry_ids: np.ndarray) -> np.ndarray:
+        """
+        Получение векторов, хранящихся в индексе, по ID записей
+        
+        Для сжатых индексов векторы восстанавливаются приближенно.
+        
+        Args:
+            entry_ids: ID записей, присутствующих в индексе
+            
+        Returns:
+            np.ndarray: Векторы в порядке ID
+        """
+        with self._lock:
+            if not len(entry_ids):
+                return np.empty((0, self.dimension), dtype=np.float32)
+            
+            if self.index_type not in IVF_INDEX_TYPES:
+                return np.vstack([self.index.reconstruct(int(entry_id)) for entry_id in entry_ids])
+            
+            # Индексу IVF для поиска вектора по ID нужна карта ID, которая держится
+            # только на время восстановления: с ней remove_ids не принимает IDSelectorBatch
+            ivf = faiss.extract_index_ivf(self.index)
+            ivf.set_direct_map_type(faiss.DirectMap.Hashtable)
+            try:
+                return np.vstack([self.index.reconstruct(int(entry_id)) for entry_id in entry_ids])
+            finally:
+                ivf.set_direct_map_type(faiss.DirectMap.NoMap)
+    
+    def search_vectors(self, query_vectors: np.ndarray, top_k: int = 10, filter_criteria: Dict = None,
+                       nprobe: Optional[int] = None, ef_search: Optional[int] = None,
+                       timings: Optional[Dict[str, float]] = None) -> List[List[Dict]]:
+        """
+        Поиск по индексу для нескольких векторов запросов одним вызовом FAISS
+        
+        Args:
+            query_vectors: Векторы запросов (по одному в строке)
+            top_k: Количество результатов для каждого запроса
+            filter_criteria: Критерии фильтрации результатов, общие для всех запросов
+            nprobe: IVF: количество просматриваемых кластеров
+            ef_search: HNSW: ширина поиска
+            timings: Словарь, в который добавляются длительности этапов в миллисекундах
+            
+        Returns:
+            List[List[Dict]]: Результаты поиска для каждого запроса
+        """
+        query_vectors = np.array(query_vectors, dtype=np.float32)
+        
+        with record_timing(timings, 'index_search_ms'):
+            # Нормализация векторов для косинусного сходства
+            faiss.normalize_L2(query_vectors)
+            
+            hits, residual_criteria = self._search_hits(query_vectors, top_k, filter_criteria, nprobe, ef_search)
+        
+        return self._hydrate_hits(hits, top_k, residual_criteria, timings)
+    
+    def _search_hits(self, query_vectors: np.ndarray, top_k: int, filter_criteria: Optional[Dict],
+                     nprobe: Optional[int], ef_search: Optional[int]) -> Tuple[List[List[Tuple[int, float]]], Dict]:
+        """
+        Поиск ID ближайших записей без загрузки их данных
+        
+        Args:
+            query_vectors: Нормализованные векторы запросов
+            top_k: Количество результатов для каждого запроса
+            filter_criteria: Критерии фильтрации результатов
+            nprobe: IVF: количество просматриваемых кластеров
+            ef_search: HNSW: ширина поиска
+            
+        Returns:
+            Tuple[List[List[Tuple[int, float]]], Dict]: Пары (ID записи, оценка) для каждого
+            запроса и критерии фильтрации, которые нужно проверить после загрузки записей
+        """
+        # Согласованный снимок состояния: перезагрузка индекса в другом потоке
+        # подменяет его целиком и не влияет на уже выполняющийся запрос
+        with self._lock:
+            index = self.index
+            filter_index = self._filter_index
+            tombstones, excluded_selector = self._get_exclusions()
+            index_type = self.index_type
+            config = self.config
+        
+        # Фильтры по типу сущности, проекту и исполнителю применяются внутри FAISS,
+        # остальные фильтры по метаданным проверяются после поиска
+        allowed_ids, residual_criteria = None, filter_criteria or {}
+        if filter_criteria and filter_index is not None:
+            allowed_ids, residual_criteria = filter_index.select(filter_criteria)
+        
+        # Кандидатов больше, если часть из них отсеют фильтры после загрузки записей
+        candidates = top_k * 3 if residual_criteria else top_k
+        
+        # Удаленные векторы и векторы HNSW без ID отсекаются селектором внутри FAISS,
+        # поэтому их количество не увеличивает число запрашиваемых соседей
+        if allowed_ids is not None:
+            if tombstones:
+                allowed_ids = allowed_ids[~np.isin(allowed_ids, list(tombstones))]
+            selector = faiss.IDSelectorBatch(allowed_ids)
+        else:
+            selector = excluded_selector
+        
+        k = candidates
+        compressed = index_type in COMPRESSED_INDEX_TYPES
+        if compressed:
+            k *= config['rerank_factor']
+        
+        if (allowed_ids is not None and not len(allowed_ids)) or not index.ntotal:
+            # Ни одна запись не проходит фильтры
+            return [[] for _ in range(len(query_vectors))], residual_criteria
+        
+        # Поиск ближайших векторов
+        scores, indices = index.search(
+            query_vectors, k, params=self._get_search_params(index, index_type, nprobe, ef_search, selector)
+        )
+        
+        # Сжатый индекс дает приближенные оценки, итоговый порядок определяется точным сходством
+        if compressed:
+            scores, indices = self._rerank_exact(query_vectors, indices)
+        
+        # Загружаются только записи нужного количества кандидатов
+        hits = [
+            [
+                (int(entry_id), float(score))
+                for entry_id, score in zip(row_indices, row_scores)
+                if entry_id != -1 and int(entry_id) not in tombstones
+            ][:candidates]
+            for row_indices, row_scores in zip(indices, scores)
+        ]
+        return hits, residual_criteria
+    
+    def _get_exclusions(self) -> Tuple[frozenset, Optional[faiss.IDSelector]]:
+        """
+        ID записей, исключаемых из результатов поиска, и селектор FAISS для них
+        
+        Вызывается под self._lock. Селектор строится один раз и сбрасывается
+        при изменении помеченных на удаление записей или векторов HNSW без ID.
+        
+        Returns:
+            Tuple[frozenset, Optional[faiss.IDSelector]]: ID записей, помеченных на удаление,
+            и селектор, отклоняющий их и ID -1 (None, если исключать нечего)
+        """
+        if self._exclusions is None:
+            tombstones = frozenset(self._tombstones)
+            excluded = np.array(sorted(tombstones) + ([-1] if self._dead_count else []), dtype=np.int64)
+            
+            selector = None
+            if len(excluded):
+                batch = faiss.IDSelectorBatch(excluded)
+                selector = faiss.IDSelectorNot(batch)
+                # Внутренний селектор должен жить столько же, сколько внешний
+                selector.referenced_objects = [batch]
+            
+            self._exclusions = (tombstones, selector)
+        
+        return self._exclusions
+
+
+def get_vector_index_class() -> Type[BaseVectorIndexService]:
+    """
+    Класс сервиса векторного индекса, хранящего индекс в этом процессе
+    
+    Returns:
+        Type[BaseVectorIndexService]: Сервис pgvector, если VECTOR_DB_TYPE == 'pgvector',
+        шардированного индекса, если задан VECTOR_INDEX_SHARD_BY, иначе FAISS
+    """
+    if settings.VECTOR_DB_TYPE == 'pgvector':
+        from .pgvector_index import PgVectorIndexService
+        return PgVectorIndexService
+    if settings.VECTOR_INDEX_SHARD_BY:
+        from .sharded_index import ShardedVectorIndexService
+        return ShardedVectorIndexService
+    return VectorIndexService
+
+
+def create_vector_index_service(index_name='default') -> BaseVectorIndexService:
+    """
+    Создание сервиса векторного индекса, хранящего индекс в этом процессе
+    
+    Args:
+        index_name: Имя индекса
+        
+    Returns:
+        BaseVectorIndexService: Сервис индекса (см. get_vector_index_class)
+    """
+    return get_vector_index_class()(index_name)
 
 
 # Инициализация сервиса
 _vector_index_service = None
 
-def get_vector_index_service() -> VectorIndexService:
+def get_vector_index_service() -> BaseVectorIndexService:
     """
     Получение экземпляра сервиса векторного индекса
     
     Returns:
-        VectorIndexService: Экземпляр сервиса
+        BaseVectorIndexService: Экземпляр сервиса
     """
     global _vector_index_service
     if _vector_index_service is None:
-        _vector_index_service = VectorIndexService()
+        # При настроенном сервере поиска индекс в процессе не загружается
+        if settings.VECTOR_SEARCH_SERVER_SOCKET:
+            from .search_server import RemoteVectorIndexService
+            _vector_index_service = RemoteVectorIndexService(settings.VECTOR_SEARCH_SERVER_SOCKET)
+        else:
+            _vector_index_service = create_vector_index_service()
     return _vector_index_service
\ No newline at end of file
@@ -0,0 +1,165 @@
+from celery import shared_task
+import logging
+from django.conf import settings
+from django.core.cache import cache
+from .services.vector_index import get_vector_index_service, get_vector_index_class
+
+logger = logging.getLogger(__name__)
+
+@shared_task
+def compact_vector_index():
+    """
+    Celery задача для компактификации и сохранения векторного индекса
+    """
+    logger.info("Starting vector index compaction task")
+    
+    try:
+        # Сохранение удаляет из индекса помеченные на удаление векторы
+        flushed = get_vector_index_service().flush()
+        
+        return {'flushed': flushed}
+    except Exception as e:
+        logger.error(f"Error in vector index compaction task: {e}")
+        
+        # Пробрасываем исключение дальше для обработки Celery
+        raise
+
+
+
+@shared_task(bind=True)
+def rebuild_vector_index(self, index_name='default'):
+    """
+    Celery задача для перестроения векторного индекса в новое поколение
+    
+    Прогресс публикуется через состояние задачи PROGRESS
+    с полями processed и total.
+    """
+    logger.info(f"Starting vector index rebuild task for {index_name}")
+    
+    def report_progress(processed, total):
+        self.update_state(state='PROGRESS', meta={'processed': processed, 'total': total})
+    
+    try:
+        # Новое поколение строится отдельным экземпляром сервиса без загрузки текущего
+        # индекса, процессы, работающие с индексом, загрузят его после сохранения
+        count = get_vector_index_class().build_generation(index_name, progress_callback=report_progress)
+        
+        return {'index_name': index_name, 'vectors': count}
+    except Exception as e:
+        logger.error(f"Error in vector index rebuild task: {e}")
+        
+        # Пробрасываем исключение дальше для обработки Celery
+        raise
+    finally:
+        # Снимаем блокировку, установленную при постановке задачи
+        cache.delete(f"vector_index_rebuild:{index_name}")
+
+@shared_task
+def check_vector_index_consistency(repair=True, sample_size=None):
+    """
+    Celery задача для проверки согласованности векторного индекса с таблицей VectorEntry
+    
+    Найденные расхождения исправляются пакетными изменениями индекса.
+    """
+    from .services.consistency import check_vector_index
+    
+    logger.info("Starting vector index consistency check task")
+    
+    try:
+        reports = check_vector_index(repair=repair, sample_size=sample_size)
+        
+        return [report.to_dict() for report in reports]
+    except Exception as e:
+        logger.error(f"Error in vector index consistency check task: {e}")
+        
+        # Пробрасываем исключение дальше для обработки Celery
+        raise
+
+@shared_task
+def backfill_search_vectors(batch_size=None):
+    """
+    Celery задача для заполнения search_vector записей, сохраненных в обход VectorEntry.save()
+    """
+    from .services.fulltext import update_search_vectors
+    
+    logger.info("Starting search vector backfill task")
+    
+    try:
+        updated = update_search_vectors(batch_size=batch_size)
+        
+        return {'updated': updated}
+    except Exception as e:
+        logger.error(f"Error in search vector backfill task: {e}")
+        
+        # Пробрасываем исключение дальше для обработки Celery
+        raise
+
+@shared_task
+def write_search_logs(records):
+    """
+    Celery задача для пакетной записи поисковых запросов в SearchLog
+    """
+    from .models import SearchLog
+    
+    try:
+        SearchLog.objects.bulk_create([SearchLog(**fields) for fields in records])
+        
+        return {'written': len(records)}
+    except Exception as e:
+        logger.error(f"Error in search log write task: {e}")
+        
+        # Пробрасываем исключение дальше для обработки Celery
+        raise
+
+@shared_task
+def setup_periodic_index_maintenance():
+    """
+    Настройка периодического обслуживания векторного индекса
+    """
+    from django_celery_beat.models import PeriodicTask, IntervalSchedule
+    
+    # Определяем интервал компактификации из настроек
+    interval_seconds = settings.VECTOR_INDEX_COMPACT_INTERVAL
+    
+    # Создаем расписание
+    schedule, _ = IntervalSchedule.objects.get_or_create(
+        every=interval_seconds,
+        period=IntervalSchedule.SECONDS,
+    )
+    
+    # Создаем или обновляем периодическую задачу
+    PeriodicTask.objects.update_or_create(
+        name='Compact vector index',
+        defaults={
+            'task': 'vector_db.tasks.compact_vector_index',
+            'interval': schedule,
+            'enabled': True,
+        }
+    )
+    
+    # Проверка согласованности индекса с БД выполняется реже компактификации
+    check_schedule, _ = IntervalSchedule.objects.get_or_create(
+        every=settings.VECTOR_INDEX_CHECK_INTERVAL,
+        period=IntervalSchedule.SECONDS,
+    )
+    
+    PeriodicTask.objects.update_or_create(
+        name='Check vector index consistency',
+        defaults={
+            'task': 'vector_db.tasks.check_vector_index_consistency',
+            'interval': check_schedule,
+            'enabled': True,
+        }
+    )
+    
+    # Записи, созданные bulk_create или update(), получают tsvector с той же периодичностью
+    PeriodicTask.objects.update_or_create(
+        name='Backfill search vectors',
+        defaults={
+            'task': 'vector_db.tasks.backfill_search_vectors',
+            'interval': check_schedule,
+            'enabled': True,
+        }
+    )
+    
+    logger.info(f"Periodic index maintenance setup completed with interval {interval_seconds} seconds")
\ No newline at end of file
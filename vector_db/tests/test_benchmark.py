@@ -0,0 +1,48 @@
+import atexit
+import os
+from unittest import mock
+from django.conf import settings
+from ..models import VectorIndex
+from ..services.benchmark import run_benchmark, BenchmarkIndexService, generate_clustered_vectors
+from .utils import VectorIndexTestCase, TEST_DIMENSION
+
+
+class BenchmarkTests(VectorIndexTestCase):
+    """
+    Замеры индексов на синтетических векторах
+    """
+    def test_results_for_every_index_and_search_parameter(self):
+        with mock.patch.object(atexit, 'register') as register:
+            report = run_benchmark([400], TEST_DIMENSION, index_types=['flat', 'hnsw', 'ivf'], n_queries=20,
+                                   top_k=5, nprobe_values=[1, 8], ef_search_values=[16], n_clusters=4,
+                                   config_overrides={'nlist': 8})
+        
+        results = {(r['index'], tuple(r['search_params'].items())): r for r in report['results']}
+        self.assertEqual(set(results), {
+            ('flat', ()), ('hnsw', (('ef_search', 16),)), ('ivf', (('nprobe', 1),)), ('ivf', (('nprobe', 8),))
+        })
+        for result in results.values():
+            self.assertNotIn('error', result)
+            self.assertGreater(result['index_bytes'], 0)
+            self.assertLessEqual(result['p50_ms'], result['p99_ms'])
+        
+        # Точный поиск совпадает с эталоном, а просмотр всех кластеров IVF — с точным поиском
+        self.assertEqual(results[('flat', ())]['recall_at_5'], 1.0)
+        self.assertEqual(results[('ivf', (('nprobe', 8),))]['recall_at_5'], 1.0)
+        
+        # Замеры не оставляют файлов, записей реестра и обработчиков завершения процесса
+        register.assert_not_called()
+        self.assertFalse(VectorIndex.objects.exists())
+        self.assertFalse(os.path.exists(os.path.join(settings.BASE_DIR, 'vector_indices')))
+    
+    def test_compressed_index_is_reranked_by_original_vectors(self):
+        vectors = generate_clustered_vectors(300, TEST_DIMENSION, 4, seed=1)
+        service = BenchmarkIndexService(TEST_DIMENSION, {'index': 'ivfpq', 'nlist': 4, 'pq_m': 2, 'pq_nbits': 4})
+        service.build(vectors)
+        
+        hits, _ = service._search_hits(vectors[:3].copy(), 5, None, 4, None)
+        for row, query in zip(hits, vectors[:3]):
+            scores = [score for _, score in row]
+            self.assertEqual(scores, sorted(scores, reverse=True))
+            for entry_id, score in row:
+                self.assertAlmostEqual(score, float(vectors[entry_id] @ query), places=5)
\ No newline at end of file
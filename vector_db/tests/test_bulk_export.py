@@ -0,0 +1,86 @@
+import os
+from unittest import mock
+import numpy as np
+from ..models import VectorEntry
+from ..services import vector_index
+from ..services.bulk_export import (
+    export_embeddings, import_embeddings, refresh_imported_entries, save_embeddings, load_embeddings
+)
+from .utils import VectorIndexTestCase, TEST_DIMENSION, random_embeddings
+
+
+class BulkExportTests(VectorIndexTestCase):
+    """
+    Выгрузка и загрузка эмбеддингов через двоичный COPY
+    """
+    def test_export_decodes_copy_stream(self):
+        entries = self.create_entries(25)
+        VectorEntry.objects.create(entity_type='task', entity_id=1000, text='short', embedding=[1.0, 2.0])
+        progress = []
+        
+        ids, vectors = export_embeddings(progress_callback=lambda done, total: progress.append((done, total)))
+        
+        # Записи другой размерности пропускаются, порядок по ID
+        self.assertEqual(ids.tolist(), [entry.id for entry in entries])
+        self.assertEqual(vectors.dtype, np.float32)
+        np.testing.assert_array_equal(vectors, np.array([entry.embedding for entry in entries], dtype=np.float32))
+        self.assertEqual(progress[-1], (25, 25))
+    
+    def test_export_of_empty_queryset(self):
+        ids, vectors = export_embeddings(VectorEntry.objects.none())
+        
+        self.assertEqual(ids.shape, (0,))
+        self.assertEqual(vectors.shape, (0, TEST_DIMENSION))
+    
+    def test_save_and_load_round_trip(self):
+        entries = self.create_entries(5)
+        ids, vectors = export_embeddings()
+        
+        path = os.path.join(self.index_dir, 'embeddings')
+        save_embeddings(path, ids, vectors)
+        loaded_ids, loaded_vectors = load_embeddings(path)
+        
+        self.assertEqual(loaded_ids.tolist(), [entry.id for entry in entries])
+        np.testing.assert_array_equal(loaded_vectors, vectors)
+    
+    def test_import_updates_existing_entries(self):
+        entries = self.create_entries(30)
+        ids = np.array([entry.id for entry in entries] + [10 ** 9], dtype=np.int64)
+        vectors = random_embeddings(31, seed=5)
+        
+        updated = import_embeddings(ids, vectors, batch_size=7)
+        
+        self.assertEqual(updated, 30)
+        exported_ids, exported_vectors = export_embeddings()
+        self.assertEqual(exported_ids.tolist(), ids[:30].tolist())
+        np.testing.assert_array_equal(exported_vectors, vectors[:30])
+    
+    def test_import_rejects_mismatched_lengths(self):
+        with self.assertRaises(ValueError):
+            import_embeddings(np.arange(3, dtype=np.int64), random_embeddings(2))
+    
+    def test_import_rejects_wrong_dimension(self):
+        entries = self.create_entries(3)
+        ids = np.array([entry.id for entry in entries], dtype=np.int64)
+        
+        for vectors in (random_embeddings(3, dimension=TEST_DIMENSION + 1), random_embeddings(3).ravel()[:3]):
+            with self.subTest(shape=vectors.shape), self.assertRaises(ValueError):
+                import_embeddings(ids, vectors)
+        
+        _, exported_vectors = export_embeddings()
+        np.testing.assert_array_equal(exported_vectors, np.array([entry.embedding for entry in entries], dtype=np.float32))
+    
+    def test_refresh_updates_index(self):
+        entries = self.create_entries(20)
+        service = self.create_service()
+        service.rebuild()
+        
+        ids = np.array([entry.id for entry in entries[:10]], dtype=np.int64)
+        vectors = random_embeddings(10, seed=5)
+        import_embeddings(ids, vectors)
+        
+        with mock.patch.object(vector_index, 'get_vector_index_service', return_value=service):
+            self.assertEqual(refresh_imported_entries(ids, batch_size=3), 10)
+        
+        expected = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+        np.testing.assert_allclose(service.reconstruct_vectors(ids), expected, rtol=1e-5, atol=1e-6)
\ No newline at end of file
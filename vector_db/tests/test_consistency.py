@@ -0,0 +1,50 @@
+from ..models import VectorEntry
+from ..services.consistency import check_index, reconcile_index, check_vector_index
+from .utils import VectorIndexTestCase, connect_remote, random_embeddings
+
+
+class ConsistencyCheckTests(VectorIndexTestCase):
+    """
+    Проверка и исправление расхождений индекса с таблицей VectorEntry
+    """
+    def _make_drift(self, entries):
+        # Запись удалена из БД, новая запись не попала в индекс, эмбеддинг изменен
+        orphaned, stale = entries[0], entries[1]
+        VectorEntry.objects.filter(id=orphaned.id).delete()
+        VectorEntry.objects.filter(id=stale.id).update(embedding=random_embeddings(1, seed=99)[0].tolist())
+        missing = self.create_entries(1, seed=7)[0]
+        return orphaned.id, stale.id, missing.id
+    
+    def test_detects_and_repairs_drift(self):
+        for index_type in ('flat', 'hnsw'):
+            with self.subTest(index_type=index_type):
+                VectorEntry.objects.all().delete()
+                entries = self.create_entries(50)
+                service = self.create_service(index_type)
+                service.rebuild()
+                
+                orphaned_id, stale_id, missing_id = self._make_drift(entries)
+                
+                report = check_index(service, sample_size=1000)
+                self.assertEqual(report.orphaned_ids.tolist(), [orphaned_id])
+                self.assertEqual(report.missing_ids.tolist(), [missing_id])
+                self.assertEqual(report.stale_ids.tolist(), [stale_id])
+                
+                reconcile_index(service, report)
+                self.assertEqual(report.repaired, {'added': 1, 'updated': 1, 'removed': 1})
+                self.assertFalse(check_index(service, sample_size=1000).has_drift)
+    
+    def test_remote_service_is_checked_through_server(self):
+        entries = self.create_entries(20)
+        service = self.create_service()
+        service.rebuild()
+        orphaned_id, stale_id, missing_id = self._make_drift(entries)
+        
+        remote = connect_remote(service)
+        report = check_vector_index(repair=True, sample_size=1000, service=remote)[0]
+        
+        self.assertEqual(report.orphaned_ids.tolist(), [orphaned_id])
+        self.assertEqual(report.missing_ids.tolist(), [missing_id])
+        self.assertEqual(report.stale_ids.tolist(), [stale_id])
+        self.assertEqual(report.repaired, {'added': 1, 'updated': 1, 'removed': 1})
+        self.assertFalse(check_index(service, sample_size=1000).has_drift)
\ No newline at end of file
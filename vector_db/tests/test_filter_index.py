@@ -0,0 +1,61 @@
+import os
+import tempfile
+from django.test import SimpleTestCase
+from ..services.filter_index import EntryFilterIndex
+
+
+class EntryFilterIndexTests(SimpleTestCase):
+    """
+    Выбор допустимых ID записей по критериям фильтрации
+    """
+    def setUp(self):
+        self.index = EntryFilterIndex()
+        self.index.upsert([
+            (1, 'task', {'project_id': 12, 'assignee_id': 5}),
+            (2, 'task', {'project_id': 12.0}),
+            (3, 'comment', {'project_id': '12'}),
+            (4, 'task', {'project_id': 7, 'assignee_id': -1}),
+            (5, 'project', {}),
+        ])
+    
+    def test_integer_criteria_are_selected_in_index(self):
+        ids, residual = self.index.select({'entity_types': ['task'], 'metadata': {'project_id': 12}})
+        self.assertEqual(ids.tolist(), [1, 2])
+        self.assertEqual(residual, {})
+        
+        ids, residual = self.index.select({'metadata': {'project_id': 12.0, 'assignee_id': 5}})
+        self.assertEqual(ids.tolist(), [1])
+        self.assertEqual(residual, {})
+    
+    def test_other_values_are_left_for_exact_check(self):
+        for value in ('12', 12.7, True, -1, None, [12]):
+            with self.subTest(value=value):
+                ids, residual = self.index.select({'entity_types': ['comment'], 'metadata': {'project_id': value}})
+                self.assertEqual(ids.tolist(), [3])
+                self.assertEqual(residual, {'metadata': {'project_id': value}})
+        
+        ids, residual = self.index.select({'metadata': {'status': 'open'}})
+        self.assertIsNone(ids)
+        self.assertEqual(residual, {'metadata': {'status': 'open'}})
+    
+    def test_unknown_entity_type_selects_nothing(self):
+        ids, residual = self.index.select({'entity_types': ['document']})
+        self.assertEqual(len(ids), 0)
+    
+    def test_upsert_replaces_and_remove_drops_attributes(self):
+        self.index.upsert([(1, 'comment', {'project_id': 7}), (6, 'task', {'project_id': 7})])
+        self.index.remove([4])
+        
+        self.assertEqual(self.index.select({'metadata': {'project_id': 7}})[0].tolist(), [1, 6])
+        self.assertEqual(self.index.select({'entity_types': ['task']})[0].tolist(), [2, 6])
+        self.assertEqual(len(self.index), 5)
+    
+    def test_save_and_load(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'attrs.npz')
+            self.index.save(path)
+            loaded = EntryFilterIndex.load(path)
+        
+        criteria = {'entity_types': ['task', 'comment'], 'metadata': {'project_id': 12}}
+        self.assertEqual(loaded.select(criteria)[0].tolist(), self.index.select(criteria)[0].tolist())
+        self.assertEqual(loaded.entity_types, self.index.entity_types)
\ No newline at end of file
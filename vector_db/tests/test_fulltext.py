@@ -0,0 +1,67 @@
+from django.contrib.postgres.search import SearchQuery
+from django.db.models import F, TextField, Value
+from django.db.models.functions import Concat
+from django.test import TestCase, override_settings
+from ..models import VectorEntry
+from ..services.fulltext import update_search_vectors
+from ..tasks import backfill_search_vectors
+
+
+@override_settings(FULLTEXT_SEARCH_CONFIG='simple')
+class SearchVectorTests(TestCase):
+    """
+    Заполнение search_vector при сохранении записей и фоновом заполнении
+    """
+    def _matching_ids(self, word):
+        return list(VectorEntry.objects.filter(search_vector=SearchQuery(word, config='simple')).values_list('id', flat=True))
+    
+    def test_save_fills_search_vector(self):
+        entry = VectorEntry.objects.create(entity_type='task', entity_id=1, text='квартальный отчет', embedding=[0.0])
+        self.assertEqual(self._matching_ids('отчет'), [entry.id])
+        
+        VectorEntry.objects.update_or_create(entity_type='task', entity_id=1, defaults={'text': 'годовой бюджет'})
+        self.assertEqual(self._matching_ids('отчет'), [])
+        self.assertEqual(self._matching_ids('бюджет'), [entry.id])
+        
+        entry.text = 'план закупок'
+        entry.save(update_fields=['text'])
+        self.assertEqual(self._matching_ids('закупок'), [entry.id])
+    
+    def test_saved_entry_has_no_search_vector_expression(self):
+        entry = VectorEntry.objects.create(entity_type='task', entity_id=1, text='квартальный отчет', embedding=[0.0])
+        
+        self.assertIn('search_vector', entry.get_deferred_fields())
+        self.assertIn("'отчет'", entry.search_vector)
+        
+        entry.text = 'годовой бюджет'
+        entry.save()
+        self.assertIn("'бюджет'", entry.search_vector)
+    
+    def test_queryset_updates_recompute_search_vector(self):
+        entries = [
+            VectorEntry.objects.create(entity_type='task', entity_id=i, text=f"задача {i}", embedding=[0.0])
+            for i in range(3)
+        ]
+        
+        VectorEntry.objects.filter(id=entries[0].id).update(text='квартальный отчет')
+        VectorEntry.objects.filter(id=entries[1].id).update(text=Concat(F('text'), Value(' бюджет'), output_field=TextField()))
+        
+        entries[2].text = 'план закупок'
+        VectorEntry.objects.bulk_update(entries[2:], ['text'])
+        
+        self.assertEqual(self._matching_ids('отчет'), [entries[0].id])
+        self.assertEqual(self._matching_ids('бюджет'), [entries[1].id])
+        self.assertEqual(self._matching_ids('закупок'), [entries[2].id])
+        self.assertEqual(self._matching_ids('задача'), [entries[1].id])
+        self.assertIn('search_vector', entries[2].get_deferred_fields())
+    
+    def test_backfill_fills_bulk_created_entries(self):
+        VectorEntry.objects.bulk_create([
+            VectorEntry(entity_type='task', entity_id=i, text=f"задача {i}", embedding=[0.0]) for i in range(5)
+        ])
+        VectorEntry.objects.create(entity_type='task', entity_id=100, text='готовая задача', embedding=[0.0])
+        self.assertEqual(VectorEntry.objects.filter(search_vector__isnull=True).count(), 5)
+        
+        self.assertEqual(update_search_vectors(batch_size=2), 5)
+        self.assertEqual(len(self._matching_ids('задача')), 6)
+        self.assertEqual(backfill_search_vectors(), {'updated': 0})
\ No newline at end of file
@@ -0,0 +1,90 @@
+import math
+import random
+import time
+from django.test import SimpleTestCase, override_settings
+from ..services.keyword_index import KeywordIndex, tokenize, BM25_K1, BM25_B
+
+WORDS = ('отчет', 'задача', 'проект', 'сервер', 'бюджет', 'договор', 'релиз', 'клиент', 'оплата', 'встреча')
+
+
+def reference_search(documents, query, top_k, entity_types=None):
+    """
+    Оценки BM25, вычисленные напрямую по текстам записей
+    """
+    terms = {entry_id: tokenize(text) for entry_id, (_, text) in documents.items()}
+    terms = {entry_id: doc_terms for entry_id, doc_terms in terms.items() if doc_terms}
+    average_length = sum(len(doc_terms) for doc_terms in terms.values()) / len(terms)
+    
+    scores = {}
+    for term in set(tokenize(query)):
+        matching = [entry_id for entry_id, doc_terms in terms.items() if term in doc_terms]
+        idf = math.log(1 + (len(terms) - len(matching) + 0.5) / (len(matching) + 0.5))
+        for entry_id in matching:
+            frequency = terms[entry_id].count(term)
+            norm = BM25_K1 * (1 - BM25_B + BM25_B * len(terms[entry_id]) / average_length)
+            scores[entry_id] = scores.get(entry_id, 0.0) + idf * frequency * (BM25_K1 + 1) / (frequency + norm)
+    
+    if entity_types:
+        scores = {entry_id: score for entry_id, score in scores.items() if documents[entry_id][0] in entity_types}
+    return sorted(scores.items(), key=lambda item: (-item[1], item[0]))[:top_k]
+
+
+@override_settings(KEYWORD_INDEX_REFRESH_INTERVAL=3600)
+class KeywordIndexTests(SimpleTestCase):
+    """
+    Ранжирование BM25 индекса ключевых слов при добавлении и удалении записей
+    """
+    def setUp(self):
+        self.rng = random.Random(0)
+        self.index = KeywordIndex()
+        # Изменения других процессов в этих тестах не загружаются
+        self.index._checked_at = time.monotonic()
+        self.documents = {}
+    
+    def _upsert(self, entry_ids):
+        rows = []
+        for entry_id in entry_ids:
+            entity_type = self.rng.choice(('task', 'comment'))
+            text = ' '.join(self.rng.choice(WORDS) for _ in range(self.rng.randint(0, 12)))
+            self.documents[entry_id] = (entity_type, text)
+            rows.append((entry_id, entity_type, text))
+        self.index.upsert(rows)
+    
+    def _remove(self, entry_ids):
+        for entry_id in entry_ids:
+            self.documents.pop(entry_id, None)
+        self.index.remove(entry_ids)
+    
+    def assertMatchesReference(self, query, top_k=20, entity_types=None):
+        results = self.index.search(query, top_k, entity_types)
+        expected = reference_search(self.documents, query, top_k, entity_types)
+        
+        all_scores = dict(reference_search(self.documents, query, len(self.documents), entity_types))
+        
+        self.assertEqual(len(results), len(expected))
+        for (entry_id, score), (_, expected_score) in zip(results, expected):
+            self.assertAlmostEqual(score, expected_score, places=4)
+            self.assertAlmostEqual(score, all_scores[entry_id], places=4)
+    
+    def test_scores_match_bm25(self):
+        self._upsert(range(1, 301))
+        
+        for query in ('отчеты по задачам', 'бюджет проекта', 'встреча', 'неизвестное слово'):
+            with self.subTest(query=query):
+                self.assertMatchesReference(query)
+        self.assertMatchesReference('договор клиента', entity_types=['comment'])
+    
+    def test_updates_and_compaction_keep_scores(self):
+        self._upsert(range(1, 3001))
+        self._remove(range(1, 3001, 2))
+        self._upsert(range(2, 1001, 2))
+        self._upsert(range(3001, 3101))
+        
+        self.assertEqual(len(self.index), len([text for _, text in self.documents.values() if tokenize(text)]))
+        self.assertLess(self.index._size, 3100)
+        for query in ('отчет задача', 'релиз сервера', 'оплата'):
+            with self.subTest(query=query):
+                self.assertMatchesReference(query)
+        
+        self._remove(list(self.documents))
+        self.assertEqual(self.index.search('отчет', 10), [])
\ No newline at end of file
@@ -0,0 +1,85 @@
+from unittest import mock
+from django.db import connection
+from django.test import override_settings
+from django_redis import get_redis_connection
+from ..models import VectorEntry, VectorIndex
+from ..services.pgvector_index import PgVectorIndexService
+from .utils import VectorIndexTestCase, random_embeddings
+
+
+class PgVectorIndexTests(VectorIndexTestCase):
+    """
+    Индекс pgvector в таблице VectorEntry
+    """
+    def setUp(self):
+        super().setUp()
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT 1 FROM pg_available_extensions WHERE name = 'vector'")
+            if cursor.fetchone() is None:
+                self.skipTest("pgvector extension is not installed")
+    
+    def test_schema_is_created_only_by_setup(self):
+        service = PgVectorIndexService()
+        self.assertIsNone(service._get_column_type())
+        
+        self.assertTrue(service.setup_schema())
+        self.assertEqual(service._get_column_type(), 'vector(8)')
+        self.assertFalse(service.setup_schema())
+    
+    def test_filtered_search_matches_exact_filter(self):
+        project_ids = [12, 12.0, '12', 7, [12, 7]]
+        self.create_entries(50, metadata=lambda i: {'project_id': project_ids[i % 5]})
+        service = PgVectorIndexService()
+        service.setup_schema()
+        self.assertEqual(service.rebuild(), 50)
+        
+        entries = list(VectorEntry.objects.all())
+        query = random_embeddings(1, seed=3)
+        
+        for value in (12, '12', 12.7, [12], [12, 7]):
+            criteria = {'metadata': {'project_id': value}}
+            with self.subTest(value=value):
+                expected = {
+                    entry.id for entry in entries
+                    if service._apply_filters({'entity_type': entry.entity_type, 'metadata': entry.metadata}, criteria)
+                }
+                results = service.search_vectors(query, top_k=100, filter_criteria=criteria)[0]
+                self.assertEqual({result['id'] for result in results}, expected)
+    
+    def test_unsupported_iterative_scan_mode_is_not_applied(self):
+        for mode, expected in (('relaxed_order', 'relaxed_order'), ('off; DROP TABLE x', ''), ('unknown', '')):
+            with self.subTest(mode=mode), override_settings(PGVECTOR_ITERATIVE_SCAN=mode):
+                self.assertEqual(PgVectorIndexService().iterative_scan, expected)
+        
+        with override_settings(PGVECTOR_INDEX_TYPE='ivfflat', PGVECTOR_ITERATIVE_SCAN='strict_order'), \
+                mock.patch.object(PgVectorIndexService, 'index_type', 'ivfflat'):
+            self.assertEqual(PgVectorIndexService().iterative_scan, '')    
+    def test_generation_is_shared_through_redis(self):
+        self.create_entries(10)
+        service = PgVectorIndexService()
+        service.setup_schema()
+        other = PgVectorIndexService()
+        
+        redis = get_redis_connection('default')
+        redis.delete(service._get_generation_key())
+        self.addCleanup(redis.delete, service._get_generation_key())
+        
+        with override_settings(PGVECTOR_GENERATION_TTL=60):
+            service.rebuild()
+            stored = VectorIndex.objects.get(name='default').generation
+            initial = other.get_generation()
+            self.assertEqual(initial, stored)
+            
+            # Изменения векторов не пишут в БД и сразу видны изменившему процессу
+            entry_id = VectorEntry.objects.first().id
+            with self.assertNumQueries(1):
+                service.remove_vectors([entry_id])
+            self.assertEqual(service.get_generation(), stored + 1)
+            self.assertEqual(VectorIndex.objects.get(name='default').generation, stored)
+            
+            # Другие процессы читают поколение не чаще раза в PGVECTOR_GENERATION_TTL
+            with self.assertNumQueries(0):
+                self.assertEqual(other.get_generation(), initial)
+        
+        with override_settings(PGVECTOR_GENERATION_TTL=0), self.assertNumQueries(0):
+            self.assertEqual(other.get_generation(), stored + 1)
\ No newline at end of file
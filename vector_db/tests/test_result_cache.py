@@ -0,0 +1,133 @@
+from unittest import mock
+from django.test import SimpleTestCase, TestCase, override_settings
+from ..services import search_service
+from ..services.result_cache import SearchResultCache, normalize_query
+from ..services.sharded_index import ShardedVectorIndexService
+from ..services.search_service import SearchService
+from .utils import VectorIndexTestCase, random_embeddings
+
+
+class ResultCacheTestMixin:
+    """
+    Кэш результатов с отдельным префиксом ключей в Redis
+    """
+    def setUp(self):
+        super().setUp()
+        self.cache = SearchResultCache(prefix='test_search_cache')
+        self.addCleanup(self.cache.clear)
+
+
+class SearchResultCacheTests(ResultCacheTestMixin, SimpleTestCase):
+    """
+    Ключи и вытеснение записей кэша результатов поиска
+    """
+    def test_key_ignores_query_formatting_and_type_order(self):
+        key = self.cache.make_key('Отчёт  по Задачам', 10, ['task', 'project'], {'status': 'open'}, 3)
+        
+        self.assertEqual(normalize_query(' Отчёт  по Задачам '), 'отчет по задачам')
+        self.assertEqual(self.cache.make_key('отчет по задачам', 10, ['project', 'task'], {'status': 'open'}, 3), key)
+        self.assertNotEqual(self.cache.make_key('отчет по задачам', 5, ['project', 'task'], {'status': 'open'}, 3), key)
+        self.assertNotEqual(self.cache.make_key('отчет по задачам', 10, ['task'], {'status': 'open'}, 3), key)
+        self.assertNotEqual(self.cache.make_key('отчет по задачам', 10, ['project', 'task'], None, 3), key)
+    
+    def test_new_generation_invalidates_results(self):
+        key = self.cache.make_key('запрос', 10, None, None, 1)
+        self.assertTrue(self.cache.set(key, {'total_results': 1, 'results': {'task': [{'id': 1}]}}))
+        
+        self.assertEqual(self.cache.get(key), {'total_results': 1, 'results': {'task': [{'id': 1}]}})
+        self.assertIsNone(self.cache.get(self.cache.make_key('запрос', 10, None, None, 2)))
+        self.assertEqual(self.cache.get_stats()['hits'], 1)
+        self.assertEqual(self.cache.get_stats()['misses'], 1)
+    
+    @override_settings(SEARCH_CACHE_MAX_ENTRIES=2)
+    def test_least_recently_read_entry_is_evicted(self):
+        keys = [self.cache.make_key(f"запрос {i}", 10, None, None, 1) for i in range(3)]
+        self.cache.set(keys[0], {'total_results': 0})
+        self.cache.set(keys[1], {'total_results': 1})
+        self.cache.get(keys[0])
+        self.cache.set(keys[2], {'total_results': 2})
+        
+        self.assertIsNotNone(self.cache.get(keys[0]))
+        self.assertIsNone(self.cache.get(keys[1]))
+        self.assertEqual(self.cache.get_stats()['evictions'], 1)
+    
+    @override_settings(SEARCH_CACHE_MAX_ENTRY_BYTES=100)
+    def test_large_results_are_not_cached(self):
+        key = self.cache.make_key('запрос', 10, None, None, 1)
+        self.assertFalse(self.cache.set(key, {'results': 'x' * 200}))
+        self.assertIsNone(self.cache.get(key))
+    
+    def test_sharded_generation_changes_with_any_shard(self):
+        def generation(**shard_generations):
+            service = ShardedVectorIndexService.__new__(ShardedVectorIndexService)
+            service.shards = {value: mock.Mock(**{'get_generation.return_value': gen}) for value, gen in shard_generations.items()}
+            return service.get_generation()
+        
+        self.assertEqual(generation(a=1, b=2), generation(b=2, a=1))
+        self.assertNotEqual(generation(a=1, b=2), generation(a=2, b=1))
+        self.assertNotEqual(generation(a=1, b=2), generation(a=1, b=2, c=0))
+        self.assertNotEqual(generation(a=1, b=2), generation(a=1, b='2+0a1b2c'))
+
+
+class UnsavedChangesGenerationTests(VectorIndexTestCase):
+    """
+    Поколение индекса с несохраненными изменениями для ключей кэша
+    """
+    def test_generation_changes_before_flush(self):
+        entries = self.create_entries(20)
+        service = self.create_service()
+        service.rebuild()
+        saved = service.get_generation()
+        self.assertEqual(saved, service.generation)
+        
+        entries[0].embedding = random_embeddings(1, seed=7)[0].tolist()
+        service.upsert_vectors([entries[0]])
+        upserted = service.get_generation()
+        
+        service.remove_vectors([entries[1].id])
+        removed = service.get_generation()
+        
+        self.assertEqual(len({saved, upserted, removed}), 3)
+        self.assertEqual(service.generation, saved)
+        
+        self.assertTrue(service.flush())
+        self.assertEqual(service.get_generation(), saved + 1)
+
+
+@override_settings(SEARCH_CACHE_ENABLED=True, HYBRID_SEARCH_ENABLED=False, SEARCH_LOG_ASYNC=False)
+class SearchServiceCacheTests(ResultCacheTestMixin, TestCase):
+    """
+    Использование кэша результатов в SearchService
+    """
+    def setUp(self):
+        super().setUp()
+        self.vector_index = mock.Mock()
+        self.vector_index.get_generation.return_value = 1
+        self.vector_index.search.return_value = [
+            {'id': 1, 'entity_type': 'project', 'entity_id': 1, 'text': 'проект', 'metadata': {}, 'score': 0.9}
+        ]
+        
+        with mock.patch.object(search_service, 'get_vector_index_service', return_value=self.vector_index), \
+                mock.patch.object(search_service, 'get_search_result_cache', return_value=self.cache):
+            self.service = SearchService()
+    
+    def test_repeated_search_is_served_from_cache(self):
+        first = self.service.search('проект')
+        second = self.service.search('Проект')
+        
+        self.assertNotIn('cached', first)
+        self.assertTrue(second['cached'])
+        self.assertEqual(second['results'], first['results'])
+        self.assertEqual(self.vector_index.search.call_count, 1)
+        
+        self.vector_index.get_generation.return_value = 2
+        self.assertNotIn('cached', self.service.search('проект'))
+        self.assertEqual(self.vector_index.search.call_count, 2)
+    
+    def test_search_without_cache_always_queries_index(self):
+        self.service.search('проект')
+        response = self.service.search('проект', use_cache=False)
+        
+        self.assertNotIn('cached', response)
+        self.assertEqual(self.vector_index.search.call_count, 2)
+        self.assertEqual(self.cache.get_stats()['hits'], 0)
\ No newline at end of file
@@ -0,0 +1,109 @@
+import atexit
+from unittest import mock
+from django.test import TestCase, override_settings
+from ..models import SearchLog
+from ..services import search_log_writer
+from ..services.search_log_writer import SearchLogWriter, log_search
+
+
+def make_record(i: int) -> dict:
+    return {'query': f"запрос {i}", 'results_count': i, 'duration_ms': 10}
+
+
+class SearchLogWriterTests(TestCase):
+    """
+    Буферизация и пакетная запись SearchLog
+    
+    Фоновый поток не запускается: его соединение с БД не видит транзакцию теста,
+    поэтому буфер сохраняется вызовом flush().
+    """
+    def setUp(self):
+        super().setUp()
+        patcher = mock.patch.object(search_log_writer.threading, 'Thread')
+        self.thread_class = patcher.start()
+        self.addCleanup(patcher.stop)
+    
+    def create_writer(self, **kwargs) -> SearchLogWriter:
+        writer = SearchLogWriter(**{'max_size': 100, 'batch_size': 4, 'flush_interval': 3600, **kwargs})
+        self.addCleanup(atexit.unregister, writer.flush)
+        return writer
+    
+    def test_flush_writes_buffer_in_batches(self):
+        writer = self.create_writer()
+        for i in range(10):
+            self.assertTrue(writer.write(make_record(i)))
+        
+        self.assertEqual(SearchLog.objects.count(), 0)
+        self.thread_class.assert_called_once()
+        
+        with mock.patch.object(SearchLog.objects, 'bulk_create', wraps=SearchLog.objects.bulk_create) as bulk_create:
+            self.assertEqual(writer.flush(), 10)
+        
+        self.assertEqual([len(call.args[0]) for call in bulk_create.call_args_list], [4, 4, 2])
+        self.assertEqual(sorted(SearchLog.objects.values_list('results_count', flat=True)), list(range(10)))
+        self.assertEqual(writer.get_stats(), {'backend': 'thread', 'buffered': 0, 'written': 10, 'dropped': 0, 'failed': 0})
+    
+    def test_full_batch_wakes_writer_thread(self):
+        writer = self.create_writer()
+        for i in range(3):
+            writer.write(make_record(i))
+        self.assertFalse(writer._wakeup.is_set())
+        
+        writer.write(make_record(3))
+        self.assertTrue(writer._wakeup.is_set())
+    
+    def test_overflow_drops_new_records(self):
+        writer = self.create_writer(max_size=5)
+        accepted = [writer.write(make_record(i)) for i in range(8)]
+        
+        self.assertEqual(accepted, [True] * 5 + [False] * 3)
+        self.assertEqual(writer.flush(), 5)
+        self.assertEqual(sorted(SearchLog.objects.values_list('results_count', flat=True)), list(range(5)))
+        self.assertEqual(writer.get_stats()['dropped'], 3)
+    
+    def test_failed_batch_is_counted_and_rest_is_kept(self):
+        writer = self.create_writer()
+        for i in range(6):
+            writer.write(make_record(i))
+        
+        with mock.patch.object(SearchLog.objects, 'bulk_create', side_effect=RuntimeError('db is down')):
+            self.assertEqual(writer.flush(), 0)
+        
+        self.assertEqual(writer.get_stats()['failed'], 4)
+        self.assertEqual(writer.flush(), 2)
+        self.assertEqual(SearchLog.objects.count(), 2)
+    
+    def test_celery_backend_sends_batches_to_task(self):
+        writer = self.create_writer(backend='celery')
+        for i in range(5):
+            writer.write(make_record(i))
+        
+        with mock.patch('vector_db.tasks.write_search_logs.delay') as delay:
+            self.assertEqual(writer.flush(), 5)
+        
+        self.assertEqual([call.args[0] for call in delay.call_args_list],
+                         [[make_record(i) for i in range(4)], [make_record(4)]])
+        self.assertEqual(SearchLog.objects.count(), 0)
+    
+    def test_forked_process_drops_inherited_records(self):
+        writer = self.create_writer()
+        writer.write(make_record(0))
+        
+        with mock.patch.object(search_log_writer.os, 'getpid', return_value=writer._pid + 1):
+            writer.write(make_record(1))
+        
+        self.assertEqual(self.thread_class.call_count, 2)
+        self.assertEqual(writer.flush(), 1)
+        self.assertEqual(list(SearchLog.objects.values_list('results_count', flat=True)), [1])
+    
+    def test_unknown_backend_is_rejected(self):
+        with self.assertRaises(ValueError):
+            SearchLogWriter(backend='kafka')
+    
+    @override_settings(SEARCH_LOG_ASYNC=False)
+    def test_log_search_writes_immediately_when_async_is_off(self):
+        with mock.patch.object(search_log_writer, 'get_search_log_writer') as get_writer:
+            log_search(**make_record(1))
+        
+        get_writer.assert_not_called()
+        self.assertEqual(SearchLog.objects.count(), 1)
\ No newline at end of file
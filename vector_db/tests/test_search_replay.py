@@ -0,0 +1,66 @@
+from unittest import mock
+from django.test import TestCase
+from ..models import SearchLog
+from ..services import search_replay
+from ..services.search_replay import sample_logged_queries, replay_queries, compare_with_baseline
+
+
+class SearchReplayTests(TestCase):
+    """
+    Воспроизведение запросов из SearchLog и сравнение с эталоном
+    """
+    def _search(self, query, top_k, log, use_cache):
+        if query == 'сбой':
+            return {'error': 'index unavailable', 'results': {}}
+        return {'results': {
+            'task': [{'id': 1, 'score': 0.5, 'fused_score': 0.01}, {'id': 2, 'score': 0.9, 'fused_score': 0.03}],
+            'project': [{'id': 3, 'score': 0.7, 'fused_score': 0.02}],
+        }}
+    
+    def test_sample_skips_keyword_and_empty_queries(self):
+        for query in ('отчет', 'отчет', 'бюджет', 'keywords:отчет', ''):
+            SearchLog.objects.create(query=query, results_count=1, duration_ms=1)
+        
+        self.assertEqual(sorted(sample_logged_queries(10)), ['бюджет', 'отчет', 'отчет'])
+        self.assertEqual(sorted(sample_logged_queries(10, distinct=True)), ['бюджет', 'отчет'])
+        self.assertEqual(len(sample_logged_queries(2, distinct=True)), 2)
+    
+    def test_replay_ranks_results_and_counts_errors(self):
+        service = mock.Mock()
+        service.search.side_effect = self._search
+        
+        with mock.patch.object(search_replay, 'get_search_service', return_value=service):
+            report = replay_queries(['отчет', 'сбой', 'бюджет'], concurrency=2, top_k=5)
+        
+        self.assertEqual([run['query'] for run in report['runs']], ['отчет', 'сбой', 'бюджет'])
+        self.assertEqual(report['runs'][0]['ids'], [2, 3, 1])
+        self.assertEqual(report['errors'], 1)
+        self.assertEqual(report['parameters'], {'queries': 3, 'concurrency': 2, 'top_k': 5})
+        self.assertIsNotNone(report['latency_ms']['p99'])
+        
+        # Воспроизведение не пишет в SearchLog и не читает кэш результатов
+        service.search.assert_any_call('отчет', top_k=5, log=False, use_cache=False)
+        self.assertFalse(SearchLog.objects.exists())
+    
+    def test_overlap_with_baseline(self):
+        def run(query, ids, error=None):
+            return {'query': query, 'ids': ids, 'error': error, 'latency_ms': 1.0}
+        
+        baseline = {
+            'latency_ms': {'mean': 10.0, 'p99': 20.0},
+            'runs': [run('отчет', [1, 2, 3, 4]), run('бюджет', [5, 6]), run('сбой', [7]), run('план', [])]
+        }
+        report = {
+            'latency_ms': {'mean': 12.5, 'p99': None},
+            'runs': [run('отчет', [1, 2, 9, 8]), run('бюджет', [6, 5]), run('сбой', [], 'error'), run('план', []),
+                     run('новый', [1])]
+        }
+        
+        comparison = compare_with_baseline(report, baseline)
+        
+        self.assertEqual(comparison['compared'], 3)
+        self.assertEqual(comparison['mean_overlap'], round((0.5 + 1 + 1) / 3, 4))
+        self.assertEqual(comparison['min_overlap'], 0.5)
+        self.assertEqual(comparison['changed_queries'], 1)
+        self.assertEqual(comparison['lowest_overlap'], [{'query': 'отчет', 'overlap': 0.5}])
+        self.assertEqual(comparison['latency_delta_ms'], {'mean': 2.5, 'p99': None})
\ No newline at end of file
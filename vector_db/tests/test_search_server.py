@@ -0,0 +1,53 @@
+from unittest import mock
+import numpy as np
+from ..models import VectorEntry
+from ..services import vector_index
+from .utils import VectorIndexTestCase, connect_remote
+
+
+class RemoteVectorIndexTests(VectorIndexTestCase):
+    """
+    Операции клиента сервера поиска, передаваемые серверу
+    """
+    def setUp(self):
+        super().setUp()
+        self.entries = self.create_entries(40)
+        self.service = self.create_service('hnsw')
+        self.service.rebuild()
+        self.remote = connect_remote(self.service)
+    
+    def test_index_api_is_forwarded(self):
+        self.assertEqual(self.remote.index_type, 'hnsw')
+        self.assertEqual(self.remote.config, self.service.config)
+        self.assertEqual(self.remote.get_generation(), self.service.generation)
+        self.assertTrue(self.remote.train())
+        self.assertFalse(self.remote.reload())
+        self.assertEqual(self.remote._get_entries().count(), VectorEntry.objects.count())
+        
+        entry_ids = self.service.get_entry_ids()[:5]
+        np.testing.assert_allclose(self.remote.reconstruct_vectors(entry_ids), self.service.reconstruct_vectors(entry_ids))
+    
+    def test_removed_vectors_are_compacted_on_server(self):
+        removed_ids = [entry.id for entry in self.entries[:2]]
+        self.assertEqual(self.remote.remove_vectors(removed_ids), 2)
+        self.assertEqual(self.remote.compact(), 2)
+        
+        self.assertFalse(self.service._tombstones)
+        self.assertFalse(np.isin(removed_ids, self.remote.get_entry_ids()).any())
+        
+        operations = [call_args.args[0]['op'] for call_args in self.remote._call.call_args_list]
+        self.assertEqual(operations, ['remove', 'compact', 'entry_ids'])    
+    def test_rebuild_runs_on_server(self):
+        self.create_entries(5, seed=1)
+        generation = self.service.generation
+        progress = []
+        
+        with mock.patch.object(vector_index.VectorIndexService, '__init__') as create_local:
+            count = self.remote.rebuild(progress_callback=lambda done, total: progress.append((done, total)))
+        
+        create_local.assert_not_called()
+        self.assertEqual(count, 45)
+        self.assertEqual(progress, [(45, 45)])
+        self.assertGreater(self.service.generation, generation)
+        self.assertEqual(len(self.service.get_entry_ids()), 45)
+        self.remote._call.assert_called_once_with({'op': 'rebuild'}, wait=True)
\ No newline at end of file
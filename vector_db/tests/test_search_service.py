@@ -0,0 +1,137 @@
+from datetime import timedelta
+from unittest import mock
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+from planfix_integration.models import Project, Employee, Task
+from ..models import SearchLog
+from ..services import search_service, vector_index
+from ..services.result_cache import SearchResultCache
+from ..services.search_latency import search_latency_report
+from ..services.search_service import SearchService
+from .utils import VectorIndexTestCase
+
+
+@override_settings(SEARCH_CACHE_ENABLED=False, HYBRID_SEARCH_ENABLED=False, HYBRID_RRF_K=60)
+class FuseResultsTests(SimpleTestCase):
+    """
+    Слияние векторного поиска с поиском по ключевым словам
+    """
+    def setUp(self):
+        self.vector_index = mock.Mock()
+        with mock.patch.object(search_service, 'get_vector_index_service', return_value=self.vector_index):
+            self.service = SearchService()
+    
+    def test_fused_score_does_not_replace_vector_score(self):
+        self.vector_index.hydrate_results.return_value = [
+            {'id': 3, 'entity_type': 'task', 'entity_id': 3, 'text': '', 'metadata': {}, 'score': 5.0}
+        ]
+        vector_results = [
+            {'id': 1, 'entity_type': 'task', 'entity_id': 1, 'text': '', 'metadata': {}, 'score': 0.9},
+            {'id': 2, 'entity_type': 'task', 'entity_id': 2, 'text': '', 'metadata': {}, 'score': 0.8},
+        ]
+        
+        results = self.service._fuse_results(vector_results, [(3, 5.0), (2, 3.0)], 3, {})
+        
+        self.assertEqual([result['id'] for result in results], [2, 1, 3])
+        self.assertEqual([result['score'] for result in results], [0.8, 0.9, None])
+        self.assertAlmostEqual(results[0]['fused_score'], 2 / 62)
+        self.assertEqual(results[0]['keyword_score'], 3.0)
+        self.assertNotIn('keyword_score', results[1])
+
+
+@override_settings(SEARCH_CACHE_ENABLED=True, HYBRID_SEARCH_ENABLED=False, SEARCH_LOG_ASYNC=False)
+class SearchTimingTests(VectorIndexTestCase):
+    """
+    Длительности этапов поиска, записываемые в SearchLog
+    """
+    def setUp(self):
+        super().setUp()
+        self.entries = self.create_entries(20)
+        index = self.create_service()
+        index.rebuild()
+        
+        result_cache = SearchResultCache(prefix='test_search_cache')
+        self.addCleanup(result_cache.clear)
+        with mock.patch.object(search_service, 'get_vector_index_service', return_value=index), \
+                mock.patch.object(search_service, 'get_search_result_cache', return_value=result_cache):
+            self.service = SearchService()
+        
+        patcher = mock.patch.object(vector_index, 'generate_embeddings', return_value=self.entries[0].embedding)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+    
+    def test_stages_are_logged_once_per_search(self):
+        response = self.service.search('задача', top_k=5)
+        cached_response = self.service.search('задача', top_k=5)
+        
+        self.assertEqual(set(response['timings']),
+                         {'cache_ms', 'embedding_ms', 'index_search_ms', 'hydration_ms', 'enrichment_ms'})
+        self.assertTrue(cached_response['cached'])
+        
+        uncached, cached = SearchLog.objects.order_by('id')
+        self.assertEqual((uncached.cache_hit, cached.cache_hit), (False, True))
+        self.assertEqual(uncached.results_count, 5)
+        for stage in response['timings']:
+            self.assertAlmostEqual(getattr(uncached, stage), response['timings'][stage], places=3)
+        self.assertIsNone(uncached.filter_ms)
+        self.assertIsNone(uncached.keyword_ms)
+        
+        # Из кэша выполняется только чтение кэша
+        self.assertIsNotNone(cached.cache_ms)
+        self.assertEqual([stage for stage in SearchLog.TIMING_FIELDS if getattr(cached, stage) is not None], ['cache_ms'])
+    
+    def test_latency_report_separates_cached_searches(self):
+        self.service.search('задача', top_k=5)
+        self.service.search('задача', top_k=5)
+        self.service.search('задача', top_k=3)
+        
+        report = search_latency_report()
+        
+        self.assertEqual(report['searches'], 3)
+        self.assertEqual(report['cache_hit_rate'], round(1 / 3, 4))
+        self.assertEqual(report['uncached']['duration_ms']['count'], 2)
+        self.assertEqual(report['uncached']['stages']['embedding_ms']['count'], 2)
+        self.assertEqual(list(report['cached']['stages']), ['cache_ms'])
+
+
+@override_settings(SEARCH_CACHE_ENABLED=False, HYBRID_SEARCH_ENABLED=False)
+class EnrichmentTests(TestCase):
+    """
+    Обогащение результатов поиска данными сущностей Planfix
+    """
+    def setUp(self):
+        with mock.patch.object(search_service, 'get_vector_index_service'):
+            self.service = SearchService()
+        
+        project = Project.objects.create(planfix_id='p1', name='Склад')
+        assignee = Employee.objects.create(planfix_id='e1', name='Иванов')
+        self.tasks = [
+            Task.objects.create(planfix_id=f"t{i}", name=f"Задача {i}", project=project, assignee=assignee if i else None)
+            for i in range(3)
+        ]
+    
+    def _enrich(self):
+        results = [{'id': i, 'entity_type': 'task', 'entity_id': task.id} for i, task in enumerate(self.tasks)]
+        return self.service._enrich_results({'task': results})['task']
+    
+    def test_related_entities_are_loaded_in_one_query(self):
+        with self.assertNumQueries(2):
+            results = self._enrich()
+        
+        self.assertEqual([result['task']['name'] for result in results], ['Задача 0', 'Задача 1', 'Задача 2'])
+        self.assertEqual(results[1]['task']['project'], {'id': self.tasks[1].project_id, 'planfix_id': 'p1', 'name': 'Склад'})
+        self.assertEqual(results[1]['task']['assignee']['name'], 'Иванов')
+        self.assertNotIn('assignee', results[0]['task'])
+    
+    def test_projection_cache_is_invalidated_by_updated_at(self):
+        self._enrich()
+        
+        # Неизмененные сущности берутся из кэша, запрашиваются только версии
+        with self.assertNumQueries(1):
+            self.assertEqual(self._enrich()[1]['task']['name'], 'Задача 1')
+        
+        Task.objects.filter(id=self.tasks[1].id).update(name='Переименована', updated_at=timezone.now() + timedelta(seconds=1))
+        
+        with self.assertNumQueries(2):
+            results = self._enrich()
+        self.assertEqual([result['task']['name'] for result in results], ['Задача 0', 'Переименована', 'Задача 2'])
\ No newline at end of file
@@ -0,0 +1,80 @@
+import atexit
+from unittest import mock
+import faiss
+import numpy as np
+from django.test import override_settings
+from ..models import VectorEntry
+from ..services.consistency import check_vector_index
+from ..services import sharded_index
+from ..services.sharded_index import ShardedVectorIndexService
+from .utils import VectorIndexTestCase, SerialExecutor, random_embeddings
+
+
+@override_settings(VECTOR_INDEX_SHARD_BY='project_id')
+class ShardedIndexTests(VectorIndexTestCase):
+    """
+    Индекс, разделенный на шарды по проекту записи
+    """
+    def setUp(self):
+        super().setUp()
+        patcher = mock.patch.object(sharded_index, 'ThreadPoolExecutor', SerialExecutor)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        
+        self.entries = self.create_entries(30, metadata=lambda i: {'project_id': i % 3} if i % 5 else {})
+        self.create_service('hnsw')
+        
+        self.service = ShardedVectorIndexService()
+        self.addCleanup(self._close_shards)
+        self.service.rebuild()
+    
+    def _close_shards(self):
+        for shard in self.service.shards.values():
+            shard._cancel_flush_timer()
+            atexit.unregister(shard.flush)
+    
+    def test_rebuild_does_not_use_search_pool(self):
+        with mock.patch.object(self.service, '_executor') as search_pool:
+            self.assertEqual(self.service.rebuild(), len(self.entries))
+        
+        search_pool.map.assert_not_called()
+        self.assertEqual(sorted(self.service.shards), ['0', '1', '2', 'none'])
+    
+    def test_index_api_is_applied_to_shards(self):
+        self.assertEqual(self.service.index_type, 'hnsw')
+        self.assertEqual(self.service.config['index'], 'hnsw')
+        self.assertTrue(self.service.train())
+        self.assertFalse(self.service.reload())
+        
+        entry_ids = np.array([entry.id for entry in self.entries[::4]], dtype=np.int64)
+        expected = np.array([entry.embedding for entry in self.entries[::4]], dtype=np.float32)
+        faiss.normalize_L2(expected)
+        np.testing.assert_allclose(self.service.reconstruct_vectors(entry_ids), expected, atol=1e-6)
+        
+        removed_ids = [entry.id for entry in self.entries[:6]]
+        self.service.remove_vectors(removed_ids)
+        self.service.compact()
+        self.assertFalse(np.isin(removed_ids, self.service.get_entry_ids()).any())
+        self.assertFalse(any(shard._tombstones for shard in self.service.shards.values()))
+    
+    def test_consistency_check_covers_all_shards(self):
+        VectorEntry.objects.filter(id=self.entries[1].id).update(embedding=random_embeddings(1, seed=5)[0].tolist())
+        
+        reports = check_vector_index(sample_size=1000, service=self.service)
+        
+        self.assertEqual(len(reports), 4)
+        self.assertEqual([report.stale_ids.tolist() for report in reports if report.has_drift], [[self.entries[1].id]])    
+    def test_build_generation_of_one_shard(self):
+        shard = self.service.shards['1']
+        generations = {value: shard.generation for value, shard in self.service.shards.items()}
+        
+        with mock.patch.object(atexit, 'register') as register:
+            count = ShardedVectorIndexService.build_generation(shard.index_name)
+        
+        register.assert_not_called()
+        self.assertEqual(count, len(shard.get_entry_ids()))
+        self.assertTrue(self.service.reload())
+        self.assertEqual(
+            {value: shard.generation - generations[value] for value, shard in self.service.shards.items()},
+            {'0': 0, '1': 1, '2': 0, 'none': 0}
+        )
\ No newline at end of file
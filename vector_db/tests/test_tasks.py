@@ -0,0 +1,62 @@
+import atexit
+import threading
+from unittest import mock
+from django.core.cache import cache
+from django.test import override_settings
+from ..models import VectorIndex
+from ..tasks import rebuild_vector_index
+from .utils import VectorIndexTestCase
+
+
+class RebuildVectorIndexTaskTests(VectorIndexTestCase):
+    """
+    Фоновая задача перестроения индекса
+    """
+    def setUp(self):
+        super().setUp()
+        self.entries = self.create_entries(30)
+        self.service = self.create_service('hnsw')
+        self.lock_key = 'vector_index_rebuild:default'
+        cache.set(self.lock_key, True)
+        self.addCleanup(cache.delete, self.lock_key)
+    
+    def run_task(self, index_name='default'):
+        progress = []
+        
+        def update_state(state, meta):
+            progress.append((state, meta['processed'], meta['total']))
+        
+        with mock.patch.object(rebuild_vector_index, 'update_state', side_effect=update_state), \
+                mock.patch.object(atexit, 'register') as register, \
+                mock.patch.object(threading.Thread, 'start') as start_thread:
+            result = rebuild_vector_index.apply(args=[index_name])
+        
+        register.assert_not_called()
+        start_thread.assert_not_called()
+        return result, progress
+    
+    @override_settings(VECTOR_INDEX_REBUILD_CHUNK_SIZE=10)
+    def test_new_generation_is_built_without_loaded_service(self):
+        generation = VectorIndex.objects.get(name='default').generation
+        
+        result, progress = self.run_task()
+        
+        self.assertEqual(result.get(), {'index_name': 'default', 'vectors': 30})
+        self.assertEqual(progress[-1], ('PROGRESS', 30, 30))
+        self.assertEqual([processed for _, processed, _ in progress], sorted(processed for _, processed, _ in progress))
+        self.assertIsNone(cache.get(self.lock_key))
+        
+        # Процесс, работающий с индексом, переходит на построенное поколение
+        self.assertEqual(VectorIndex.objects.get(name='default').generation, generation + 1)
+        self.assertTrue(self.service.reload())
+        self.assertEqual(self.service.generation, generation + 1)
+        self.assertEqual(sorted(self.service.get_entry_ids().tolist()), sorted(entry.id for entry in self.entries))
+    
+    def test_lock_is_released_on_error(self):
+        result, progress = self.run_task('missing')
+        
+        self.assertTrue(result.failed())
+        self.assertIsInstance(result.result, ValueError)
+        self.assertEqual(progress, [])
+        self.assertFalse(VectorIndex.objects.filter(name='missing').exists())
+        self.assertIsNone(cache.get('vector_index_rebuild:missing'))
\ No newline at end of file
@@ -0,0 +1,422 @@
+import os
+from unittest import mock
+import faiss
+import numpy as np
+from django.test import override_settings
+from ..models import VectorEntry
+from ..services import vector_index
+from ..services.vector_index import get_mmap_io_flags, get_faiss_index_ids, get_faiss_index_type
+from .utils import VectorIndexTestCase, random_embeddings
+
+
+class ReadOnlyIndexTests(VectorIndexTestCase):
+    """
+    Загрузка индекса только для чтения с отображением файлов в память
+    """
+    def test_mmap_io_flags(self):
+        with mock.patch.object(vector_index, 'MMAP_IFC_SUPPORTED', False):
+            self.assertEqual(get_mmap_io_flags('flat'), 0)
+            self.assertEqual(get_mmap_io_flags('ivf'), faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY)
+        
+        if vector_index.MMAP_IFC_SUPPORTED:
+            for index_type in ('flat', 'hnsw', 'ivf'):
+                self.assertEqual(get_mmap_io_flags(index_type), faiss.IO_FLAG_MMAP_IFC | faiss.IO_FLAG_READ_ONLY)
+    
+    def test_read_only_index_matches_writable_index(self):
+        for index_type in ('flat', 'hnsw'):
+            with self.subTest(index_type=index_type):
+                self.create_entries(30)
+                service = self.create_service(index_type)
+                service.rebuild()
+                
+                with override_settings(VECTOR_INDEX_MMAP=True):
+                    read_only = self.create_service(index_type)
+                
+                self.assertTrue(read_only.read_only)
+                self.assertEqual(read_only.generation, service.generation)
+                np.testing.assert_array_equal(read_only.get_entry_ids(), service.get_entry_ids())
+                
+                queries = random_embeddings(3, seed=1)
+                expected = service._search_hits(queries.copy(), 5, None, None, None)
+                self.assertEqual(read_only._search_hits(queries.copy(), 5, None, None, None), expected)
+
+
+class FilteredSearchTests(VectorIndexTestCase):
+    """
+    Фильтры, применяемые при поиске в FAISS, и фильтры, проверяемые после поиска
+    """
+    def test_filtered_search_matches_exact_filter(self):
+        project_ids = [12, 12.0, '12', 7, None]
+        self.create_entries(50, metadata=lambda i: {'project_id': project_ids[i % 5], 'status': 'open' if i % 2 else 'closed'})
+        self.create_entries(10, entity_type='comment', seed=1, metadata=lambda i: {'project_id': 12})
+        service = self.create_service()
+        service.rebuild()
+        
+        criteria_list = [
+            {'entity_types': ['task'], 'metadata': {'project_id': 12}},
+            {'metadata': {'project_id': '12'}},
+            {'metadata': {'project_id': 12, 'status': 'open'}},
+            {'entity_types': ['comment'], 'metadata': {'project_id': 12.7}},
+        ]
+        entries = list(VectorEntry.objects.all())
+        query = random_embeddings(1, seed=3)
+        
+        for criteria in criteria_list:
+            with self.subTest(criteria=criteria):
+                expected = {
+                    entry.id for entry in entries
+                    if service._apply_filters({'entity_type': entry.entity_type, 'metadata': entry.metadata}, criteria)
+                }
+                results = service.search_vectors(query, top_k=100, filter_criteria=criteria)[0]
+                self.assertEqual({result['id'] for result in results}, expected)
+
+class IncrementalUpdateTests(VectorIndexTestCase):
+    """
+    Добавление, замена и удаление векторов без перестроения индекса
+    """
+    def _search_ids(self, service, query, top_k):
+        return [result['id'] for result in service.search_vectors(query, top_k=top_k)[0]]
+    
+    def test_upsert_replaces_vector_under_same_id(self):
+        for index_type in ('flat', 'hnsw'):
+            with self.subTest(index_type=index_type):
+                VectorEntry.objects.all().delete()
+                entries = self.create_entries(20)
+                service = self.create_service(index_type)
+                service.rebuild()
+                
+                query = random_embeddings(1, seed=42)
+                entry = entries[5]
+                entry.embedding = query[0].tolist()
+                self.assertEqual(service.upsert_vectors([entry]), 1)
+                
+                self.assertEqual(self._search_ids(service, query, 1), [entry.id])
+                self.assertEqual(service.get_entry_ids().tolist(), sorted(e.id for e in entries))
+                expected = query / np.linalg.norm(query)
+                np.testing.assert_allclose(service.reconstruct_vectors(np.array([entry.id])), expected, rtol=1e-5, atol=1e-6)
+    
+    @override_settings(VECTOR_INDEX_COMPACT_RATIO=0.9)
+    def test_removed_vectors_are_excluded_without_losing_results(self):
+        for index_type in ('flat', 'hnsw'):
+            with self.subTest(index_type=index_type):
+                VectorEntry.objects.all().delete()
+                entries = self.create_entries(40)
+                service = self.create_service(index_type)
+                service.rebuild()
+                
+                # Удаляются все ближайшие соседи запроса
+                query = random_embeddings(1, seed=42)
+                removed = self._search_ids(service, query, 20)
+                self.assertEqual(service.remove_vectors(removed), 20)
+                
+                self.assertEqual(service.index.ntotal, 40)
+                results = self._search_ids(service, query, 10)
+                self.assertEqual(len(results), 10)
+                self.assertFalse(set(results) & set(removed))
+                self.assertEqual(set(service.get_entry_ids().tolist()), {e.id for e in entries} - set(removed))
+                
+                # Повторное добавление снимает пометку удаления
+                revived = next(entry for entry in entries if entry.id == removed[0])
+                service.upsert_vectors([revived])
+                self.assertEqual(self._search_ids(service, query, 1), [revived.id])
+    
+    @override_settings(VECTOR_INDEX_COMPACT_RATIO=0.25)
+    def test_compaction_removes_tombstones(self):
+        entries = self.create_entries(40)
+        service = self.create_service()
+        service.rebuild()
+        
+        service.remove_vectors([entry.id for entry in entries[:5]])
+        self.assertEqual(service.index.ntotal, 40)
+        self.assertEqual(service.compact(), 5)
+        self.assertEqual(service.index.ntotal, 35)
+        self.assertFalse(service._tombstones)
+        
+        # Превышение доли удаленных векторов запускает компактификацию автоматически
+        service.remove_vectors([entry.id for entry in entries[5:20]])
+        self.assertEqual(service.index.ntotal, 20)
+        self.assertEqual(service.get_entry_ids().tolist(), [entry.id for entry in entries[20:]])
+    
+    def test_batch_persists_changes(self):
+        entries = self.create_entries(20)
+        service = self.create_service()
+        service.rebuild()
+        
+        with service.batch():
+            service.remove_vectors([entries[0].id])
+            entries[1].embedding = random_embeddings(1, seed=9)[0].tolist()
+            service.upsert_vectors([entries[1]])
+        
+        reloaded = self.create_service()
+        self.assertEqual(reloaded.generation, service.generation)
+        self.assertEqual(reloaded.get_entry_ids().tolist(), [entry.id for entry in entries[1:]])
+        np.testing.assert_allclose(
+            reloaded.reconstruct_vectors(np.array([entries[1].id])),
+            service.reconstruct_vectors(np.array([entries[1].id])),
+        )
+
+
+class StableIdTests(VectorIndexTestCase):
+    """
+    ID записей VectorEntry в качестве идентификаторов FAISS
+    """
+    def test_index_ids_are_entry_ids(self):
+        entries = self.create_entries(30)
+        VectorEntry.objects.filter(id__in=[entry.id for entry in entries[::3]]).delete()
+        kept = [entry for i, entry in enumerate(entries) if i % 3]
+        
+        service = self.create_service()
+        service.rebuild()
+        
+        # Удаленные записи оставляют пропуски в ID, а не сдвигают позиции
+        self.assertEqual(get_faiss_index_ids(service.index).tolist(), [entry.id for entry in kept])
+        
+        queries = np.array([entry.embedding for entry in kept[-3:]], dtype=np.float32)
+        results = service.search_vectors(queries, top_k=1)
+        self.assertEqual([row[0]['id'] for row in results], [entry.id for entry in kept[-3:]])
+        self.assertEqual([row[0]['entity_id'] for row in results], [entry.entity_id for entry in kept[-3:]])
+    
+    def test_ids_survive_save_and_load(self):
+        entries = self.create_entries(10)
+        service = self.create_service()
+        service.rebuild()
+        service.remove_vectors([entries[0].id])
+        service.flush()
+        
+        reloaded = self.create_service()
+        self.assertEqual(get_faiss_index_ids(reloaded.index).tolist(), [entry.id for entry in entries[1:]])
+
+
+class IndexPersistenceTests(VectorIndexTestCase):
+    """
+    Отложенное сохранение индекса и атомарная запись поколений
+    """
+    def _index_files(self):
+        return sorted(os.listdir(os.path.join(self.index_dir, 'vector_indices')))
+    
+    @override_settings(VECTOR_INDEX_FLUSH_BATCH=3)
+    def test_changes_are_saved_in_batches(self):
+        entries = self.create_entries(10)
+        service = self.create_service()
+        service.rebuild()
+        generation = service.generation
+        
+        service.remove_vectors([entries[0].id])
+        service.remove_vectors([entries[1].id])
+        self.assertEqual(service.generation, generation)
+        self.assertIsNotNone(service._flush_timer)
+        
+        service.remove_vectors([entries[2].id])
+        self.assertEqual(service.generation, generation + 1)
+        self.assertIsNone(service._flush_timer)
+        self.assertFalse(service.flush())
+        
+        # На диске остаются последнее и предыдущее поколения
+        service.remove_vectors([entry.id for entry in entries[3:6]])
+        self.assertEqual(service.generation, generation + 2)
+        self.assertEqual(self._index_files(), [
+            f"index_default.{generation + gen}.{suffix}"
+            for gen in (1, 2) for suffix in ('attrs.npz', 'faiss', 'ids.npy')
+        ] + ["index_default.meta.json"])
+    
+    def test_interrupted_save_keeps_previous_generation(self):
+        entries = self.create_entries(10)
+        service = self.create_service()
+        service.rebuild()
+        generation = service.generation
+        service.remove_vectors([entries[0].id])
+        
+        replace = os.replace
+        
+        def fail_on_meta(source, target):
+            if target.endswith('meta.json'):
+                raise OSError("disk full")
+            replace(source, target)
+        
+        # Файлы нового поколения переименованы, а файл метаданных не заменен
+        with mock.patch.object(vector_index.os, 'replace', side_effect=fail_on_meta):
+            self.assertTrue(service.flush())
+        
+        self.assertEqual(service.generation, generation)
+        self.assertFalse([name for name in self._index_files() if '.tmp.' in name])
+        
+        reloaded = self.create_service()
+        self.assertEqual(reloaded.generation, generation)
+        self.assertEqual(reloaded.get_entry_ids().tolist(), [entry.id for entry in entries])
+        
+        # Следующее сохранение записывает поколение новее недописанного
+        self.assertTrue(service.flush())
+        self.assertGreater(service.generation, generation + 1)
+        self.assertTrue(reloaded.reload())
+        self.assertEqual(reloaded.get_entry_ids().tolist(), [entry.id for entry in entries[1:]])
+
+
+class IndexTypeTests(VectorIndexTestCase):
+    """
+    Выбор типа индекса FAISS по конфигурации VectorIndex
+    """
+    def test_index_type_is_taken_from_config(self):
+        entries = self.create_entries(200)
+        queries = random_embeddings(5, seed=1)
+        
+        exact = self.create_service('flat')
+        exact.rebuild()
+        expected = [[result['id'] for result in row] for row in exact.search_vectors(queries, top_k=5)]
+        
+        for index_type in ('ivf', 'hnsw'):
+            with self.subTest(index_type=index_type):
+                service = self.create_service(index_type, nlist=4, ef_search=200)
+                service.rebuild()
+                
+                self.assertEqual(get_faiss_index_type(service.index), index_type)
+                self.assertEqual(service.get_entry_ids().tolist(), [entry.id for entry in entries])
+                
+                # Просмотр всех кластеров IVF и широкий поиск HNSW совпадают с точным поиском
+                results = service.search_vectors(queries, top_k=5, nprobe=4)
+                self.assertEqual([[result['id'] for result in row] for row in results], expected)
+    
+    def test_changed_index_type_is_rebuilt(self):
+        self.create_entries(50)
+        service = self.create_service('flat')
+        service.rebuild()
+        
+        with mock.patch.object(vector_index.VectorIndexService, '_schedule_rebuild') as schedule_rebuild:
+            service = self.create_service('hnsw')
+        
+        schedule_rebuild.assert_called_once()
+        self.assertEqual(get_faiss_index_type(service.index), 'hnsw')
+        self.assertEqual(service.index.ntotal, 0)
+
+
+class CompressedIndexTests(VectorIndexTestCase):
+    """
+    Индексы с product quantization и точным переранжированием кандидатов
+    """
+    def test_candidates_are_rescored_exactly(self):
+        entries = self.create_entries(300)
+        vectors = np.array([entry.embedding for entry in entries], dtype=np.float32)
+        faiss.normalize_L2(vectors)
+        positions = {entry.id: i for i, entry in enumerate(entries)}
+        queries = random_embeddings(4, seed=1)
+        normalized_queries = queries.copy()
+        faiss.normalize_L2(normalized_queries)
+        
+        for index_type in ('ivfpq', 'opq'):
+            with self.subTest(index_type=index_type):
+                service = self.create_service(index_type, nlist=4, pq_m=2, pq_nbits=4, rerank_factor=100)
+                service.rebuild()
+                self.assertEqual(get_faiss_index_type(service.index), index_type)
+                
+                results = service.search_vectors(queries, top_k=5, nprobe=4)
+                for query, row in zip(normalized_queries, results):
+                    # Оценки вычислены по исходным эмбеддингам, а не по кодам PQ
+                    exact_scores = vectors @ query
+                    self.assertEqual([result['id'] for result in row],
+                                     [entries[i].id for i in np.argsort(-exact_scores)[:5]])
+                    for result in row:
+                        self.assertAlmostEqual(result['score'], float(exact_scores[positions[result['id']]]), places=5)
+
+
+class HydrationTests(VectorIndexTestCase):
+    """
+    Загрузка данных записей для результатов поиска
+    """
+    def test_results_of_all_queries_are_loaded_in_one_query(self):
+        entries = self.create_entries(40, metadata=lambda i: {'project_id': i % 2})
+        service = self.create_service()
+        service.rebuild()
+        queries = random_embeddings(3, seed=1)
+        
+        with self.assertNumQueries(1):
+            results = service.search_vectors(queries, top_k=10, filter_criteria={'metadata': {'project_id': 1}})
+        
+        entries_by_id = {entry.id: entry for entry in entries}
+        for row in results:
+            self.assertEqual(len(row), 10)
+            for result in row:
+                entry = entries_by_id[result['id']]
+                self.assertEqual(
+                    (result['entity_type'], result['entity_id'], result['text'], result['metadata']),
+                    (entry.entity_type, entry.entity_id, entry.text, {'project_id': 1})
+                )
+    
+    def test_hits_deleted_from_database_are_skipped(self):
+        entries = self.create_entries(10)
+        service = self.create_service()
+        service.rebuild()
+        VectorEntry.objects.filter(id=entries[0].id).delete()
+        
+        with self.assertNumQueries(1):
+            results = service.hydrate_results([(entries[0].id, 0.9), (entries[1].id, 0.8)])
+        
+        self.assertEqual([(result['id'], result['score']) for result in results], [(entries[1].id, 0.8)])
+
+
+class HotReloadTests(VectorIndexTestCase):
+    """
+    Переход процессов на поколения индекса, сохраненные другими процессами
+    """
+    def test_reader_loads_new_generation(self):
+        entries = self.create_entries(20)
+        writer = self.create_service()
+        writer.rebuild()
+        reader = self.create_service()
+        self.assertFalse(reader.check_for_update())
+        
+        writer.remove_vectors([entries[0].id])
+        writer.flush()
+        
+        self.assertTrue(reader.check_for_update())
+        self.assertEqual(reader.generation, writer.generation)
+        self.assertEqual(reader.get_entry_ids().tolist(), [entry.id for entry in entries[1:]])
+        
+        # Без изменения файла метаданных он повторно не читается
+        with mock.patch.object(reader, '_read_meta') as read_meta:
+            self.assertFalse(reader.check_for_update())
+        read_meta.assert_not_called()
+    
+    def test_unsaved_changes_are_not_discarded(self):
+        entries = self.create_entries(20)
+        writer = self.create_service()
+        writer.rebuild()
+        reader = self.create_service()
+        
+        reader.remove_vectors([entries[1].id])
+        writer.remove_vectors([entries[0].id])
+        writer.flush()
+        
+        self.assertFalse(reader.reload())
+        self.assertNotIn(entries[1].id, reader.get_entry_ids().tolist())
+        self.assertIn(entries[0].id, reader.get_entry_ids().tolist())
+        
+        # После сохранения своих изменений процесс записывает поколение новее
+        reader.flush()
+        self.assertGreater(reader.generation, writer.generation)
+        self.assertTrue(writer.reload())
+        self.assertEqual(writer.generation, reader.generation)
+
+
+class SearchManyTests(VectorIndexTestCase):
+    """
+    Пакетный поиск по нескольким текстовым запросам
+    """
+    def test_results_follow_query_order(self):
+        entries = self.create_entries(30)
+        service = self.create_service()
+        service.rebuild()
+        embeddings = {'first': entries[5].embedding, 'broken': None, 'last': entries[10].embedding}
+        queries = ['last', 'broken', 'first']
+        
+        with mock.patch.object(vector_index, 'generate_batch_embeddings',
+                               side_effect=lambda texts: [embeddings[text] for text in texts]) as generate, \
+                mock.patch.object(vector_index, 'log_search') as log_search:
+            results = service.search_many(queries, top_k=3)
+        
+        generate.assert_called_once_with(queries)
+        self.assertEqual([row[0]['id'] if row else None for row in results], [entries[10].id, None, entries[5].id])
+        self.assertEqual([call.kwargs['query'] for call in log_search.call_args_list], queries)
+        
+        # Результаты совпадают с поиском по каждому запросу отдельно
+        for query, row in zip(queries, results):
+            with mock.patch.object(vector_index, 'generate_embeddings', return_value=embeddings[query]):
+                self.assertEqual(service.search(query, top_k=3), row)
\ No newline at end of file
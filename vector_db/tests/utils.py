@@ -0,0 +1,165 @@
+import json
+import atexit
+import shutil
+import tempfile
+from unittest import mock
+from typing import List, Callable, Optional
+import numpy as np
+from django.test import TestCase, override_settings
+from ..models import VectorEntry, VectorIndex
+from ..services.vector_index import VectorIndexService
+from ..services.search_server import VectorSearchServer, RemoteVectorIndexService
+
+# Размерность эмбеддингов в тестах
+TEST_DIMENSION = 8
+
+
+def random_embeddings(count: int, dimension: int = TEST_DIMENSION, seed: int = 0) -> np.ndarray:
+    """
+    Случайные эмбеддинги для тестовых записей
+    
+    Args:
+        count: Количество векторов
+        dimension: Размерность
+        seed: Начальное значение генератора
+    
+    Returns:
+        np.ndarray: Векторы (по одному в строке)
+    """
+    return np.random.default_rng(seed).normal(size=(count, dimension)).astype(np.float32)
+
+
+def connect_remote(service: VectorIndexService) -> RemoteVectorIndexService:
+    """
+    Клиент сервера поиска, операции которого выполняет сервер в этом же процессе
+    
+    Запросы и ответы проходят через JSON, как при передаче по сокету.
+    Вызовы сервера записываются в mock remote._call.
+    
+    Args:
+        service: Сервис индекса сервера
+    
+    Returns:
+        RemoteVectorIndexService: Клиент
+    """
+    server = VectorSearchServer.__new__(VectorSearchServer)
+    server.service = service
+    
+    def call(request, wait=False):
+        response = json.loads(json.dumps(server.dispatch(json.loads(json.dumps(request)))))
+        if 'error' in response:
+            raise RuntimeError(f"Vector search server error: {response['error']}")
+        return response['result']
+    
+    remote = RemoteVectorIndexService('/nonexistent.sock', service.index_name, service.dimension)
+    remote._call = mock.Mock(side_effect=call)
+    return remote
+
+
+class SerialExecutor:
+    """
+    Замена пула потоков, выполняющая задачи в вызывающем потоке
+    
+    Потоки пула открывают свои соединения с БД и не видят данных,
+    созданных в транзакции теста.
+    """
+    def __init__(self, *args, **kwargs):
+        pass
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc_info):
+        return False
+    
+    def map(self, fn, *iterables):
+        return list(map(fn, *iterables))
+    
+    def shutdown(self, wait=True):
+        pass
+
+
+class VectorIndexTestCase(TestCase):
+    """
+    Базовый класс тестов с индексом FAISS во временной директории
+    
+    Постановка перестроения в Celery и переход на поколения, сохраненные
+    другими процессами, отключены: индекс перестраивается в тесте явно.
+    """
+    def setUp(self):
+        super().setUp()
+        self.index_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.index_dir, True)
+        
+        settings_override = override_settings(
+            BASE_DIR=self.index_dir,
+            VECTOR_DIMENSION=TEST_DIMENSION,
+            VECTOR_INDEX_MMAP=False,
+            VECTOR_INDEX_HOT_RELOAD=False,
+            VECTOR_INDEX_FLUSH_BATCH=10 ** 6,
+            VECTOR_INDEX_FLUSH_INTERVAL=3600
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        
+        patcher = mock.patch.object(VectorIndexService, '_schedule_rebuild')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        
+        self._next_entity_id = 1
+    
+    def create_entries(self, count: int, entity_type: str = 'task', seed: int = 0,
+                       metadata: Optional[Callable[[int], dict]] = None) -> List[VectorEntry]:
+        """
+        Создание векторных записей со случайными эмбеддингами
+        
+        Args:
+            count: Количество записей
+            entity_type: Тип сущности
+            seed: Начальное значение генератора эмбеддингов
+            metadata: Функция метаданных по номеру записи
+        
+        Returns:
+            List[VectorEntry]: Созданные записи
+        """
+        embeddings = random_embeddings(count, seed=seed)
+        entries = []
+        for i in range(count):
+            entries.append(VectorEntry(
+                entity_type=entity_type,
+                entity_id=self._next_entity_id + i,
+                text=f"{entity_type} {self._next_entity_id + i}",
+                embedding=embeddings[i].tolist(),
+                metadata=metadata(i) if metadata else {}
+            ))
+        self._next_entity_id += count
+        return VectorEntry.objects.bulk_create(entries)
+    
+    def create_service(self, index_type: str = 'flat', **config) -> VectorIndexService:
+        """
+        Создание сервиса индекса заданного типа
+        
+        Args:
+            index_type: Тип индекса FAISS
+            config: Дополнительные параметры индекса
+        
+        Returns:
+            VectorIndexService: Сервис с пустым индексом
+        """
+        VectorIndex.objects.update_or_create(
+            name='default',
+            defaults={
+                'index_type': 'faiss',
+                'dimension': TEST_DIMENSION,
+                'entity_types': [],
+                'config': {'metric': 'cosine', 'index': index_type, **config},
+                'is_active': True
+            }
+        )
+        
+        service = VectorIndexService(hot_reload=False)
+        
+        # Несохраненные изменения не записываются в удаленную временную директорию
+        self.addCleanup(atexit.unregister, service.flush)
+        self.addCleanup(service._cancel_flush_timer)
+        return service
\ No newline at end of file